@@ -1,12 +1,20 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import case, func, or_, update
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import get_db
+from .token_revocation import revoked_tokens
 
 # Intentar importar modelos extendidos, si no, usar los básicos
 try:
@@ -15,11 +23,132 @@ try:
 except ImportError:
     from . import models, schemas
 
-# Usar pbkdf2_sha256 en lugar de bcrypt para evitar problemas
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Usar pbkdf2_sha256 en lugar de bcrypt para evitar problemas. Las rondas
+# mínimas y máximas iguales a PASSWORD_HASH_ROUNDS hacen que verify_and_update
+# devuelva un hash nuevo cuando el guardado usa otro costo.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
+class Principal(NamedTuple):
+    """
+    Snapshot inmutable del usuario autenticado: es el current_user que reciben
+    los endpoints. Lleva lo que leen los handlers y los CRUD (id, organización,
+    rol), así que no hace falta volver a consultar el usuario. Para leer el resto
+    de columnas o modificarlo, usar load_user(). token_version y jti son los
+    del token con el que se autenticó (token_revocation.py).
+    """
+    id: int
+    username: str
+    role: str
+    organization_id: Optional[int]
+    is_active: bool
+    token_version: int = 0
+    jti: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user, jti: Optional[str] = None) -> "Principal":
+        return cls(
+            user.id, user.username, user.role, user.organization_id, bool(user.is_active),
+            user.token_version or 0, jti
+        )
+
+
+class PrincipalCache:
+    """
+    Token -> Principal, con TTL corto y desalojo LRU. Evita decodificar el JWT
+    y consultar el usuario en cada petición. Es local al worker: los cambios de
+    usuario la invalidan en el proceso que los hace y en los demás expiran a
+    los AUTH_CACHE_TTL_SECONDS como máximo.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires_at, principal)
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def set(self, token: str, principal: Principal, token_exp: Optional[int] = None) -> None:
+        """Guarda el principal; nunca más allá del vencimiento del token (claim exp)"""
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None, organization_id: Optional[int] = None) -> None:
+        """Descarta los tokens de un usuario o de todos los usuarios de una organización"""
+        with self._lock:
+            stale = [
+                token for token, (_, principal) in self._entries.items()
+                if principal.id == user_id
+                or (organization_id is not None and principal.organization_id == organization_id)
+            ]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Llamar después de confirmar cambios de un usuario (rol, estado, contraseña, username, borrado)"""
+    principal_cache.invalidate(user_id=user_id)
+
+
+def invalidate_organization_principals(organization_id: int) -> None:
+    """Llamar después de activar, suspender o eliminar en bloque los usuarios de una organización"""
+    principal_cache.invalidate(organization_id=organization_id)
+
+
+def resolve_user(db: Session, user: Union[int, Principal, "models.User"]):
+    """
+    Usuario que ejecuta una operación CRUD: el Principal de la autenticación (o
+    un usuario ORM) se usa tal cual; con un id se consulta la base de datos.
+    Devuelve None si el id no existe.
+    """
+    if isinstance(user, int):
+        db_user = db.get(models.User, user)
+        return Principal.from_user(db_user) if db_user else None
+    return user
+
+
+def load_user(db: Session, principal: Principal) -> "models.User":
+    """Usuario completo (ORM) del principal, para leer el resto de columnas o modificarlo"""
+    user = db.get(models.User, principal.id)
+    if user is None:
+        invalidate_principal(principal.id)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No se pudo validar las credenciales")
+    return user
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -28,6 +157,35 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# PBKDF2 ocupa la CPU decenas de milisegundos por llamada: desde handlers async
+# se calcula en este pool, que además limita cuántos hashes corren a la vez
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña en el pool de hashes. Devuelve (válida, hash nuevo):
+    el hash nuevo solo viene cuando la contraseña es válida y el guardado usa
+    otro costo; quien llama debe guardarlo.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Igual que verify_password_async, para handlers síncronos (corren en el
+    threadpool de Starlette): espera el resultado del pool de hashes, que sigue
+    limitando cuántos hashes corren a la vez.
+    """
+    return _hash_executor.submit(pwd_context.verify_and_update, plain_password, hashed_password).result()
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -35,46 +193,94 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    # Intentar buscar por username o email
-    print(f"🔍 Buscando usuario: {username}")
-    user = db.query(models.User).filter(
-        (models.User.username == username) | (models.User.email == username)
+def create_user_token(user) -> str:
+    """Token de sesión del usuario con su token_version vigente (claim "ver")"""
+    return create_access_token(
+        data={"sub": user.username, "ver": user.token_version or 0},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+# Bloqueo de la cuenta tras intentos fallidos consecutivos
+LOGIN_MAX_FAILED_ATTEMPTS = 5
+LOGIN_LOCKOUT_MINUTES = 15
+
+
+def get_login_user(db: Session, login: str):
+    """Usuario por username o email (la única lectura del login)"""
+    return db.query(models.User).filter(
+        (models.User.username == login) | (models.User.email == login)
     ).first()
-    
-    if not user:
-        print(f"❌ Usuario no encontrado en BD")
-        return False
-    
-    print(f"✅ Usuario encontrado:")
-    print(f"   ID: {user.id}")
-    print(f"   Email: {user.email}")
-    print(f"   Username: {user.username}")
-    print(f"   Role: {user.role}")
-    print(f"   Is Active: {user.is_active}")
-    print(f"   Hash almacenado: {user.hashed_password[:50]}...")
-    
-    # Verificar contraseña
-    print(f"🔐 Verificando contraseña...")
-    is_valid = verify_password(password, user.hashed_password)
-    print(f"   Resultado: {'✅ VÁLIDA' if is_valid else '❌ INVÁLIDA'}")
-    
-    if not is_valid:
-        return False
-    
-    return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def is_locked_out(user, now: datetime) -> bool:
+    return user.locked_until is not None and user.locked_until > now
+
+
+def record_login_failure(db: Session, user_id: int, now: datetime) -> None:
+    """
+    Suma el intento fallido y bloquea la cuenta al llegar al máximo, en un solo
+    UPDATE atómico (los intentos concurrentes no se pierden). Un bloqueo ya
+    vencido cuenta como contador en cero; mientras la cuenta siga bloqueada no
+    se escribe nada.
+    """
+    User = models.User
+    attempts = case(
+        (User.locked_until.is_not(None), 1),
+        else_=func.coalesce(User.failed_login_attempts, 0) + 1
+    )
+    db.execute(
+        update(User)
+        .where(User.id == user_id, or_(User.locked_until.is_(None), User.locked_until <= now))
+        .values(
+            failed_login_attempts=attempts,
+            locked_until=case(
+                (attempts >= LOGIN_MAX_FAILED_ATTEMPTS, now + timedelta(minutes=LOGIN_LOCKOUT_MINUTES)),
+                else_=None
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def record_login_success(db: Session, user, new_hash: Optional[str] = None) -> None:
+    """
+    Limpia los intentos fallidos y guarda el hash rehecho, solo si hay algo que
+    cambiar: un login normal de una cuenta sin fallos no escribe.
+    """
+    values = {}
+    if user.failed_login_attempts or user.locked_until is not None:
+        values.update(failed_login_attempts=0, locked_until=None)
+    if new_hash:
+        values["hashed_password"] = new_hash
+    if not values:
+        return
+    db.execute(
+        update(models.User).where(models.User.id == user.id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    principal = principal_cache.get(token)
+    if principal is not None:
+        # Sin consultas: el set de revocados se sincroniza cada TOKEN_REVOCATION_SYNC_SECONDS
+        if revoked_tokens.is_revoked(db, principal.jti):
+            raise credentials_exception
+        return principal
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
@@ -87,16 +293,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user = db.query(models.User).filter(models.User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
-    return user
+    # Tokens anteriores a token_version no traen "ver": valen como versión 0
+    if payload.get("ver", 0) != (user.token_version or 0):
+        raise credentials_exception
+    principal = Principal.from_user(user, payload.get("jti"))
+    if revoked_tokens.is_revoked(db, principal.jti):
+        raise credentials_exception
+    principal_cache.set(token, principal, payload.get("exp"))
+    return principal
 
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Usuario inactivo")
     return current_user
 
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)):
+async def get_current_admin_user(current_user: Principal = Depends(get_current_active_user)):
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -105,7 +318,7 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
     return current_user
 
 
-async def get_current_super_admin(current_user: models.User = Depends(get_current_active_user)):
+async def get_current_super_admin(current_user: Principal = Depends(get_current_active_user)):
     if current_user.role != "super_admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
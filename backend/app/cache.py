@@ -0,0 +1,197 @@
+"""
+Caché de resultados agregados por organización (dashboard y resumen)
+
+Cada worker de gunicorn usa un backend en memoria (TTL + LRU). Para que
+todos los workers vean la misma caché se puede configurar un backend
+compartido (Redis) con CACHE_BACKEND=redis.
+
+Las claves incluyen una "generación" por organización: cualquier escritura
+de ventas, alquileres, cotizaciones, pagos, clientes o productos llama a
+invalidate_organization(), que incrementa la generación y deja obsoletas
+todas las entradas de esa organización sin tener que recorrerlas.
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+
+class CacheBackend(ABC):
+    """Interfaz mínima que debe implementar un backend de caché"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_generation(self, organization_id: Optional[int]) -> int:
+        ...
+
+    @abstractmethod
+    def bump_generation(self, organization_id: Optional[int]) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Backend local al proceso con expiración por TTL y desalojo LRU"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generation(self, organization_id: Optional[int]) -> int:
+        return self._generations.get(organization_id, 0)
+
+    def bump_generation(self, organization_id: Optional[int]) -> int:
+        with self._lock:
+            generation = self._generations.get(organization_id, 0) + 1
+            self._generations[organization_id] = generation
+            return generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend compartido entre workers. Requiere el paquete opcional `redis`.
+    Los valores se guardan como JSON; el LRU lo maneja Redis (maxmemory-policy).
+    """
+
+    def __init__(self, url: str, prefix: str = "sg-cache"):
+        import redis  # Dependencia opcional, solo si se usa este backend
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _generation_key(self, organization_id: Optional[int]) -> str:
+        return f"{self._prefix}:gen:{organization_id}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(f"{self._prefix}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self._client.set(f"{self._prefix}:{key}", json.dumps(value, default=str), ex=ttl)
+
+    def get_generation(self, organization_id: Optional[int]) -> int:
+        raw = self._client.get(self._generation_key(organization_id))
+        return int(raw) if raw is not None else 0
+
+    def bump_generation(self, organization_id: Optional[int]) -> int:
+        return int(self._client.incr(self._generation_key(organization_id)))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{self._prefix}:*"):
+            self._client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(f"{self._prefix}:*"))
+
+
+class TenantCache:
+    """Caché de resultados por organización con contadores de aciertos/fallos"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _make_key(self, namespace: str, organization_id: Optional[int], params: dict) -> str:
+        generation = self.backend.get_generation(organization_id)
+        serialized = json.dumps(params, sort_keys=True, default=str)
+        return f"{namespace}:{organization_id}:{generation}:{serialized}"
+
+    def get_or_compute(self, namespace: str, organization_id: Optional[int], params: dict, compute: Callable[[], Any]):
+        """Devuelve el valor cacheado o lo calcula con compute() y lo guarda"""
+        key = self._make_key(namespace, organization_id, params)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate_organization(self, organization_id: Optional[int]) -> None:
+        """Invalida todas las entradas de una organización"""
+        self.backend.bump_generation(organization_id)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0,
+        }
+
+
+def _build_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis" and settings.CACHE_REDIS_URL:
+        try:
+            return RedisCacheBackend(settings.CACHE_REDIS_URL)
+        except ImportError:
+            print("⚠️ CACHE_BACKEND=redis pero el paquete 'redis' no está instalado; usando caché en memoria")
+    return InMemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+dashboard_cache = TenantCache(_build_backend(), ttl=settings.CACHE_TTL_SECONDS)
+
+
+def invalidate_organization(organization_id: Optional[int]) -> None:
+    """Atajo para los caminos de escritura de los módulos CRUD"""
+    dashboard_cache.invalidate_organization(organization_id)
@@ -12,6 +12,39 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
     
+    # Logos y sellos (image_service.py): cloudinary o local (static/); vacío = cloudinary si hay credenciales
+    IMAGE_STORAGE: str = os.getenv("IMAGE_STORAGE", "")
+    IMAGE_UPLOAD_WORKERS: int = int(os.getenv("IMAGE_UPLOAD_WORKERS", "4"))
+    
+    # Caché del dashboard y resumen (memory = por worker, redis = compartida)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "")
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    
+    # Contraseñas (auth.py): rondas de PBKDF2-SHA256 (los hashes con otro costo se rehacen al iniciar sesión)
+    # e hilos que calculan hashes a la vez, fuera del event loop
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    
+    # Caché del usuario autenticado por token (auth.py), por worker
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "4096"))
+    # Segundos entre sincronizaciones de la tabla revoked_tokens en cada worker (token_revocation.py)
+    TOKEN_REVOCATION_SYNC_SECONDS: int = int(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+    
+    # Tareas periódicas (scheduler.py): un solo worker las ejecuta (lock de líder)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_LOCK_FILE: str = os.getenv("SCHEDULER_LOCK_FILE", "")  # Sin PostgreSQL; vacío = archivo en el directorio temporal
+    OVERDUE_RENTALS_INTERVAL_SECONDS: int = int(os.getenv("OVERDUE_RENTALS_INTERVAL_SECONDS", "300"))
+    EXPIRED_QUOTATIONS_INTERVAL_SECONDS: int = int(os.getenv("EXPIRED_QUOTATIONS_INTERVAL_SECONDS", "900"))
+    NOTIFICATIONS_INTERVAL_SECONDS: int = int(os.getenv("NOTIFICATIONS_INTERVAL_SECONDS", "300"))
+    
+    # PDFs (pdf_service.py): procesos de render y caché de PDFs terminados por worker
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", "2"))
+    PDF_CACHE_MAX_MB: int = int(os.getenv("PDF_CACHE_MAX_MB", "64"))
+    PDF_RENDER_TIMEOUT_SECONDS: int = int(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", "60"))
+    
     class Config:
         env_file = ".env"
 
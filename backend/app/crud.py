@@ -1,7 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, case, update
+from typing import Dict, List, Optional, Union
 from .auth import get_password_hash
+from .cache import invalidate_organization
+from .pagination import paginate
+from .search import apply_product_search
+from .loaders import PRODUCT_LOADERS
 
 # Usar modelos extendidos por defecto
 from . import models_extended as models
@@ -136,7 +140,54 @@ def delete_supplier(db: Session, supplier_id: int):
 
 # Product CRUD
 def get_product(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+    return db.query(models.Product).options(*PRODUCT_LOADERS).filter(models.Product.id == product_id).first()
+
+
+def get_products_by_ids(db: Session, product_ids: List[int], for_update: bool = False) -> Dict[int, models.Product]:
+    """
+    Carga varios productos en una sola consulta (IN) y los devuelve indexados por id.
+    Con for_update=True se bloquean las filas (SELECT ... FOR UPDATE en PostgreSQL)
+    hasta el commit, para validar y descontar stock sin carreras entre workers.
+    """
+    unique_ids = sorted({product_id for product_id in product_ids if product_id is not None})
+    if not unique_ids:
+        return {}
+    
+    query = db.query(models.Product).filter(models.Product.id.in_(unique_ids))
+    if for_update:
+        # Orden fijo de bloqueo para evitar deadlocks entre ventas concurrentes
+        query = query.order_by(models.Product.id).with_for_update()
+    return {product.id: product for product in query.all()}
+
+
+def apply_stock_deltas(
+    db: Session,
+    stock_deltas: Optional[Dict[int, int]] = None,
+    available_deltas: Optional[Dict[int, int]] = None
+) -> None:
+    """
+    Aplica variaciones de stock / stock_available a varios productos con un
+    único UPDATE (CASE por id). Los deltas son relativos al valor en la base,
+    así que no pisan cambios hechos por otras transacciones.
+    Los objetos Product ya cargados en la sesión no se actualizan hasta el commit.
+    """
+    values = {}
+    product_ids = set()
+    if stock_deltas:
+        values["stock"] = models.Product.stock + case(stock_deltas, value=models.Product.id, else_=0)
+        product_ids.update(stock_deltas)
+    if available_deltas:
+        values["stock_available"] = models.Product.stock_available + case(available_deltas, value=models.Product.id, else_=0)
+        product_ids.update(available_deltas)
+    if not values:
+        return
+    
+    db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(product_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
 
 
 def get_product_by_sku(db: Session, sku: str, organization_id: Optional[int] = None):
@@ -155,10 +206,10 @@ def get_products(
     limit: int = 100, 
     search: Optional[str] = None, 
     organization_id: Optional[int] = None,
-    product_type: Optional[str] = None,
+    product_type: Optional[Union[str, List[str]]] = None,
     stock_available_gt: Optional[int] = None
 ):
-    query = db.query(models.Product)
+    query = db.query(models.Product).options(*PRODUCT_LOADERS)
     
     # Filtrar por organización (igual que categorías)
     if organization_id:
@@ -167,7 +218,18 @@ def get_products(
     # Filtrar solo productos activos
     query = query.filter(models.Product.is_active == True)
     
-    # SIMPLIFICADO: Solo filtros básicos
+    # Tipo de producto: uno o varios (p. ej. ["alquiler", "ambos"])
+    if product_type:
+        product_types = [product_type] if isinstance(product_type, str) else list(product_type)
+        query = query.filter(models.Product.product_type.in_(product_types))
+    
+    if stock_available_gt is not None:
+        query = query.filter(models.Product.stock_available > stock_available_gt)
+    
+    # Búsqueda por nombre, SKU y categoría, ordenada por relevancia
+    if search:
+        query = apply_product_search(query, search, db.get_bind().dialect.name)
+    
     return query.offset(skip).limit(limit).all()
 
 
@@ -194,6 +256,7 @@ def create_product(db: Session, product: schemas.ProductCreate, organization_id:
     db_product = models.Product(**product_data)
     db.add(db_product)
     db.commit()
+    invalidate_organization(organization_id)
     db.refresh(db_product)
     return db_product
 
@@ -219,6 +282,7 @@ def update_product(db: Session, product_id: int, product: schemas.ProductUpdate)
         for field, value in update_data.items():
             setattr(db_product, field, value)
         db.commit()
+        invalidate_organization(db_product.organization_id)
         db.refresh(db_product)
     return db_product
 
@@ -236,11 +300,13 @@ def delete_product(db: Session, product_id: int):
         if has_sales or has_rentals or has_quotations or has_movements:
             db_product.is_active = False
             db.commit()
+            invalidate_organization(db_product.organization_id)
             db.refresh(db_product)
         else:
             # Si no tiene referencias, eliminar completamente
             db.delete(db_product)
             db.commit()
+            invalidate_organization(db_product.organization_id)
     return db_product
 
 
@@ -297,11 +363,12 @@ def create_inventory_movement(
     
     db.add(db_movement)
     db.commit()
+    invalidate_organization(product.organization_id)
     db.refresh(db_movement)
     return db_movement
 
 
-def get_inventory_movements(db: Session, skip: int = 0, limit: int = 100, product_id: Optional[int] = None, organization_id: Optional[int] = None):
+def get_inventory_movements(db: Session, skip: int = 0, limit: int = 100, product_id: Optional[int] = None, organization_id: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(models.InventoryMovement)
     
     # Filtrar por organización
@@ -311,7 +378,7 @@ def get_inventory_movements(db: Session, skip: int = 0, limit: int = 100, produc
     if product_id:
         query = query.filter(models.InventoryMovement.product_id == product_id)
     
-    return query.order_by(desc(models.InventoryMovement.created_at)).offset(skip).limit(limit).all()
+    return paginate(query, models.InventoryMovement, skip=skip, limit=limit, cursor=cursor).all()
 
 
 # Dashboard Stats
@@ -1,52 +1,67 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from . import models_extended as models, schemas_extended as schemas
+from .cache import invalidate_organization
+from .pagination import paginate
+from .search import apply_client_search
 
 
 def get_client(db: Session, client_id: int):
     return db.query(models.Client).filter(models.Client.id == client_id).first()
 
 
-def get_client_by_rnc(db: Session, rnc: str, organization_id: Optional[int] = None):
+def get_client_by_rnc(
+    db: Session,
+    rnc: str,
+    organization_id: Optional[int] = None,
+    exclude_client_id: Optional[int] = None
+):
     """Busca cliente por RNC/Cédula con normalización (con o sin guiones)"""
-    normalized_rnc = normalize_rnc(rnc)
-    query = db.query(models.Client)
+    # Consulta indexada sobre (organization_id, rnc_normalized)
+    query = db.query(models.Client).filter(models.Client.rnc_normalized == normalize_rnc(rnc))
     
     if organization_id:
         query = query.filter(models.Client.organization_id == organization_id)
     
-    clients = query.all()
-    
-    # Buscar coincidencia con RNC normalizado
-    for client in clients:
-        if normalize_rnc(client.rnc) == normalized_rnc:
-            return client
+    if exclude_client_id:
+        query = query.filter(models.Client.id != exclude_client_id)
     
-    return None
+    return query.first()
 
 
-def get_clients(db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None, status: Optional[str] = None, organization_id: Optional[int] = None):
+def get_clients(db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None, status: Optional[str] = None, organization_id: Optional[int] = None, cursor: Optional[str] = None):
     query = db.query(models.Client)
     
     # Filtrar por organización
     if organization_id:
         query = query.filter(models.Client.organization_id == organization_id)
     
-    if search:
-        query = query.filter(
-            or_(
-                models.Client.name.contains(search),
-                models.Client.rnc.contains(search),
-                models.Client.email.contains(search),
-                models.Client.phone.contains(search)
-            )
-        )
-    
     if status:
         query = query.filter(models.Client.status == status)
     
-    return query.order_by(models.Client.created_at.desc()).offset(skip).limit(limit).all()
+    if search and search.strip():
+        # Con búsqueda el orden es por relevancia, así que no aplica el cursor (created_at, id)
+        if cursor:
+            raise ValueError("La paginación por cursor no está disponible con búsqueda")
+        query = apply_client_search(query, search, db.get_bind().dialect.name)
+        return query.offset(skip).limit(limit).all()
+    
+    return paginate(query, models.Client, skip=skip, limit=limit, cursor=cursor).all()
+
+
+def search_clients_typeahead(db: Session, q: str, limit: int = 10, organization_id: Optional[int] = None):
+    """Sugerencias para autocompletar: solo id, nombre y RNC de los clientes más relevantes"""
+    if not q or not q.strip():
+        return []
+    
+    query = db.query(models.Client.id, models.Client.name, models.Client.rnc)
+    if organization_id:
+        query = query.filter(models.Client.organization_id == organization_id)
+    
+    query = apply_client_search(query, q, db.get_bind().dialect.name)
+    return query.limit(limit).all()
 
 
 def normalize_rnc(rnc: str) -> str:
@@ -54,22 +69,20 @@ def normalize_rnc(rnc: str) -> str:
     return rnc.replace('-', '').replace(' ', '').strip()
 
 
+def normalize_rnc_or_none(rnc: Optional[str]) -> Optional[str]:
+    """Valor para la columna rnc_normalized (NULL si no hay RNC)"""
+    normalized = normalize_rnc(rnc) if rnc else ""
+    return normalized or None
+
+
 def create_client(db: Session, client: schemas.ClientCreate, organization_id: int):
     # Validar que el RNC sea obligatorio
     if not client.rnc or not client.rnc.strip():
         raise ValueError("El RNC/Cédula es obligatorio")
     
-    # Normalizar RNC para validación
-    normalized_rnc = normalize_rnc(client.rnc)
-    
     # Validar que no exista un cliente con el mismo RNC/Cédula (normalizado) en la organización
-    existing_clients = db.query(models.Client).filter(
-        models.Client.organization_id == organization_id
-    ).all()
-    
-    for existing_client in existing_clients:
-        if normalize_rnc(existing_client.rnc) == normalized_rnc:
-            raise ValueError(f"Ya existe un cliente con el RNC/Cédula: {client.rnc}")
+    if get_client_by_rnc(db, client.rnc, organization_id):
+        raise ValueError(f"Ya existe un cliente con el RNC/Cédula: {client.rnc}")
     
     # Validar que no exista un cliente con el mismo email en la organización (solo si se proporciona)
     if client.email and client.email.strip():
@@ -84,12 +97,19 @@ def create_client(db: Session, client: schemas.ClientCreate, organization_id: in
     client_data['organization_id'] = organization_id
     # Guardar RNC con el formato original del usuario
     client_data['rnc'] = client.rnc.strip()
+    client_data['rnc_normalized'] = normalize_rnc_or_none(client.rnc)
     if client.email:
         client_data['email'] = client.email.strip()
     
     db_client = models.Client(**client_data)
     db.add(db_client)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro request creó el mismo RNC entre la validación y el commit
+        db.rollback()
+        raise ValueError(f"Ya existe un cliente con el RNC/Cédula: {client.rnc}")
+    invalidate_organization(organization_id)
     db.refresh(db_client)
     return db_client
 
@@ -111,19 +131,24 @@ def update_client(db: Session, client_id: int, client: schemas.ClientUpdate):
         
         # Validar RNC/Cédula si se está actualizando (con normalización)
         if 'rnc' in update_data and update_data['rnc']:
-            normalized_rnc = normalize_rnc(update_data['rnc'])
-            existing_clients = db.query(models.Client).filter(
-                models.Client.organization_id == db_client.organization_id,
-                models.Client.id != client_id  # Excluir el cliente actual
-            ).all()
-            
-            for existing_client in existing_clients:
-                if normalize_rnc(existing_client.rnc) == normalized_rnc:
-                    raise ValueError(f"Ya existe otro cliente con el RNC/Cédula: {update_data['rnc']}")
+            existing_client = get_client_by_rnc(
+                db, update_data['rnc'], db_client.organization_id,
+                exclude_client_id=client_id  # Excluir el cliente actual
+            )
+            if existing_client:
+                raise ValueError(f"Ya existe otro cliente con el RNC/Cédula: {update_data['rnc']}")
+        
+        if 'rnc' in update_data:
+            update_data['rnc_normalized'] = normalize_rnc_or_none(update_data['rnc'])
         
         for field, value in update_data.items():
             setattr(db_client, field, value)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError(f"Ya existe otro cliente con el RNC/Cédula: {update_data.get('rnc')}")
+        invalidate_organization(db_client.organization_id)
         db.refresh(db_client)
     return db_client
 
@@ -133,6 +158,7 @@ def delete_client(db: Session, client_id: int):
     if db_client:
         db.delete(db_client)
         db.commit()
+        invalidate_organization(db_client.organization_id)
     return db_client
 
 
@@ -1,20 +1,122 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, select, true
 from datetime import datetime, timedelta
 from typing import Optional
 from . import models_extended as models
+from . import rollups
+from . import leaderboards
 
 
-def get_dashboard_stats(db: Session, organization_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None):
-    """Obtiene todas las estadísticas del dashboard para una organización específica"""
-    print(f"DEBUG: get_dashboard_stats called with org_id={organization_id}, start_date={start_date}, end_date={end_date}")
-    
-    today = datetime.now()
-    start_of_day = datetime(today.year, today.month, today.day)
-    start_of_month = datetime(today.year, today.month, 1)
-    start_of_year = datetime(today.year, 1, 1)
-    
-    # Procesar fechas de filtro si se proporcionan
+# Estados de venta que cuentan como ingreso cobrado
+PAID_SALE_STATUSES = ["completada", "parcial"]
+
+
+def _window(column, start: Optional[datetime], end: Optional[datetime]):
+    """Condición SQL para un rango de fechas (cualquiera de los extremos puede ser None)"""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column <= end)
+    return and_(true(), *conditions)
+
+
+def _sum_if(condition, value):
+    """SUM condicional: solo suma las filas que cumplen la condición"""
+    return func.sum(case((condition, value), else_=None))
+
+
+def _count_if(condition):
+    """COUNT condicional: solo cuenta las filas que cumplen la condición"""
+    return func.count(case((condition, 1), else_=None))
+
+
+def _day_window(start: Optional[datetime], end: Optional[datetime]):
+    """Condición sobre daily_rollups.day para una ventana del dashboard (siempre días completos)"""
+    return rollups.day_window(*rollups.whole_days(start, end))
+
+
+def _sales_aggregates(organization_id, windows: dict):
+    """Agregados de ventas desde los totales diarios (daily_rollups)"""
+    Rollup = models.DailyRollup
+    is_paid = Rollup.status.in_(PAID_SALE_STATUSES)
+    return select(
+        _sum_if(is_paid, Rollup.paid_amount).label("total_sales_all_time"),
+        _sum_if(and_(is_paid, _day_window(*windows["today"])), Rollup.paid_amount).label("total_sales_today"),
+        _sum_if(and_(is_paid, _day_window(*windows["month"])), Rollup.paid_amount).label("total_sales_month"),
+        _sum_if(and_(is_paid, _day_window(*windows["year"])), Rollup.paid_amount).label("total_sales_year"),
+        _sum_if(Rollup.status == "pendiente_pago", Rollup.count).label("pending_sales"),
+        _sum_if(Rollup.status != "cancelada", Rollup.pending_balance).label("pending_payments"),
+    ).where(rollups.rollup_filter(rollups.SALE, organization_id))
+
+
+def _products_aggregates(organization_id, windows: dict):
+    """Agregados de inventario en un solo barrido de la tabla products"""
+    Product = models.Product
+    return select(
+        func.count(Product.id).label("total_products"),
+        func.sum(Product.price * Product.stock).label("total_value"),
+        _count_if(and_(Product.stock <= Product.min_stock, Product.min_stock > 0)).label("low_stock_products"),
+    ).where(Product.organization_id == organization_id, Product.is_active == True)
+
+
+def _rentals_aggregates(organization_id, windows: dict):
+    """Agregados de alquileres desde los totales diarios (daily_rollups)"""
+    Rollup = models.DailyRollup
+    is_active = Rollup.status == "activo"
+    return select(
+        _sum_if(and_(is_active, _day_window(*windows["custom"])), Rollup.count).label("products_rented"),
+        _sum_if(is_active, Rollup.count).label("active_rentals"),
+        _sum_if(Rollup.status == "vencido", Rollup.count).label("overdue_rentals"),
+        _sum_if(_day_window(*windows["period"]), Rollup.count).label("rentals_this_month"),
+        func.sum(Rollup.pending_balance).label("pending_rental_payments"),
+    ).where(rollups.rollup_filter(rollups.RENTAL, organization_id))
+
+
+def _rental_payments_aggregates(organization_id, windows: dict):
+    """Agregados de pagos de alquiler desde los totales diarios (daily_rollups)"""
+    Rollup = models.DailyRollup
+    return select(
+        func.sum(Rollup.paid_amount).label("total_rentals_all_time"),
+        _sum_if(_day_window(*windows["today"]), Rollup.paid_amount).label("rental_income_today"),
+        _sum_if(_day_window(*windows["month"]), Rollup.paid_amount).label("rental_income_month"),
+        _sum_if(_day_window(*windows["year"]), Rollup.paid_amount).label("rental_income_year"),
+    ).where(rollups.rollup_filter(rollups.RENTAL_PAYMENT, organization_id))
+
+
+def _clients_aggregates(organization_id, windows: dict):
+    """Agregados de clientes en un solo barrido de la tabla clients"""
+    Client = models.Client
+    return select(
+        func.count(Client.id).label("total_clients"),
+        _count_if(Client.status == "activo").label("active_clients"),
+        _count_if(Client.created_at >= windows["start_of_month"]).label("new_clients_month"),
+    ).where(Client.organization_id == organization_id)
+
+
+def _quotations_aggregates(organization_id, windows: dict):
+    """Agregados de cotizaciones en un solo barrido de la tabla quotations"""
+    Quotation = models.Quotation
+    return select(
+        _count_if(Quotation.status == "pendiente").label("pending_quotations"),
+        _count_if(Quotation.status == "aceptada").label("accepted_quotations"),
+        _count_if(_window(Quotation.quotation_date, *windows["period"])).label("quotations_this_month"),
+    ).where(Quotation.organization_id == organization_id)
+
+
+# Un agregado por tabla; todos se resuelven en una sola ida a la base de datos
+DASHBOARD_AGGREGATES = [
+    _sales_aggregates,
+    _products_aggregates,
+    _rentals_aggregates,
+    _rental_payments_aggregates,
+    _clients_aggregates,
+    _quotations_aggregates,
+]
+
+
+def _parse_filter_dates(start_date: Optional[str], end_date: Optional[str]):
+    """Convierte los filtros YYYY-MM-DD del dashboard a datetime (ignora valores inválidos)"""
     filter_start_date = None
     filter_end_date = None
     
@@ -32,263 +134,109 @@ def get_dashboard_stats(db: Session, organization_id: int, start_date: Optional[
         except ValueError:
             pass
     
-    # Función auxiliar para aplicar filtros de fecha
-    def apply_date_filter(query, date_field):
-        if filter_start_date:
-            query = query.filter(date_field >= filter_start_date)
-        if filter_end_date:
-            query = query.filter(date_field <= filter_end_date)
-        return query
-    
-    # VENTAS
-    # Si hay filtros de fecha, usar esos; si no, usar los rangos predefinidos
-    if filter_start_date or filter_end_date:
-        # Usar filtros de fecha personalizados - CORREGIDO: usar paid_amount y created_at
-        print(f"DEBUG VENTAS: Filtrando por created_at entre {filter_start_date} y {filter_end_date}")
-        
-        # Primero ver qué ventas hay
-        all_sales = db.query(models.Sale).filter(
-            models.Sale.organization_id == organization_id,
-            models.Sale.status.in_(["completada", "parcial"])
-        ).all()
-        print(f"DEBUG: Total ventas completadas/parciales: {len(all_sales)}")
-        for sale in all_sales:
-            print(f"  - Venta {sale.sale_number}: created_at={sale.created_at}, sale_date={sale.sale_date}, paid=${sale.paid_amount}")
-        
-        sales_query = db.query(func.sum(models.Sale.paid_amount)).filter(
-            models.Sale.organization_id == organization_id,
-            models.Sale.status.in_(["completada", "parcial"])
-        )
-        sales_query = apply_date_filter(sales_query, models.Sale.created_at)
-        total_sales_today = sales_query.scalar() or 0
-        print(f"DEBUG VENTAS: Total ventas filtradas = {total_sales_today}")
-        total_sales_month = total_sales_today  # Mismo valor cuando hay filtro personalizado
-        total_sales_year = total_sales_today   # Mismo valor cuando hay filtro personalizado
-    else:
-        # Usar rangos predefinidos (comportamiento original) - CORREGIDO: usar paid_amount y created_at
-        total_sales_today = db.query(func.sum(models.Sale.paid_amount)).filter(
-            models.Sale.created_at >= start_of_day,
-            models.Sale.organization_id == organization_id,
-            models.Sale.status.in_(["completada", "parcial"])
-        ).scalar() or 0
-        
-        total_sales_month = db.query(func.sum(models.Sale.paid_amount)).filter(
-            models.Sale.created_at >= start_of_month,
-            models.Sale.organization_id == organization_id,
-            models.Sale.status.in_(["completada", "parcial"])
-        ).scalar() or 0
-        
-        total_sales_year = db.query(func.sum(models.Sale.paid_amount)).filter(
-            models.Sale.created_at >= start_of_year,
-            models.Sale.organization_id == organization_id,
-            models.Sale.status.in_(["completada", "parcial"])
-        ).scalar() or 0
-    
-    # Ventas pendientes (siempre sin filtro de fecha ya que son pendientes actuales)
-    pending_sales = db.query(func.count(models.Sale.id)).filter(
-        models.Sale.status == "pendiente_pago",
-        models.Sale.organization_id == organization_id
-    ).scalar()
-    
-    # INVENTARIO
-    total_products = db.query(func.count(models.Product.id)).filter(
-        models.Product.is_active == True,
-        models.Product.organization_id == organization_id
-    ).scalar()
-    
-    total_value = db.query(func.sum(models.Product.price * models.Product.stock)).filter(
-        models.Product.is_active == True,
-        models.Product.organization_id == organization_id
-    ).scalar() or 0
-    
-    # Productos con stock bajo (stock actual menor o igual al mínimo)
-    low_stock_products = db.query(func.count(models.Product.id)).filter(
-        models.Product.stock <= models.Product.min_stock,
-        models.Product.min_stock > 0,  # Asegurar que min_stock esté definido
-        models.Product.is_active == True,
-        models.Product.organization_id == organization_id
-    ).scalar() or 0
-    
-    # Productos alquilados (aplicar filtro de fecha si existe)
-    if filter_start_date or filter_end_date:
-        rental_query = db.query(func.count(models.Rental.id)).filter(
-            models.Rental.status == "activo",
-            models.Rental.organization_id == organization_id
-        )
-        rental_query = apply_date_filter(rental_query, models.Rental.created_at)
-        products_rented = rental_query.scalar()
-    else:
-        products_rented = db.query(func.count(models.Rental.id)).filter(
-            models.Rental.status == "activo",
-            models.Rental.organization_id == organization_id
-        ).scalar()
-    
-    # CLIENTES
-    total_clients = db.query(func.count(models.Client.id)).filter(
-        models.Client.organization_id == organization_id
-    ).scalar()
-    
-    active_clients = db.query(func.count(models.Client.id)).filter(
-        models.Client.status == "activo",
-        models.Client.organization_id == organization_id
-    ).scalar()
-    
-    new_clients_month = db.query(func.count(models.Client.id)).filter(
-        models.Client.created_at >= start_of_month,
-        models.Client.organization_id == organization_id
-    ).scalar()
-    
-    # COTIZACIONES
-    # Cotizaciones pendientes y aceptadas (sin filtro de fecha ya que son estados actuales)
-    pending_quotations = db.query(func.count(models.Quotation.id)).filter(
-        models.Quotation.status == "pendiente",
-        models.Quotation.organization_id == organization_id
-    ).scalar()
-    
-    accepted_quotations = db.query(func.count(models.Quotation.id)).filter(
-        models.Quotation.status == "aceptada",
-        models.Quotation.organization_id == organization_id
-    ).scalar()
-    
-    # Cotizaciones del período (aplicar filtro de fecha si existe)
-    if filter_start_date or filter_end_date:
-        quotation_query = db.query(func.count(models.Quotation.id)).filter(
-            models.Quotation.organization_id == organization_id
-        )
-        quotation_query = apply_date_filter(quotation_query, models.Quotation.quotation_date)
-        quotations_this_month = quotation_query.scalar()
-    else:
-        quotations_this_month = db.query(func.count(models.Quotation.id)).filter(
-            models.Quotation.quotation_date >= start_of_month,
-            models.Quotation.organization_id == organization_id
-        ).scalar()
-    
-    # ALQUILERES
-    # Alquileres activos y vencidos (sin filtro de fecha ya que son estados actuales)
-    active_rentals = db.query(func.count(models.Rental.id)).filter(
-        models.Rental.status == "activo",
-        models.Rental.organization_id == organization_id
-    ).scalar()
-    
-    overdue_rentals = db.query(func.count(models.Rental.id)).filter(
-        models.Rental.status == "vencido",
-        models.Rental.organization_id == organization_id
-    ).scalar()
-    
-    # Alquileres del período (aplicar filtro de fecha si existe)
-    if filter_start_date or filter_end_date:
-        rental_period_query = db.query(func.count(models.Rental.id)).filter(
-            models.Rental.organization_id == organization_id
-        )
-        rental_period_query = apply_date_filter(rental_period_query, models.Rental.created_at)
-        rentals_this_month = rental_period_query.scalar()
-    else:
-        rentals_this_month = db.query(func.count(models.Rental.id)).filter(
-            models.Rental.created_at >= start_of_month,
-            models.Rental.organization_id == organization_id
-        ).scalar()
-    
-    # FINANCIERO
-    # Pagos pendientes (sin filtro de fecha ya que son pendientes actuales)
-    pending_payments = db.query(func.sum(models.Sale.balance)).filter(
-        models.Sale.balance > 0,
-        models.Sale.status != "cancelada",  # Excluir ventas canceladas
-        models.Sale.organization_id == organization_id
-    ).scalar() or 0
+    return filter_start_date, filter_end_date
+
+
+def _dashboard_windows(filter_start_date: Optional[datetime], filter_end_date: Optional[datetime]) -> dict:
+    """
+    Calcula las ventanas de fechas del dashboard.
+    Con filtro personalizado, hoy/mes/año usan el mismo rango del filtro.
+    """
+    today = datetime.now()
+    start_of_day = datetime(today.year, today.month, today.day)
+    start_of_month = datetime(today.year, today.month, 1)
+    start_of_year = datetime(today.year, 1, 1)
     
-    # Ingresos de alquileres - Usar pagos reales de RentalPayment (aplicar filtro de fecha si existe)
+    custom = (filter_start_date, filter_end_date)
     if filter_start_date or filter_end_date:
-        rental_income_query = db.query(func.sum(models.RentalPayment.amount)).filter(
-            models.RentalPayment.organization_id == organization_id
-        )
-        rental_income_query = apply_date_filter(rental_income_query, models.RentalPayment.payment_date)
-        rental_income_today = rental_income_query.scalar() or 0
-        rental_income_month = rental_income_today  # Mismo valor cuando hay filtro personalizado
-        rental_income_year = rental_income_today   # Mismo valor cuando hay filtro personalizado
-    else:
-        rental_income_today = db.query(func.sum(models.RentalPayment.amount)).filter(
-            models.RentalPayment.payment_date >= start_of_day,
-            models.RentalPayment.organization_id == organization_id
-        ).scalar() or 0
-        
-        rental_income_month = db.query(func.sum(models.RentalPayment.amount)).filter(
-            models.RentalPayment.payment_date >= start_of_month,
-            models.RentalPayment.organization_id == organization_id
-        ).scalar() or 0
-        
-        rental_income_year = db.query(func.sum(models.RentalPayment.amount)).filter(
-            models.RentalPayment.payment_date >= start_of_year,
-            models.RentalPayment.organization_id == organization_id
-        ).scalar() or 0
-    
-    # Pagos pendientes de alquileres - Incluir TODOS los que tengan balance pendiente
-    pending_rental_payments = db.query(func.sum(models.Rental.balance)).filter(
-        models.Rental.balance > 0,
-        models.Rental.organization_id == organization_id
-    ).scalar() or 0
-    
-    total_revenue_month = total_sales_month + rental_income_month
-    
-    # TOTALES HISTÓRICOS (sin filtros de fecha) - Solo ventas completadas y pagos de alquileres reales
-    total_sales_all_time = db.query(func.sum(models.Sale.paid_amount)).filter(
-        models.Sale.organization_id == organization_id,
-        models.Sale.status.in_(["completada", "parcial"])  # Solo ventas completadas o con pago parcial
-    ).scalar() or 0
-    
-    # Para alquileres, sumar todos los pagos registrados en RentalPayment
-    total_rentals_all_time = db.query(func.sum(models.RentalPayment.amount)).filter(
-        models.RentalPayment.organization_id == organization_id
-    ).scalar() or 0
+        return {
+            "today": custom,
+            "month": custom,
+            "year": custom,
+            "custom": custom,
+            "period": custom,
+            "start_of_month": start_of_month,
+        }
     
-    # Debug: imprimir algunos valores clave
-    print(f"DEBUG: total_sales_all_time={total_sales_all_time}, total_rentals_all_time={total_rentals_all_time}")
-    print(f"DEBUG: total_sales_month={total_sales_month}, rental_income_month={rental_income_month}")
-    print(f"DEBUG: active_clients={active_clients}, total_products={total_products}")
+    return {
+        "today": (start_of_day, None),
+        "month": (start_of_month, None),
+        "year": (start_of_year, None),
+        "custom": (None, None),
+        "period": (start_of_month, None),
+        "start_of_month": start_of_month,
+    }
+
+
+def get_dashboard_stats(db: Session, organization_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    Obtiene todas las estadísticas del dashboard para una organización específica.
+    Cada tabla se recorre una sola vez con agregados condicionales (CASE) por
+    ventana de fechas, y todos los agregados se combinan en una única consulta.
+    Ventas, alquileres y pagos de alquiler se leen de los totales diarios
+    (daily_rollups): las ventanas del dashboard son siempre días completos.
+    """
+    windows = _dashboard_windows(*_parse_filter_dates(start_date, end_date))
+    
+    # Cada agregado devuelve exactamente una fila; se combinan con JOIN ON TRUE
+    subqueries = [build(organization_id, windows).subquery() for build in DASHBOARD_AGGREGATES]
+    from_clause = subqueries[0]
+    for subquery in subqueries[1:]:
+        from_clause = from_clause.join(subquery, true())
+    
+    columns = [column for subquery in subqueries for column in subquery.c]
+    row = db.execute(select(*columns).select_from(from_clause)).mappings().one()
+    
+    def amount(key):
+        return round(row[key] or 0, 2)
+    
+    def count(key):
+        return row[key] or 0
     
     return {
         # Ventas
-        "total_sales_today": round(total_sales_today, 2),
-        "total_sales_month": round(total_sales_month, 2),
-        "total_sales_year": round(total_sales_year, 2),
-        "total_sales_all_time": round(total_sales_all_time, 2),
-        "pending_sales": pending_sales,
+        "total_sales_today": amount("total_sales_today"),
+        "total_sales_month": amount("total_sales_month"),
+        "total_sales_year": amount("total_sales_year"),
+        "total_sales_all_time": amount("total_sales_all_time"),
+        "pending_sales": count("pending_sales"),
         
         # Inventario
-        "total_products": total_products,
-        "total_value": round(total_value, 2),
-        "low_stock_products": low_stock_products,
-        "products_rented": products_rented,
+        "total_products": count("total_products"),
+        "total_value": amount("total_value"),
+        "low_stock_products": count("low_stock_products"),
+        "products_rented": count("products_rented"),
         
         # Clientes
-        "total_clients": total_clients,
-        "active_clients": active_clients,
-        "new_clients_month": new_clients_month,
+        "total_clients": count("total_clients"),
+        "active_clients": count("active_clients"),
+        "new_clients_month": count("new_clients_month"),
         
         # Cotizaciones
-        "pending_quotations": pending_quotations,
-        "accepted_quotations": accepted_quotations,
-        "quotations_this_month": quotations_this_month,
+        "pending_quotations": count("pending_quotations"),
+        "accepted_quotations": count("accepted_quotations"),
+        "quotations_this_month": count("quotations_this_month"),
         
         # Alquileres
-        "active_rentals": active_rentals,
-        "overdue_rentals": overdue_rentals,
-        "rentals_this_month": rentals_this_month,
+        "active_rentals": count("active_rentals"),
+        "overdue_rentals": count("overdue_rentals"),
+        "rentals_this_month": count("rentals_this_month"),
         
         # Financiero
-        "pending_payments": round(pending_payments, 2),
-        "total_revenue_month": round(total_revenue_month, 2),
+        "pending_payments": amount("pending_payments"),
+        "total_revenue_month": round((row["total_sales_month"] or 0) + (row["rental_income_month"] or 0), 2),
         
         # Ingresos de alquileres
-        "rental_income_today": round(rental_income_today, 2),
-        "rental_income_month": round(rental_income_month, 2),
-        "rental_income_year": round(rental_income_year, 2),
-        "total_rentals_all_time": round(total_rentals_all_time, 2),
-        "pending_rental_payments": round(pending_rental_payments, 2)
+        "rental_income_today": amount("rental_income_today"),
+        "rental_income_month": amount("rental_income_month"),
+        "rental_income_year": amount("rental_income_year"),
+        "total_rentals_all_time": amount("total_rentals_all_time"),
+        "pending_rental_payments": amount("pending_rental_payments")
     }
 
 
-def get_sales_chart_data(db: Session, organization_id: int, days: int = 30, start_date_str: Optional[str] = None, end_date_str: Optional[str] = None):
-    """Obtiene datos para gráfico de ventas de una organización específica"""
+def _chart_range(days: int, start_date_str: Optional[str], end_date_str: Optional[str]):
+    """Rango del gráfico: fechas del filtro o los últimos `days` días desde ahora"""
     if start_date_str and end_date_str:
         # Usar fechas específicas del filtro
         start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
@@ -297,6 +245,44 @@ def get_sales_chart_data(db: Session, organization_id: int, days: int = 30, star
         # Usar días desde hoy hacia atrás
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
+    return start_date, end_date
+
+
+def _rollup_chart_rows(db: Session, source: str, organization_id: int, days, statuses=None):
+    """Pagado y cantidad por día desde daily_rollups (una fila por día con datos)"""
+    Rollup = models.DailyRollup
+    query = db.query(
+        Rollup.day.label('date'),
+        func.sum(Rollup.paid_amount).label('total'),
+        func.sum(Rollup.count).label('count')
+    ).filter(
+        rollups.rollup_filter(source, organization_id),
+        rollups.day_window(*days)
+    )
+    if statuses:
+        query = query.filter(Rollup.status.in_(statuses))
+    return query.group_by(Rollup.day).having(func.sum(Rollup.count) > 0).order_by(Rollup.day).all()
+
+
+def _chart_points(rows):
+    return [
+        {
+            "date": str(row.date),
+            "total": round(float(row.total or 0), 2),  # Manejar None
+            "count": row.count
+        }
+        for row in rows
+    ]
+
+
+def get_sales_chart_data(db: Session, organization_id: int, days: int = 30, start_date_str: Optional[str] = None, end_date_str: Optional[str] = None):
+    """Obtiene datos para gráfico de ventas de una organización específica"""
+    start_date, end_date = _chart_range(days, start_date_str, end_date_str)
+    
+    # Rango de días completos: leer los totales diarios (a lo sumo unas filas por día)
+    whole_days = rollups.whole_days(start_date, end_date)
+    if whole_days:
+        return _chart_points(_rollup_chart_rows(db, rollups.SALE, organization_id, whole_days, PAID_SALE_STATUSES))
     
     sales_by_day = db.query(
         func.date(models.Sale.sale_date).label('date'),
@@ -305,32 +291,23 @@ def get_sales_chart_data(db: Session, organization_id: int, days: int = 30, star
     ).filter(
         models.Sale.sale_date >= start_date,
         models.Sale.sale_date <= end_date,
-        models.Sale.status.in_(["completada", "parcial"]),
+        models.Sale.status.in_(PAID_SALE_STATUSES),
         models.Sale.organization_id == organization_id
     ).group_by(
         func.date(models.Sale.sale_date)
     ).all()
     
-    return [
-        {
-            "date": str(row.date),
-            "total": round(float(row.total or 0), 2),  # Manejar None
-            "count": row.count
-        }
-        for row in sales_by_day
-    ]
+    return _chart_points(sales_by_day)
 
 
 def get_rentals_chart_data(db: Session, organization_id: int, days: int = 30, start_date_str: Optional[str] = None, end_date_str: Optional[str] = None):
     """Obtiene datos para gráfico de alquileres de una organización específica"""
-    if start_date_str and end_date_str:
-        # Usar fechas específicas del filtro
-        start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-    else:
-        # Usar días desde hoy hacia atrás
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+    start_date, end_date = _chart_range(days, start_date_str, end_date_str)
+    
+    # Rango de días completos: leer los totales diarios (a lo sumo unas filas por día)
+    whole_days = rollups.whole_days(start_date, end_date)
+    if whole_days:
+        return _chart_points(_rollup_chart_rows(db, rollups.RENTAL, organization_id, whole_days))
     
     rentals_by_day = db.query(
         func.date(models.Rental.created_at).label('date'),
@@ -344,35 +321,30 @@ def get_rentals_chart_data(db: Session, organization_id: int, days: int = 30, st
         func.date(models.Rental.created_at)
     ).all()
     
-    return [
-        {
-            "date": str(row.date),
-            "total": round(float(row.total or 0), 2),  # Manejar None
-            "count": row.count
-        }
-        for row in rentals_by_day
-    ]
+    return _chart_points(rentals_by_day)
 
 
-def get_top_products(db: Session, organization_id: int, limit: int = 10):
-    """Obtiene los productos más vendidos de una organización específica"""
+def get_top_products(db: Session, organization_id: int, limit: int = 10, order_by: str = "quantity", month: Optional[str] = None):
+    """
+    Obtiene los productos más vendidos de una organización específica, por
+    cantidad o por ingresos, históricos o de un mes ('YYYY-MM'). Lee el ranking
+    product_leaderboard (sin ventas canceladas) recorriendo su índice.
+    """
+    Board = models.ProductLeaderboard
+    order_column = getattr(Board, leaderboards.PRODUCT_ORDERS[order_by])
     top_products = db.query(
         models.Product.id,
         models.Product.name,
         models.Product.sku,
-        func.sum(models.SaleItem.quantity).label('total_sold'),
-        func.sum(models.SaleItem.subtotal).label('total_revenue')
+        Board.quantity.label('total_sold'),
+        Board.revenue.label('total_revenue')
     ).join(
-        models.SaleItem, models.Product.id == models.SaleItem.product_id
-    ).join(
-        models.Sale, models.SaleItem.sale_id == models.Sale.id
+        models.Product, models.Product.id == Board.product_id
     ).filter(
-        models.Product.organization_id == organization_id,
-        models.Sale.organization_id == organization_id
-    ).group_by(
-        models.Product.id, models.Product.name, models.Product.sku
+        Board.organization_id == (organization_id or 0),
+        Board.period == (month or leaderboards.ALL_TIME)
     ).order_by(
-        func.sum(models.SaleItem.quantity).desc()
+        order_column.desc()
     ).limit(limit).all()
     
     return [
@@ -387,23 +359,27 @@ def get_top_products(db: Session, organization_id: int, limit: int = 10):
     ]
 
 
-def get_top_clients(db: Session, organization_id: int, limit: int = 10):
-    """Obtiene los clientes que más compran de una organización específica"""
+def get_top_clients(db: Session, organization_id: int, limit: int = 10, order_by: str = "revenue", month: Optional[str] = None):
+    """
+    Obtiene los clientes que más compran de una organización específica, por
+    monto o por cantidad de compras, históricos o de un mes ('YYYY-MM'). Lee el
+    ranking client_leaderboard (sin ventas canceladas).
+    """
+    Board = models.ClientLeaderboard
+    order_column = getattr(Board, leaderboards.CLIENT_ORDERS[order_by])
     top_clients = db.query(
         models.Client.id,
         models.Client.name,
         models.Client.client_type,
-        func.count(models.Sale.id).label('total_purchases'),
-        func.sum(models.Sale.total).label('total_spent')
+        Board.purchases.label('total_purchases'),
+        Board.total_spent.label('total_spent')
     ).join(
-        models.Sale, models.Client.id == models.Sale.client_id
+        models.Client, models.Client.id == Board.client_id
     ).filter(
-        models.Client.organization_id == organization_id,
-        models.Sale.organization_id == organization_id
-    ).group_by(
-        models.Client.id, models.Client.name, models.Client.client_type
+        Board.organization_id == (organization_id or 0),
+        Board.period == (month or leaderboards.ALL_TIME)
     ).order_by(
-        func.sum(models.Sale.total).desc()
+        order_column.desc()
     ).limit(limit).all()
     
     return [
@@ -0,0 +1,186 @@
+"""
+Consultas de exportación (CSV / XLSX)
+
+Cada exportación es un SELECT de solo las columnas del archivo, con los
+nombres relacionados (cliente, vendedor, categoría...) resueltos por JOIN.
+Las filas se recorren con yield_per: en PostgreSQL usa un cursor del lado
+del servidor, así que llegan por lotes y nunca se cargan todas en memoria.
+"""
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session, aliased
+
+from . import models_extended as models
+
+# Filas por lote leídas del cursor
+EXPORT_BATCH_SIZE = 2000
+
+
+class ExportQuery:
+    """Consulta de una exportación: nombre del archivo, hoja, encabezados y SELECT"""
+
+    def __init__(self, name: str, sheet_name: str, columns: List[Tuple[str, object]]):
+        self.name = name
+        self.sheet_name = sheet_name
+        self.headers = [header for header, _ in columns]
+        self.statement = select(*[expression for _, expression in columns])
+
+    def filter(self, model, organization_id: Optional[int], date_column,
+               start_date: Optional[datetime], end_date: Optional[datetime]) -> "ExportQuery":
+        """Aplica el filtro de organización y el rango de fechas"""
+        if organization_id:
+            self.statement = self.statement.where(model.organization_id == organization_id)
+        if start_date:
+            self.statement = self.statement.where(date_column >= start_date)
+        if end_date:
+            self.statement = self.statement.where(date_column <= end_date)
+        return self
+
+
+def _active_label(column):
+    return case((column == True, 'Sí'), else_='No')
+
+
+def clients_export(organization_id: Optional[int], start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None) -> ExportQuery:
+    Client = models.Client
+    export = ExportQuery("clientes", "Clientes", [
+        ('ID', Client.id),
+        ('Nombre', Client.name),
+        ('Tipo', Client.client_type),
+        ('Estado', Client.status),
+        ('RNC/Cédula', Client.rnc),
+        ('Email', Client.email),
+        ('Teléfono', Client.phone),
+        ('Móvil', Client.mobile),
+        ('Ciudad', Client.city),
+        ('Dirección', Client.address),
+        ('Límite Crédito', Client.credit_limit),
+        ('Días Crédito', Client.credit_days),
+        ('Fecha Creación', Client.created_at),
+    ])
+    export.statement = export.statement.order_by(Client.id)
+    return export.filter(Client, organization_id, Client.created_at, start_date, end_date)
+
+
+def products_export(organization_id: Optional[int], start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> ExportQuery:
+    Product = models.Product
+    export = ExportQuery("productos", "Productos", [
+        ('SKU', Product.sku),
+        ('Nombre', Product.name),
+        ('Tipo', Product.product_type),
+        ('Categoría', models.Category.name),
+        ('Proveedor', models.Supplier.name),
+        ('Precio Venta', Product.price),
+        ('Precio Alquiler Diario', Product.rental_price_daily),
+        ('Precio Alquiler Semanal', Product.rental_price_weekly),
+        ('Precio Alquiler Mensual', Product.rental_price_monthly),
+        ('Costo', Product.cost),
+        ('Stock', Product.stock),
+        ('Stock Disponible', Product.stock_available),
+        ('Stock Mínimo', Product.min_stock),
+        ('Ubicación', Product.location),
+        ('Activo', _active_label(Product.is_active)),
+    ])
+    export.statement = export.statement.select_from(Product).outerjoin(
+        models.Category, Product.category_id == models.Category.id
+    ).outerjoin(
+        models.Supplier, Product.supplier_id == models.Supplier.id
+    ).order_by(Product.id)
+    return export.filter(Product, organization_id, Product.created_at, start_date, end_date)
+
+
+def sales_export(organization_id: Optional[int], start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None) -> ExportQuery:
+    Sale = models.Sale
+    seller = aliased(models.User)
+    export = ExportQuery("ventas", "Ventas", [
+        ('Número Venta', Sale.sale_number),
+        ('Número Factura', Sale.invoice_number),
+        ('Cliente', models.Client.name),
+        ('Fecha', Sale.sale_date),
+        ('Estado', Sale.status),
+        ('Método Pago', Sale.payment_method),
+        ('Subtotal', Sale.subtotal),
+        ('Descuento', Sale.discount_amount),
+        ('Impuesto', Sale.tax_amount),
+        ('Total', Sale.total),
+        ('Pagado', Sale.paid_amount),
+        ('Saldo', Sale.balance),
+        ('Vendedor', seller.full_name),
+    ])
+    # Orden por (created_at, id): recorre ix_sales_org_created_id sin ordenar en memoria
+    export.statement = export.statement.select_from(Sale).outerjoin(
+        models.Client, Sale.client_id == models.Client.id
+    ).outerjoin(
+        seller, Sale.created_by == seller.id
+    ).order_by(Sale.created_at, Sale.id)
+    return export.filter(Sale, organization_id, Sale.sale_date, start_date, end_date)
+
+
+def rentals_export(organization_id: Optional[int], start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None) -> ExportQuery:
+    Rental = models.Rental
+    creator = aliased(models.User)
+    export = ExportQuery("alquileres", "Alquileres", [
+        ('Número', Rental.rental_number),
+        ('Cliente', models.Client.name),
+        ('Producto', models.Product.name),
+        ('Fecha Inicio', Rental.start_date),
+        ('Fecha Fin', Rental.end_date),
+        ('Fecha Devolución', Rental.actual_return_date),
+        ('Estado', Rental.status),
+        ('Período', Rental.rental_period),
+        ('Precio', Rental.rental_price),
+        ('Depósito', Rental.deposit),
+        ('Costo Total', Rental.total_cost),
+        ('Pagado', Rental.paid_amount),
+        ('Saldo', Rental.balance),
+        ('Creado Por', creator.full_name),
+    ])
+    export.statement = export.statement.select_from(Rental).outerjoin(
+        models.Client, Rental.client_id == models.Client.id
+    ).outerjoin(
+        models.Product, Rental.product_id == models.Product.id
+    ).outerjoin(
+        creator, Rental.created_by == creator.id
+    ).order_by(Rental.created_at, Rental.id)
+    return export.filter(Rental, organization_id, Rental.start_date, start_date, end_date)
+
+
+def inventory_movements_export(organization_id: Optional[int], start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None) -> ExportQuery:
+    Movement = models.InventoryMovement
+    export = ExportQuery("movimientos_inventario", "Movimientos", [
+        ('Fecha', Movement.created_at),
+        ('SKU', models.Product.sku),
+        ('Producto', models.Product.name),
+        ('Tipo', Movement.movement_type),
+        ('Cantidad', Movement.quantity),
+        ('Stock Anterior', Movement.previous_stock),
+        ('Stock Nuevo', Movement.new_stock),
+        ('Referencia', Movement.reference_type),
+        ('ID Referencia', Movement.reference_id),
+        ('Motivo', Movement.reason),
+        ('Usuario', models.User.full_name),
+    ])
+    # Orden por (created_at, id): recorre ix_inventory_movements_org_created_id
+    export.statement = export.statement.select_from(Movement).outerjoin(
+        models.Product, Movement.product_id == models.Product.id
+    ).outerjoin(
+        models.User, Movement.user_id == models.User.id
+    ).order_by(Movement.created_at, Movement.id)
+    return export.filter(Movement, organization_id, Movement.created_at, start_date, end_date)
+
+
+def iter_export_rows(db: Session, export: ExportQuery, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+    """Recorre las filas de la exportación por lotes de `batch_size`"""
+    result = db.execute(export.statement.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
@@ -1,8 +1,19 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, inspect, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
 from typing import List, Optional
 from . import models_extended as models
 from . import schemas_extended as schemas
+from .timezone_utils import get_rd_now
+
+# Índice único parcial de la notificación vigente por clave: destino del ON CONFLICT
+LIVE_KEY_INDEX = "uq_notifications_org_key_live"
+
+# create_all lo crea en bases nuevas; ensure_notification_index lo crea en las
+# existentes y, si no puede, el generador vuelve a guardar clave por clave
+_upsert_available = True
 
 
 def get_notifications(
@@ -44,7 +55,11 @@ def create_notification(db: Session, notification: schemas.NotificationCreate, o
         user_id=user_id
     )
     db.add(db_notification)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"Ya existe una notificación vigente con la clave '{notification.notification_key}'")
     db.refresh(db_notification)
     return db_notification
 
@@ -123,6 +138,137 @@ def get_or_create_notification(db: Session, notification_key: str, organization_
     return create_notification(db, notification_data, organization_id)
 
 
+def remove_duplicate_live_notifications(db: Session) -> int:
+    """
+    Marca como eliminadas las notificaciones vigentes duplicadas (misma
+    organización y clave), conservando la más reciente. Confirma la transacción.
+    """
+    Notification = models.Notification
+    keep_ids = db.query(func.max(Notification.id)).filter(
+        Notification.is_deleted == False
+    ).group_by(
+        Notification.organization_id,
+        Notification.notification_key
+    )
+    duplicates = db.query(Notification).filter(
+        Notification.is_deleted == False,
+        Notification.organization_id.isnot(None),
+        Notification.id.notin_(keep_ids)
+    ).update({"is_deleted": True}, synchronize_session=False)
+    db.commit()
+    return duplicates
+
+
+def create_live_key_index(engine) -> None:
+    """Crea el índice único parcial si no existe (CONCURRENTLY en PostgreSQL)"""
+    index = next(ix for ix in models.Notification.__table__.indexes if ix.name == LIVE_KEY_INDEX)
+    if engine.dialect.name == "postgresql":
+        index.dialect_kwargs["postgresql_concurrently"] = True
+
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def ensure_notification_index(engine) -> None:
+    """
+    Crea el índice único de notificaciones vigentes en bases existentes, después
+    de eliminar los duplicados que lo impedirían. Si no se puede, upsert_notifications
+    guarda clave por clave con get_or_create_notification.
+    """
+    global _upsert_available
+
+    indexes = inspect(engine).get_indexes(models.Notification.__tablename__)
+    if any(index["name"] == LIVE_KEY_INDEX for index in indexes):
+        _upsert_available = True
+        return
+
+    db = Session(bind=engine)
+    try:
+        duplicates = remove_duplicate_live_notifications(db)
+        if duplicates:
+            print(f"Notificaciones duplicadas marcadas como eliminadas: {duplicates}")
+        create_live_key_index(engine)
+        _upsert_available = True
+    except Exception as e:
+        db.rollback()
+        _upsert_available = False
+        print(f"⚠️ No se pudo crear {LIVE_KEY_INDEX}, las notificaciones se guardarán clave por clave: {e}")
+    finally:
+        db.close()
+
+
+def upsert_notifications(db: Session, organization_id: int, notifications: List[schemas.NotificationCreate]) -> int:
+    """
+    Crea o actualiza todas las notificaciones generadas de una organización.
+    Una consulta lee el título y mensaje de las notificaciones vigentes (no
+    eliminadas) de esas claves; si nada cambió no se escribe ni se confirma
+    nada. Las nuevas o cambiadas se guardan en una sola sentencia: INSERT ...
+    ON CONFLICT sobre la notificación vigente de cada clave, por si otro
+    proceso la escribió entre la lectura y la escritura. Las leídas conservan
+    is_read, igual que antes; una eliminada ya no es la vigente, así que se
+    vuelve a crear. Devuelve la cantidad de filas insertadas o actualizadas.
+    """
+    if not notifications:
+        return 0
+    
+    current = {
+        row.notification_key: (row.title, row.message)
+        for row in db.query(
+            models.Notification.notification_key,
+            models.Notification.title,
+            models.Notification.message
+        ).filter(
+            models.Notification.organization_id == organization_id,
+            models.Notification.notification_key.in_([n.notification_key for n in notifications]),
+            models.Notification.is_deleted == False
+        )
+    }
+    notifications = [
+        n for n in notifications
+        if current.get(n.notification_key) != (n.title, n.message)
+    ]
+    if not notifications:
+        return 0
+    
+    if not _upsert_available:
+        for notification in notifications:
+            get_or_create_notification(db, notification.notification_key, organization_id, notification)
+        return len(notifications)
+    
+    timestamp = get_rd_now()
+    rows = [
+        {
+            **notification.model_dump(),
+            "organization_id": organization_id,
+            "is_read": False,
+            "is_deleted": False,
+            "created_at": timestamp,
+            "updated_at": timestamp,
+        }
+        for notification in notifications
+    ]
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(models.Notification).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["organization_id", "notification_key"],
+        index_where=models.Notification.is_deleted == False,
+        set_={
+            "title": statement.excluded.title,
+            "message": statement.excluded.message,
+            "updated_at": statement.excluded.updated_at,
+        },
+        # Si otro proceso ya escribió el mismo contenido, no se reescribe
+        where=or_(
+            models.Notification.title != statement.excluded.title,
+            models.Notification.message != statement.excluded.message
+        )
+    )
+    written = db.execute(statement).rowcount
+    db.commit()
+    return written
+
+
 def get_unread_count(db: Session, organization_id: int, user_id: Optional[int] = None) -> int:
     """Obtiene el número de notificaciones no leídas"""
     query = db.query(models.Notification).filter(
@@ -2,15 +2,17 @@
 CRUD operations para organizaciones (Sistema SaaS)
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, delete, select, update, or_
+from sqlalchemy.sql import Executable
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import secrets
 import re
 
 from .models_organization import Organization, OrganizationStatus, SubscriptionPlan, OrganizationInvitation
 from . import schemas_organization as schemas
-from .auth import get_password_hash
+from .auth import get_password_hash, invalidate_organization_principals
+from .token_revocation import bump_token_version
 
 
 def generate_slug(name: str) -> str:
@@ -187,6 +189,7 @@ def approve_organization(
         db_org.notes = approval.notes
     
     db.commit()
+    invalidate_organization_principals(organization_id)
     db.refresh(db_org)
     return db_org
 
@@ -203,12 +206,14 @@ def suspend_organization(db: Session, organization_id: int, notes: str = None):
     if notes:
         db_org.notes = notes
     
-    # Desactivar usuarios
+    # Desactivar usuarios y cerrar sus sesiones
     users = db.query(User).filter(User.organization_id == organization_id).all()
     for user in users:
         user.is_active = False
+    bump_token_version(db, organization_id=organization_id)
     
     db.commit()
+    invalidate_organization_principals(organization_id)
     db.refresh(db_org)
     return db_org
 
@@ -229,107 +234,140 @@ def reactivate_organization(db: Session, organization_id: int):
         user.is_active = True
     
     db.commit()
+    invalidate_organization_principals(organization_id)
     db.refresh(db_org)
     return db_org
 
 
-def delete_organization(db: Session, organization_id: int):
+# ==================== RESET Y ELIMINACIÓN ====================
+# Todo se borra con DELETE ... WHERE parent_id IN (SELECT ...) por conjunto, en
+# orden de dependencias, y se confirma paso a paso: cada paso deja las foreign
+# keys consistentes, así que una ejecución interrumpida se puede repetir.
+
+def _owned(model, organization_id: Optional[int]):
+    """Registros de la organización o, con None, los que no tienen organización"""
+    if organization_id is None:
+        return model.organization_id.is_(None)
+    return model.organization_id == organization_id
+
+
+def _delete_children(child, parent_column, parent, organization_id: Optional[int]):
+    return delete(child).where(parent_column.in_(
+        select(parent.id).where(_owned(parent, organization_id))
+    ))
+
+
+def business_data_steps(organization_id: Optional[int]) -> List[Tuple[str, Executable]]:
+    """
+    DELETEs de los datos de negocio de una organización (None = registros sin
+    organización) en orden de dependencias. Los totales diarios y rankings
+    también se eliminan: los DELETE por conjunto no pasan por los listeners
+    del flush que los mantienen.
+    """
+    from . import models_extended as models
+
+    aggregate_org = organization_id or 0  # daily_rollups y rankings usan 0 = sin organización
+    return [
+        ("movements", delete(models.InventoryMovement).where(_owned(models.InventoryMovement, organization_id))),
+        ("sale_items", _delete_children(models.SaleItem, models.SaleItem.sale_id, models.Sale, organization_id)),
+        ("payments", _delete_children(models.Payment, models.Payment.sale_id, models.Sale, organization_id)),
+        ("sales", delete(models.Sale).where(_owned(models.Sale, organization_id))),
+        ("rental_items", _delete_children(models.RentalItem, models.RentalItem.rental_id, models.Rental, organization_id)),
+        ("rental_payments", _delete_children(models.RentalPayment, models.RentalPayment.rental_id, models.Rental, organization_id)),
+        ("rentals", delete(models.Rental).where(_owned(models.Rental, organization_id))),
+        ("quotation_items", _delete_children(models.QuotationItem, models.QuotationItem.quotation_id, models.Quotation, organization_id)),
+        ("quotations", delete(models.Quotation).where(_owned(models.Quotation, organization_id))),
+        ("daily_rollups", delete(models.DailyRollup).where(models.DailyRollup.organization_id == aggregate_org)),
+        ("product_leaderboard", delete(models.ProductLeaderboard).where(models.ProductLeaderboard.organization_id == aggregate_org)),
+        ("client_leaderboard", delete(models.ClientLeaderboard).where(models.ClientLeaderboard.organization_id == aggregate_org)),
+        ("products", delete(models.Product).where(_owned(models.Product, organization_id))),
+        ("clients", delete(models.Client).where(_owned(models.Client, organization_id))),
+        ("categories", delete(models.Category).where(_owned(models.Category, organization_id))),
+        ("suppliers", delete(models.Supplier).where(_owned(models.Supplier, organization_id))),
+    ]
+
+
+def run_data_steps(
+    db: Session,
+    steps: List[Tuple[Optional[str], str, Executable]],
+    on_step: Optional[Callable] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Ejecuta los pasos (grupo, nombre, sentencia) con un commit por paso.
+    on_step(nombre, hechos, total, conteos) se llama antes de cada commit,
+    así el progreso que guarde se confirma junto con el paso.
+    """
+    counts: Dict[str, Dict[str, int]] = {}
+    for done, (group, name, statement) in enumerate(steps, start=1):
+        affected = db.execute(statement, execution_options={"synchronize_session": False}).rowcount
+        if group:
+            counts.setdefault(group, {})[name] = affected
+        if on_step:
+            on_step(name, done, len(steps), counts)
+        db.commit()
+        print(f"   ✓ {name}: {affected}")
+    return counts
+
+
+def reset_organization_data(db: Session, organization_id: int, on_step: Optional[Callable] = None):
+    """
+    Elimina los datos de negocio de la organización y los registros huérfanos
+    (sin organización), y resetea las metas del dashboard.
+    MANTIENE: la organización, usuarios y configuraciones básicas
+    """
+    print(f"Iniciando reset para organización {organization_id}")
+    steps = [("deleted_counts", name, statement) for name, statement in business_data_steps(organization_id)]
+    steps += [("orphan_counts", name, statement) for name, statement in business_data_steps(None)]
+    steps.append((None, "dashboard_settings", update(Organization).where(
+        Organization.id == organization_id
+    ).values(monthly_sales_goal=0, monthly_growth_target=0, conversion_rate_target=0)))
+
+    counts = run_data_steps(db, steps, on_step)
+    print(f"✅ Reset de la organización {organization_id} completado")
+    return counts
+
+
+def delete_organization(db: Session, organization_id: int, on_step: Optional[Callable] = None):
     """
     Elimina una organización y TODOS sus datos relacionados
     ⚠️ ACCIÓN DESTRUCTIVA - Elimina TODO
+    Devuelve los registros eliminados por paso, o None si no existe.
     """
-    from .models_extended import User, Client, Product, Sale, Rental, Quotation, Category, Supplier
-    
+    from .models_extended import User, Notification, SystemFailure, DocumentSequence
+
     db_org = get_organization(db, organization_id)
     if not db_org:
         return None
-    
-    try:
-        # Eliminar TODOS los datos relacionados en orden
-        print(f"🗑️  Eliminando organización: {db_org.name} (ID: {organization_id})")
-        
-        from sqlalchemy import text
-        
-        # 1. Eliminar items de alquileres primero (FK constraint)
-        try:
-            db.execute(
-                text("DELETE FROM rental_items WHERE rental_id IN (SELECT id FROM rentals WHERE organization_id = :org_id)"),
-                {"org_id": organization_id}
-            )
-            db.execute(
-                text("DELETE FROM rental_payments WHERE rental_id IN (SELECT id FROM rentals WHERE organization_id = :org_id)"),
-                {"org_id": organization_id}
-            )
-            print(f"   ✓ Items y pagos de alquileres eliminados")
-        except Exception as e:
-            print(f"   ⚠ Error eliminando items de alquileres: {e}")
-        
-        # 2. Eliminar items de ventas (FK constraint)
-        try:
-            db.execute(
-                text("DELETE FROM sale_items WHERE sale_id IN (SELECT id FROM sales WHERE organization_id = :org_id)"),
-                {"org_id": organization_id}
-            )
-            print(f"   ✓ Items de ventas eliminados")
-        except Exception as e:
-            print(f"   ⚠ Error eliminando items de ventas: {e}")
-        
-        # 3. Eliminar items de cotizaciones (FK constraint)
-        try:
-            db.execute(
-                text("DELETE FROM quotation_items WHERE quotation_id IN (SELECT id FROM quotations WHERE organization_id = :org_id)"),
-                {"org_id": organization_id}
-            )
-            print(f"   ✓ Items de cotizaciones eliminados")
-        except Exception as e:
-            print(f"   ⚠ Error eliminando items de cotizaciones: {e}")
-        
-        # 4. Eliminar alquileres
-        rentals_count = db.query(Rental).filter(Rental.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Alquileres eliminados: {rentals_count}")
-        
-        # 5. Eliminar ventas
-        sales_count = db.query(Sale).filter(Sale.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Ventas eliminadas: {sales_count}")
-        
-        # 6. Eliminar cotizaciones
-        quotations_count = db.query(Quotation).filter(Quotation.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Cotizaciones eliminadas: {quotations_count}")
-        
-        # 7. Eliminar productos
-        products_count = db.query(Product).filter(Product.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Productos eliminados: {products_count}")
-        
-        # 8. Eliminar categorías
-        categories_count = db.query(Category).filter(Category.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Categorías eliminadas: {categories_count}")
-        
-        # 9. Eliminar proveedores
-        suppliers_count = db.query(Supplier).filter(Supplier.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Proveedores eliminados: {suppliers_count}")
-        
-        # 10. Eliminar clientes
-        clients_count = db.query(Client).filter(Client.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Clientes eliminados: {clients_count}")
-        
-        # 11. Eliminar usuarios
-        users_count = db.query(User).filter(User.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"   ✓ Usuarios eliminados: {users_count}")
-        
-        # 12. Finalmente, eliminar la organización
-        db.delete(db_org)
-        db.commit()
-        
-        print(f"✅ Organización '{db_org.name}' eliminada completamente")
-        
-        return db_org
-        
-    except Exception as e:
-        print(f"❌ Error al eliminar organización: {e}")
-        import traceback
-        traceback.print_exc()
-        db.rollback()
-        raise e
+
+    print(f"🗑️  Eliminando organización: {db_org.name} (ID: {organization_id})")
+    org_user_ids = select(User.id).where(User.organization_id == organization_id)
+    steps = [("deleted_counts", name, statement) for name, statement in business_data_steps(organization_id)]
+    steps += [
+        ("deleted_counts", "notifications", delete(Notification).where(or_(
+            Notification.organization_id == organization_id,
+            Notification.user_id.in_(org_user_ids)
+        ))),
+        ("deleted_counts", "document_sequences", delete(DocumentSequence).where(DocumentSequence.organization_id == organization_id)),
+        ("deleted_counts", "invitations", delete(OrganizationInvitation).where(OrganizationInvitation.organization_id == organization_id)),
+        # El registro de fallas se conserva, desvinculado de la organización y sus usuarios
+        ("detached_counts", "system_failures", update(SystemFailure).where(
+            SystemFailure.organization_id == organization_id
+        ).values(organization_id=None)),
+        ("detached_counts", "system_failure_users", update(SystemFailure).where(
+            SystemFailure.user_id.in_(org_user_ids)
+        ).values(user_id=None)),
+        ("detached_counts", "system_failure_resolvers", update(SystemFailure).where(
+            SystemFailure.resolved_by.in_(org_user_ids)
+        ).values(resolved_by=None)),
+        ("deleted_counts", "users", delete(User).where(User.organization_id == organization_id)),
+        ("deleted_counts", "organization", delete(Organization).where(Organization.id == organization_id)),
+    ]
+    db.expunge(db_org)  # La fila se elimina por sentencia, no por el cascade del ORM
+
+    counts = run_data_steps(db, steps, on_step)
+    invalidate_organization_principals(organization_id)
+    print(f"✅ Organización '{db_org.name}' eliminada completamente")
+    return counts
 
 
 def get_organization_stats(db: Session, organization_id: int):
@@ -1,69 +1,25 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, update
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from . import models_extended as models, schemas_extended as schemas
+from .auth import Principal, resolve_user
+from .cache import invalidate_organization
+from .crud_sequences import next_document_number
+from .pagination import paginate
+from .loaders import QUOTATION_LOADERS
 
 
 def generate_quotation_number(db: Session, organization_id: int = None) -> str:
     """Genera un número de cotización único e infinito por organización (COT-YYYYMMDD-01, 02, 03...)"""
-    today = datetime.now()
-    prefix = f"COT-{today.year}{today.month:02d}{today.day:02d}"
-    
-    # Construir query base - buscar TODAS las cotizaciones (no solo del mes actual)
-    query = db.query(models.Quotation).filter(
-        models.Quotation.quotation_number.like("COT-%")
-    )
-    
-    # Filtrar por organización si se proporciona
-    if organization_id:
-        query = query.filter(models.Quotation.organization_id == organization_id)
-    
-    # Obtener todas las cotizaciones para encontrar el número más alto
-    quotations = query.all()
-    
-    if quotations:
-        # Extraer todos los números (última parte después del último guión)
-        numbers = []
-        for quotation in quotations:
-            try:
-                # Extraer el número después del último guión
-                num = int(quotation.quotation_number.split('-')[-1])
-                numbers.append(num)
-            except (ValueError, IndexError):
-                continue
-        
-        new_number = max(numbers) + 1 if numbers else 1
-    else:
-        new_number = 1
-    
-    # Formato: 01, 02, 03... 99, 100, 101... (sin límite)
-    candidate = f"{prefix}-{new_number:02d}"
-    
-    # Verificar que no exista (por seguridad adicional)
-    existing = db.query(models.Quotation).filter(
-        models.Quotation.quotation_number == candidate,
-        models.Quotation.organization_id == organization_id
-    ).first()
-    
-    if existing:
-        # Si existe, incrementar hasta encontrar uno libre
-        while existing:
-            new_number += 1
-            candidate = f"{prefix}-{new_number:02d}"
-            existing = db.query(models.Quotation).filter(
-                models.Quotation.quotation_number == candidate,
-                models.Quotation.organization_id == organization_id
-            ).first()
-    
-    return candidate
+    return next_document_number(db, "COT", organization_id)
 
 
 def get_quotation(db: Session, quotation_id: int):
     from sqlalchemy.orm import joinedload
     return db.query(models.Quotation)\
         .join(models.Client, models.Quotation.client_id == models.Client.id, isouter=True)\
-        .options(joinedload(models.Quotation.sale), joinedload(models.Quotation.rental))\
+        .options(*QUOTATION_LOADERS, joinedload(models.Quotation.sale), joinedload(models.Quotation.rental))\
         .filter(models.Quotation.id == quotation_id)\
         .first()
 
@@ -76,11 +32,50 @@ def get_quotations(
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    organization_id: Optional[int] = None
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
 ):
-    # Hacer join con la tabla de clientes para incluir la información del cliente
-    query = db.query(models.Quotation).join(models.Client, models.Quotation.client_id == models.Client.id, isouter=True)
-    
+    # Hacer join con la tabla de clientes; el perfil carga cliente e items para serializar sin N+1
+    query = db.query(models.Quotation).join(models.Client, models.Quotation.client_id == models.Client.id, isouter=True)\
+        .options(*QUOTATION_LOADERS)
+    query = _filter_quotations(query, client_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Quotation, skip=skip, limit=limit, cursor=cursor).all()
+
+
+# Columnas del listado resumido (schemas.QuotationSummary)
+QUOTATION_SUMMARY_COLUMNS = (
+    models.Quotation.id,
+    models.Quotation.quotation_number,
+    models.Quotation.quotation_type,
+    models.Quotation.client_id,
+    models.Client.name.label("client_name"),
+    models.Quotation.quotation_date,
+    models.Quotation.valid_until,
+    models.Quotation.status,
+    models.Quotation.total,
+    models.Quotation.created_at,
+)
+
+
+def get_quotations_summary(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """Listado resumido: mismas filas y orden que get_quotations, solo las columnas de la tabla (sin entidades ni items)"""
+    query = db.query(*QUOTATION_SUMMARY_COLUMNS).select_from(models.Quotation)\
+        .join(models.Client, models.Quotation.client_id == models.Client.id, isouter=True)
+    query = _filter_quotations(query, client_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Quotation, skip=skip, limit=limit, cursor=cursor).all()
+
+
+def _filter_quotations(query, client_id, status, start_date, end_date, organization_id):
     # Filtrar por organización (multi-tenant)
     if organization_id:
         query = query.filter(models.Quotation.organization_id == organization_id)
@@ -97,14 +92,15 @@ def get_quotations(
     if end_date:
         query = query.filter(models.Quotation.quotation_date <= end_date)
     
-    return query.order_by(desc(models.Quotation.created_at)).offset(skip).limit(limit).all()
+    return query
 
 
-def create_quotation(db: Session, quotation: schemas.QuotationCreate, user_id: int):
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+def create_quotation(db: Session, quotation: schemas.QuotationCreate, user: Union[int, Principal]):
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     # Generar número de cotización por organización
     quotation_number = generate_quotation_number(db, user.organization_id)
@@ -179,6 +175,7 @@ def create_quotation(db: Session, quotation: schemas.QuotationCreate, user_id: i
         db.add(db_item)
     
     db.commit()
+    invalidate_organization(user.organization_id)
     db.refresh(db_quotation)
     return db_quotation
 
@@ -272,6 +269,7 @@ def update_quotation(db: Session, quotation_id: int, quotation: schemas.Quotatio
             db.add(db_item)
     
     db.commit()
+    invalidate_organization(db_quotation.organization_id)
     db.refresh(db_quotation)
     return db_quotation
 
@@ -289,10 +287,11 @@ def delete_quotation(db: Session, quotation_id: int):
         # Si no ha sido convertida, permitir la eliminación
         db.delete(db_quotation)
         db.commit()
+        invalidate_organization(db_quotation.organization_id)
     return db_quotation
 
 
-def convert_quotation_to_sale(db: Session, quotation_id: int, user_id: int, payment_method: str):
+def convert_quotation_to_sale(db: Session, quotation_id: int, user: Union[int, Principal], payment_method: str):
     """Convierte una cotización en venta"""
     quotation = get_quotation(db, quotation_id)
     if not quotation or quotation.status != "aceptada":
@@ -301,16 +300,17 @@ def convert_quotation_to_sale(db: Session, quotation_id: int, user_id: int, paym
     # Importar función de ventas
     from .crud_sales import create_sale_from_quotation
     
-    sale = create_sale_from_quotation(db, quotation, user_id, payment_method)
+    sale = create_sale_from_quotation(db, quotation, user, payment_method)
     
     if sale:
         quotation.status = "convertida"
         db.commit()
+        invalidate_organization(quotation.organization_id)
     
     return sale
 
 
-def convert_quotation_to_rental(db: Session, quotation_id: int, user_id: int, rental_data: dict):
+def convert_quotation_to_rental(db: Session, quotation_id: int, user: Union[int, Principal], rental_data: dict):
     """Convierte una cotización de tipo alquiler en un alquiler"""
     quotation = get_quotation(db, quotation_id)
     if not quotation or quotation.status != "aceptada":
@@ -323,25 +323,45 @@ def convert_quotation_to_rental(db: Session, quotation_id: int, user_id: int, re
     # Importar función de alquileres
     from .crud_rentals import create_rental_from_quotation
     
-    rental = create_rental_from_quotation(db, quotation, user_id, rental_data)
+    rental = create_rental_from_quotation(db, quotation, user, rental_data)
     
     if rental:
         quotation.status = "convertida"
         db.commit()
+        invalidate_organization(quotation.organization_id)
     
     return rental
 
 
 def check_expired_quotations(db: Session):
     """Marca cotizaciones vencidas"""
-    today = datetime.now()
-    expired = db.query(models.Quotation).filter(
-        models.Quotation.status == "pendiente",
-        models.Quotation.valid_until < today
-    ).all()
-    
-    for quotation in expired:
-        quotation.status = "vencida"
-    
-    db.commit()
-    return len(expired)
+    return sum(mark_expired_quotations(db).values())
+
+
+def mark_expired_quotations(db: Session, organization_id: Optional[int] = None, now: Optional[datetime] = None) -> Dict[Optional[int], int]:
+    """
+    Marca como vencidas las cotizaciones pendientes cuya validez ya pasó, con
+    un UPDATE por organización (un commit por cada una). Devuelve
+    {organization_id: cotizaciones marcadas}.
+    """
+    now = now or datetime.now()
+    due = [models.Quotation.status == "pendiente", models.Quotation.valid_until < now]
+    
+    # Sin DISTINCT para que el filtro use el índice de vencimiento; se deduplica aquí
+    organizations = db.query(models.Quotation.organization_id).filter(*due)
+    if organization_id:
+        organizations = organizations.filter(models.Quotation.organization_id == organization_id)
+    organization_ids = sorted({org_id for (org_id,) in organizations.all()}, key=lambda org_id: org_id or 0)
+    
+    marked = {}
+    for org_id in organization_ids:
+        tenant = models.Quotation.organization_id == org_id if org_id is not None else models.Quotation.organization_id.is_(None)
+        result = db.execute(
+            update(models.Quotation).where(*due, tenant).values(status="vencida"),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        if result.rowcount:
+            invalidate_organization(org_id)
+            marked[org_id] = result.rowcount
+    return marked
@@ -1,68 +1,149 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, insert, select, update
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from . import models_extended as models, schemas_extended as schemas
+from .auth import Principal, resolve_user
+from .cache import invalidate_organization
+from .crud_sequences import next_document_number
+from .crud import get_products_by_ids, apply_stock_deltas
+from .pagination import paginate
+from .loaders import RENTAL_LOADERS
+from . import rollups  # registra el mantenimiento de daily_rollups en el flush
 
 
 def generate_rental_number(db: Session, organization_id: int = None) -> str:
     """Genera un número de alquiler único e infinito por organización (ALQ-YYYYMMDD-01, 02, 03...)"""
-    today = datetime.now()
-    prefix = f"ALQ-{today.year}{today.month:02d}{today.day:02d}"
-    
-    # Construir query base - buscar TODOS los alquileres
-    query = db.query(models.Rental).filter(
-        models.Rental.rental_number.like("ALQ-%")
-    )
-    
-    # Filtrar por organización si se proporciona
-    if organization_id:
-        query = query.filter(models.Rental.organization_id == organization_id)
-    
-    # Obtener todos los alquileres para encontrar el número más alto
-    rentals = query.all()
-    
-    if rentals:
-        # Extraer todos los números
-        numbers = []
-        for rental in rentals:
-            try:
-                num = int(rental.rental_number.split('-')[-1])
-                numbers.append(num)
-            except (ValueError, IndexError):
-                continue
+    return next_document_number(db, "ALQ", organization_id)
+
+
+# ============ STOCK DE ALQUILERES (operaciones en lote) ============
+
+def load_rental_products(db: Session, lines: List[Tuple[int, int]]) -> Dict[int, models.Product]:
+    """
+    Carga en una sola consulta todos los productos de un alquiler.
+    lines es una lista de (product_id, cantidad). Las filas quedan bloqueadas
+    (FOR UPDATE en PostgreSQL) hasta el commit.
+    """
+    return get_products_by_ids(db, [product_id for product_id, _ in lines], for_update=True)
+
+
+def validate_rental_availability(products: Dict[int, models.Product], lines: List[Tuple[int, int]]) -> None:
+    """Verifica que cada producto exista, se pueda alquilar y tenga stock disponible"""
+    for product_id, quantity in lines:
+        product = products.get(product_id)
+        if not product:
+            raise ValueError(f"Producto {product_id} no encontrado")
         
-        new_number = max(numbers) + 1 if numbers else 1
-    else:
-        new_number = 1
-    
-    # Formato: 01, 02, 03... 99, 100, 101... (sin límite)
-    candidate = f"{prefix}-{new_number:02d}"
-    
-    # Verificar que no exista
-    existing = db.query(models.Rental).filter(
-        models.Rental.rental_number == candidate,
-        models.Rental.organization_id == organization_id
-    ).first()
-    
-    if existing:
-        while existing:
-            new_number += 1
-            candidate = f"{prefix}-{new_number:02d}"
-            existing = db.query(models.Rental).filter(
-                models.Rental.rental_number == candidate,
-                models.Rental.organization_id == organization_id
-            ).first()
+        if product.product_type not in ["alquiler", "ambos"]:
+            raise ValueError(f"El producto {product.name} no está disponible para alquiler")
+        
+        if product.stock_available < quantity:
+            raise ValueError(f"No hay suficiente stock de {product.name}. Disponible: {product.stock_available}, Solicitado: {quantity}")
+
+
+def insert_rental_items(
+    db: Session,
+    rental: models.Rental,
+    products: Dict[int, models.Product],
+    items: List[dict],
+    days: int
+) -> None:
+    """Inserta todos los items del alquiler con un solo INSERT (executemany)"""
+    if not items:
+        return
+    
+    rows = []
+    for item in items:
+        product = products.get(item['product_id'])
+        rows.append({
+            "rental_id": rental.id,
+            "product_id": item['product_id'],
+            "product_name": product.name if product else None,  # Guardar nombre del producto
+            "quantity": item['quantity'],
+            "rental_days": days,
+            "unit_price": item['unit_price'],
+            "organization_id": rental.organization_id
+        })
+    db.execute(insert(models.RentalItem), rows)
+
+
+def move_rental_stock(
+    db: Session,
+    rental: models.Rental,
+    products: Dict[int, models.Product],
+    lines: List[Tuple[int, int]],
+    direction: int,
+    movement_type: str,
+    reason: Callable[[models.Product], str],
+    user_id: int,
+    organization_id: Optional[int]
+) -> None:
+    """
+    Descuenta (direction=-1, alquiler) o devuelve (direction=1, devolución /
+    cancelación) el stock_available de todas las líneas del alquiler. Los
+    productos tipo "ambos" también mueven stock. Registra un movimiento de
+    inventario por línea con el stock anterior/nuevo calculado en memoria, y
+    escribe todo con un INSERT y un UPDATE. Las líneas cuyo producto ya no
+    existe se ignoran.
+    """
+    movements = []
+    available_deltas = {}
+    stock_deltas = {}
+    current_available = {product_id: product.stock_available for product_id, product in products.items()}
+    
+    for product_id, quantity in lines:
+        product = products.get(product_id)
+        if not product:
+            continue
+        
+        delta = direction * quantity
+        previous_stock = current_available[product_id]
+        current_available[product_id] = previous_stock + delta
+        available_deltas[product_id] = available_deltas.get(product_id, 0) + delta
+        
+        # Si el producto es tipo "ambos", también mover stock
+        if product.product_type == "ambos":
+            stock_deltas[product_id] = stock_deltas.get(product_id, 0) + delta
+        
+        movements.append({
+            "product_id": product_id,
+            "user_id": user_id,
+            "movement_type": movement_type,
+            "quantity": quantity,
+            "previous_stock": previous_stock,
+            "new_stock": current_available[product_id],
+            "reference_type": "rental",
+            "reference_id": rental.id,
+            "reason": reason(product),
+            "organization_id": organization_id
+        })
     
-    return candidate
+    if movements:
+        db.execute(insert(models.InventoryMovement), movements)
+    apply_stock_deltas(db, stock_deltas, available_deltas)
 
 
-def get_rental(db: Session, rental_id: int):
+def rental_stock_lines(rental: models.Rental) -> List[Tuple[int, int]]:
+    """Líneas (product_id, cantidad) de un alquiler: sus items o el producto único del formato antiguo"""
+    if rental.items and len(rental.items) > 0:
+        return [(item.product_id, item.quantity) for item in rental.items]
+    if rental.product_id:
+        return [(rental.product_id, 1)]
+    return []
+
+
+def _rentals_query(db: Session):
+    """Alquileres con cliente y producto unidos por JOIN y el perfil de carga de schemas.Rental"""
     return db.query(models.Rental).join(
         models.Client, models.Rental.client_id == models.Client.id, isouter=True
     ).join(
         models.Product, models.Rental.product_id == models.Product.id, isouter=True
-    ).filter(models.Rental.id == rental_id).first()
+    ).options(*RENTAL_LOADERS)
+
+
+def get_rental(db: Session, rental_id: int):
+    return _rentals_query(db).filter(models.Rental.id == rental_id).first()
 
 
 def get_rentals(
@@ -74,15 +155,51 @@ def get_rentals(
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    organization_id: Optional[int] = None
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
 ):
     # Hacer join con las tablas de clientes y productos para incluir toda la información
-    query = db.query(models.Rental).join(
-        models.Client, models.Rental.client_id == models.Client.id, isouter=True
-    ).join(
-        models.Product, models.Rental.product_id == models.Product.id, isouter=True
-    )
-    
+    query = _rentals_query(db)
+    query = _filter_rentals(query, client_id, product_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Rental, skip=skip, limit=limit, cursor=cursor).all()
+
+
+# Columnas del listado resumido (schemas.RentalSummary)
+RENTAL_SUMMARY_COLUMNS = (
+    models.Rental.id,
+    models.Rental.rental_number,
+    models.Rental.client_id,
+    models.Client.name.label("client_name"),
+    models.Rental.start_date,
+    models.Rental.end_date,
+    models.Rental.status,
+    models.Rental.total_cost,
+    models.Rental.balance,
+    models.Rental.payment_status,
+    models.Rental.created_at,
+)
+
+
+def get_rentals_summary(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    client_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """Listado resumido: mismas filas y orden que get_rentals, solo las columnas de la tabla (sin entidades, items ni pagos)"""
+    query = db.query(*RENTAL_SUMMARY_COLUMNS).select_from(models.Rental)\
+        .join(models.Client, models.Rental.client_id == models.Client.id, isouter=True)
+    query = _filter_rentals(query, client_id, product_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Rental, skip=skip, limit=limit, cursor=cursor).all()
+
+
+def _filter_rentals(query, client_id, product_id, status, start_date, end_date, organization_id):
     # Filtrar por organización (multi-tenant)
     if organization_id:
         query = query.filter(models.Rental.organization_id == organization_id)
@@ -102,14 +219,15 @@ def get_rentals(
     if end_date:
         query = query.filter(models.Rental.start_date <= end_date)
     
-    return query.order_by(desc(models.Rental.created_at)).offset(skip).limit(limit).all()
+    return query
 
 
-def create_rental(db: Session, rental: schemas.RentalCreate, user_id: int):
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+def create_rental(db: Session, rental: schemas.RentalCreate, user: Union[int, Principal]):
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     # Calcular días
     days = (rental.end_date - rental.start_date).days
@@ -119,17 +237,10 @@ def create_rental(db: Session, rental: schemas.RentalCreate, user_id: int):
     # Verificar si tiene items (nuevo formato) o product_id (formato antiguo)
     if rental.items and len(rental.items) > 0:
         # NUEVO: Múltiples items
-        # Verificar disponibilidad de todos los productos
-        for item in rental.items:
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            if not product:
-                raise ValueError(f"Producto {item.product_id} no encontrado")
-            
-            if product.product_type not in ["alquiler", "ambos"]:
-                raise ValueError(f"El producto {product.name} no está disponible para alquiler")
-            
-            if product.stock_available < item.quantity:
-                raise ValueError(f"No hay suficiente stock de {product.name}. Disponible: {product.stock_available}, Solicitado: {item.quantity}")
+        # Verificar disponibilidad de todos los productos (una sola consulta)
+        lines = [(item.product_id, item.quantity) for item in rental.items]
+        products = load_rental_products(db, lines)
+        validate_rental_availability(products, lines)
         
         # Generar número de alquiler
         rental_number = generate_rental_number(db, user.organization_id)
@@ -187,45 +298,18 @@ def create_rental(db: Session, rental: schemas.RentalCreate, user_id: int):
         db.flush()
         
         # Crear items del alquiler y actualizar stock
-        for item in rental.items:
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            
-            # Crear item del alquiler
-            db_item = models.RentalItem(
-                rental_id=db_rental.id,
-                product_id=item.product_id,
-                product_name=product.name if product else None,  # Guardar nombre del producto
-                quantity=item.quantity,
-                rental_days=days,
-                unit_price=item.unit_price,
-                organization_id=user.organization_id
-            )
-            db.add(db_item)
-            
-            # Actualizar stock
-            previous_stock = product.stock_available
-            product.stock_available -= item.quantity
-            
-            # Si el producto es tipo "ambos", también actualizar stock
-            if product.product_type == "ambos":
-                product.stock -= item.quantity
-            
-            # Registrar movimiento de inventario
-            movement = models.InventoryMovement(
-                product_id=product.id,
-                user_id=user_id,
-                movement_type="alquiler",
-                quantity=item.quantity,
-                previous_stock=previous_stock,
-                new_stock=product.stock_available,
-                reference_type="rental",
-                reference_id=db_rental.id,
-                reason=f"Alquiler {rental_number}",
-                organization_id=user.organization_id
-            )
-            db.add(movement)
+        insert_rental_items(db, db_rental, products, [item.model_dump() for item in rental.items], days)
+        move_rental_stock(
+            db, db_rental, products, lines,
+            direction=-1,
+            movement_type="alquiler",
+            reason=lambda product: f"Alquiler {rental_number}",
+            user_id=user_id,
+            organization_id=user.organization_id
+        )
         
         db.commit()
+        invalidate_organization(user.organization_id)
         db.refresh(db_rental)
         return db_rental
         
@@ -298,39 +382,28 @@ def create_rental(db: Session, rental: schemas.RentalCreate, user_id: int):
         db.flush()
         
         # Actualizar stock disponible del producto
-        previous_stock = product.stock_available
-        product.stock_available -= 1
-        
-        # Si el producto es tipo "ambos", también actualizar stock
-        if product.product_type == "ambos":
-            product.stock -= 1
-        
-        # Registrar movimiento de inventario
-        movement = models.InventoryMovement(
-            product_id=product.id,
-            user_id=user_id,
+        move_rental_stock(
+            db, db_rental, {product.id: product}, [(product.id, 1)],
+            direction=-1,
             movement_type="alquiler",
-            quantity=1,
-            previous_stock=previous_stock,
-            new_stock=product.stock_available,
-            reference_type="rental",
-            reference_id=db_rental.id,
-            reason=f"Alquiler {rental_number}",
+            reason=lambda product: f"Alquiler {rental_number}",
+            user_id=user_id,
             organization_id=user.organization_id
         )
-        db.add(movement)
         
         db.commit()
+        invalidate_organization(user.organization_id)
         db.refresh(db_rental)
         return db_rental
 
 
-def cancel_rental(db: Session, rental_id: int, user_id: int):
+def cancel_rental(db: Session, rental_id: int, user: Union[int, Principal]):
     """Cancela un alquiler y devuelve el stock"""
-    # Obtener el usuario
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     # Obtener el alquiler
     rental = db.query(models.Rental).filter(models.Rental.id == rental_id).first()
@@ -346,57 +419,16 @@ def cancel_rental(db: Session, rental_id: int, user_id: int):
         raise ValueError("El alquiler ya está cancelado")
     
     # Devolver stock de los items
-    if rental.items and len(rental.items) > 0:
-        # Nuevo formato: múltiples items
-        for item in rental.items:
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            if product:
-                previous_stock = product.stock_available
-                product.stock_available += item.quantity
-                
-                # Si el producto es tipo "ambos", también restaurar stock
-                if product.product_type == "ambos":
-                    product.stock += item.quantity
-                
-                # Registrar movimiento de inventario
-                movement = models.InventoryMovement(
-                    product_id=product.id,
-                    user_id=user_id,
-                    movement_type="cancelacion_alquiler",
-                    quantity=item.quantity,
-                    previous_stock=previous_stock,
-                    new_stock=product.stock_available,
-                    reference_type="rental",
-                    reference_id=rental.id,
-                    reason=f"Cancelación de alquiler {rental.rental_number}",
-                    organization_id=user.organization_id
-                )
-                db.add(movement)
-    elif rental.product_id:
-        # Formato antiguo: un solo producto
-        product = db.query(models.Product).filter(models.Product.id == rental.product_id).first()
-        if product:
-            previous_stock = product.stock_available
-            product.stock_available += 1
-            
-            # Si el producto es tipo "ambos", también restaurar stock
-            if product.product_type == "ambos":
-                product.stock += 1
-            
-            # Registrar movimiento de inventario
-            movement = models.InventoryMovement(
-                product_id=product.id,
-                user_id=user_id,
-                movement_type="cancelacion_alquiler",
-                quantity=1,
-                previous_stock=previous_stock,
-                new_stock=product.stock_available,
-                reference_type="rental",
-                reference_id=rental.id,
-                reason=f"Cancelación de alquiler {rental.rental_number}",
-                organization_id=user.organization_id
-            )
-            db.add(movement)
+    lines = rental_stock_lines(rental)
+    if lines:
+        move_rental_stock(
+            db, rental, load_rental_products(db, lines), lines,
+            direction=1,
+            movement_type="cancelacion_alquiler",
+            reason=lambda product: f"Cancelación de alquiler {rental.rental_number}",
+            user_id=user_id,
+            organization_id=user.organization_id
+        )
     
     # Cambiar estado a cancelado
     rental.status = "cancelado"
@@ -406,16 +438,18 @@ def cancel_rental(db: Session, rental_id: int, user_id: int):
     rental.payment_status = "cancelado"
     
     db.commit()
+    invalidate_organization(rental.organization_id)
     db.refresh(rental)
     return rental
 
 
-def add_rental_payment(db: Session, rental_id: int, payment: schemas.RentalPaymentCreate, user_id: int):
+def add_rental_payment(db: Session, rental_id: int, payment: schemas.RentalPaymentCreate, user: Union[int, Principal]):
     """Agrega un pago a un alquiler"""
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     # Verificar que el alquiler existe
     rental = db.query(models.Rental).filter(models.Rental.id == rental_id).first()
@@ -449,6 +483,7 @@ def add_rental_payment(db: Session, rental_id: int, payment: schemas.RentalPayme
         rental.payment_status = "pendiente_pago"
     
     db.commit()
+    invalidate_organization(rental.organization_id)
     db.refresh(rental)
     db.refresh(db_payment)
     
@@ -457,94 +492,81 @@ def add_rental_payment(db: Session, rental_id: int, payment: schemas.RentalPayme
 
 def update_rental_status_automatically(db: Session, organization_id: int = None):
     """Actualiza automáticamente el estado de los alquileres vencidos"""
-    from datetime import datetime
-    
-    query = db.query(models.Rental)
-    
+    marked = mark_overdue_rentals(db, organization_id)
+    return sum(marked.values())
+
+
+def mark_overdue_rentals(db: Session, organization_id: Optional[int] = None, now: Optional[datetime] = None) -> Dict[Optional[int], int]:
+    """
+    Marca como vencidos los alquileres activos cuya fecha de fin ya pasó, con
+    un UPDATE por organización (un commit por cada una). Devuelve
+    {organization_id: alquileres marcados}.
+    
+    El UPDATE no pasa por el ORM, así que los totales diarios se ajustan aquí:
+    se bloquean las filas, se resta su contribución, se actualizan y se vuelve
+    a sumar con el nuevo estado.
+    """
+    now = now or datetime.now()
+    due = [models.Rental.status == "activo", models.Rental.end_date < now]
+    
+    # Sin DISTINCT para que el filtro use el índice de vencimiento; se deduplica aquí
+    organizations = db.query(models.Rental.organization_id).filter(*due)
     if organization_id:
-        query = query.filter(models.Rental.organization_id == organization_id)
-    
-    # Buscar alquileres activos que ya pasaron su fecha de fin
-    expired_rentals = query.filter(
-        models.Rental.status == "activo",
-        models.Rental.end_date < datetime.utcnow()
-    ).all()
-    
-    updated_count = 0
-    for rental in expired_rentals:
-        rental.status = "vencido"
-        updated_count += 1
-    
-    db.commit()
-    return updated_count
+        organizations = organizations.filter(models.Rental.organization_id == organization_id)
+    organization_ids = sorted({org_id for (org_id,) in organizations.all()}, key=lambda org_id: org_id or 0)
+    
+    marked = {}
+    for org_id in organization_ids:
+        tenant = models.Rental.organization_id == org_id if org_id is not None else models.Rental.organization_id.is_(None)
+        rental_ids = db.execute(
+            select(models.Rental.id).where(*due, tenant).with_for_update()
+        ).scalars().all()
+        if not rental_ids:
+            continue
+        
+        selected = models.Rental.id.in_(rental_ids)
+        rollups.apply_contributions(db.connection(), models.Rental, selected, -1)
+        db.execute(
+            update(models.Rental).where(selected).values(status="vencido"),
+            execution_options={"synchronize_session": False}
+        )
+        rollups.apply_contributions(db.connection(), models.Rental, selected, 1)
+        db.commit()
+        invalidate_organization(org_id)
+        marked[org_id] = len(rental_ids)
+    return marked
 
 
-def update_rental(db: Session, rental_id: int, rental: schemas.RentalUpdate, user_id: int):
+def update_rental(db: Session, rental_id: int, rental: schemas.RentalUpdate, user: Union[int, Principal]):
     db_rental = get_rental(db, rental_id)
     if not db_rental:
         return None
     
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     update_data = rental.model_dump(exclude_unset=True)
     
     # Si se marca como devuelto, actualizar stock
     if 'status' in update_data and update_data['status'] == 'devuelto' and db_rental.status != 'devuelto':
         # Verificar si tiene múltiples items o un solo producto
-        if db_rental.items and len(db_rental.items) > 0:
-            # NUEVO: Alquiler con múltiples items
-            for item in db_rental.items:
-                product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-                if product:
-                    previous_stock = product.stock_available
-                    product.stock_available += item.quantity
-                    
-                    # Si el producto es tipo "ambos", también restaurar stock
-                    if product.product_type == "ambos":
-                        product.stock += item.quantity
-                    
-                    # Registrar movimiento de devolución
-                    movement = models.InventoryMovement(
-                        product_id=product.id,
-                        user_id=user_id,
-                        movement_type="devolucion",
-                        quantity=item.quantity,
-                        previous_stock=previous_stock,
-                        new_stock=product.stock_available,
-                        reference_type="rental",
-                        reference_id=db_rental.id,
-                        reason=f"Devolución de alquiler {db_rental.rental_number} - {product.name}",
-                        organization_id=user.organization_id
-                    )
-                    db.add(movement)
-        elif db_rental.product_id:
-            # ANTIGUO: Alquiler con un solo producto
-            product = db.query(models.Product).filter(models.Product.id == db_rental.product_id).first()
-            if product:
-                previous_stock = product.stock_available
-                product.stock_available += 1
-                
-                # Si el producto es tipo "ambos", también restaurar stock
-                if product.product_type == "ambos":
-                    product.stock += 1
-                
-                # Registrar movimiento de devolución
-                movement = models.InventoryMovement(
-                    product_id=product.id,
-                    user_id=user_id,
-                    movement_type="devolucion",
-                    quantity=1,
-                    previous_stock=previous_stock,
-                    new_stock=product.stock_available,
-                    reference_type="rental",
-                    reference_id=db_rental.id,
-                    reason=f"Devolución de alquiler {db_rental.rental_number}",
-                    organization_id=user.organization_id
-                )
-                db.add(movement)
+        lines = rental_stock_lines(db_rental)
+        if lines:
+            has_items = bool(db_rental.items)
+            move_rental_stock(
+                db, db_rental, load_rental_products(db, lines), lines,
+                direction=1,
+                movement_type="devolucion",
+                reason=lambda product: (
+                    f"Devolución de alquiler {db_rental.rental_number} - {product.name}"
+                    if has_items else f"Devolución de alquiler {db_rental.rental_number}"
+                ),
+                user_id=user_id,
+                organization_id=user.organization_id
+            )
         
         # Establecer la fecha de devolución si no está en los datos de actualización
         if 'actual_return_date' not in update_data:
@@ -568,35 +590,26 @@ def update_rental(db: Session, rental_id: int, rental: schemas.RentalUpdate, use
             setattr(db_rental, field, value)
     
     db.commit()
+    invalidate_organization(db_rental.organization_id)
     db.refresh(db_rental)
     return db_rental
 
 
 def check_overdue_rentals(db: Session):
     """Marca alquileres vencidos"""
-    today = datetime.now()
-    overdue = db.query(models.Rental).filter(
-        models.Rental.status == "activo",
-        models.Rental.end_date < today
-    ).all()
-    
-    for rental in overdue:
-        rental.status = "vencido"
-    
-    db.commit()
-    return len(overdue)
+    return sum(mark_overdue_rentals(db).values())
 
 
 def get_rental_history(db: Session, product_id: int):
     """Obtiene el historial de alquileres de un producto"""
-    return db.query(models.Rental).filter(
+    return _rentals_query(db).filter(
         models.Rental.product_id == product_id
     ).order_by(desc(models.Rental.created_at)).all()
 
 
 def get_client_rental_history(db: Session, client_id: int):
     """Obtiene el historial de alquileres de un cliente"""
-    return db.query(models.Rental).filter(
+    return _rentals_query(db).filter(
         models.Rental.client_id == client_id
     ).order_by(desc(models.Rental.created_at)).all()
 
@@ -621,12 +634,13 @@ def get_active_rentals_report(db: Session):
     }
 
 
-def create_rental_from_quotation(db: Session, quotation: models.Quotation, user_id: int, rental_data: dict):
+def create_rental_from_quotation(db: Session, quotation: models.Quotation, user: Union[int, Principal], rental_data: dict):
     """Crea un alquiler desde una cotización"""
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
     # Generar número de alquiler
     rental_number = generate_rental_number(db, user.organization_id)
@@ -647,24 +661,19 @@ def create_rental_from_quotation(db: Session, quotation: models.Quotation, user_
         days = 1
     
     # Crear items del alquiler desde los items de la cotización
-    items_data = []
-    for item in quotation.items:
-        # Verificar disponibilidad del producto
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise ValueError(f"Producto {item.product_id} no encontrado")
-        
-        if product.product_type not in ["alquiler", "ambos"]:
-            raise ValueError(f"El producto {product.name} no está disponible para alquiler")
-        
-        if product.stock_available < item.quantity:
-            raise ValueError(f"No hay suficiente stock de {product.name}. Disponible: {product.stock_available}, Solicitado: {item.quantity}")
-        
-        items_data.append({
+    # Verificar disponibilidad de todos los productos (una sola consulta)
+    lines = [(item.product_id, item.quantity) for item in quotation.items]
+    products = load_rental_products(db, lines)
+    validate_rental_availability(products, lines)
+    
+    items_data = [
+        {
             'product_id': item.product_id,
             'quantity': item.quantity,
             'unit_price': item.unit_price
-        })
+        }
+        for item in quotation.items
+    ]
     
     # Calcular subtotal de todos los items
     subtotal = sum(item['quantity'] * item['unit_price'] * days for item in items_data)
@@ -717,44 +726,17 @@ def create_rental_from_quotation(db: Session, quotation: models.Quotation, user_
     db.flush()
     
     # Crear items del alquiler y actualizar stock
-    for item_data in items_data:
-        product = db.query(models.Product).filter(models.Product.id == item_data['product_id']).first()
-        
-        # Crear item del alquiler
-        db_item = models.RentalItem(
-            rental_id=db_rental.id,
-            product_id=item_data['product_id'],
-            product_name=product.name if product else None,  # Guardar nombre del producto
-            quantity=item_data['quantity'],
-            rental_days=days,
-            unit_price=item_data['unit_price'],
-            organization_id=user.organization_id
-        )
-        db.add(db_item)
-        
-        # Actualizar stock
-        previous_stock = product.stock_available
-        product.stock_available -= item_data['quantity']
-        
-        # Si el producto es tipo "ambos", también actualizar stock
-        if product.product_type == "ambos":
-            product.stock -= item_data['quantity']
-        
-        # Registrar movimiento de inventario
-        movement = models.InventoryMovement(
-            product_id=product.id,
-            user_id=user_id,
-            movement_type="alquiler",
-            quantity=item_data['quantity'],
-            previous_stock=previous_stock,
-            new_stock=product.stock_available,
-            reference_type="rental",
-            reference_id=db_rental.id,
-            reason=f"Alquiler {rental_number} (desde cotización {quotation.quotation_number})",
-            organization_id=user.organization_id
-        )
-        db.add(movement)
+    insert_rental_items(db, db_rental, products, items_data, days)
+    move_rental_stock(
+        db, db_rental, products, lines,
+        direction=-1,
+        movement_type="alquiler",
+        reason=lambda product: f"Alquiler {rental_number} (desde cotización {quotation.quotation_number})",
+        user_id=user_id,
+        organization_id=user.organization_id
+    )
     
     db.commit()
+    invalidate_organization(user.organization_id)
     db.refresh(db_rental)
     return db_rental
@@ -1,118 +1,31 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, insert
+from typing import List, Optional, Union
 from datetime import datetime
 from . import models_extended as models, schemas_extended as schemas
+from .auth import Principal, resolve_user
+from .cache import invalidate_organization
+from .crud_sequences import next_document_number
+from .crud import get_products_by_ids, apply_stock_deltas
+from .pagination import paginate
+from .loaders import SALE_LOADERS
+from . import rollups  # noqa: F401 - registra el mantenimiento de daily_rollups en el flush
+from . import leaderboards
 
 
 def generate_sale_number(db: Session, organization_id: int = None) -> str:
     """Genera un número de venta único e infinito por organización (VEN-YYYYMMDD-01, 02, 03...)"""
-    today = datetime.now()
-    prefix = f"VEN-{today.year}{today.month:02d}{today.day:02d}"
-    
-    # Construir query base - buscar TODAS las ventas
-    query = db.query(models.Sale).filter(
-        models.Sale.sale_number.like("VEN-%")
-    )
-    
-    # Filtrar por organización si se proporciona
-    if organization_id:
-        query = query.filter(models.Sale.organization_id == organization_id)
-    
-    # Obtener todas las ventas para encontrar el número más alto
-    sales = query.all()
-    
-    if sales:
-        # Extraer todos los números
-        numbers = []
-        for sale in sales:
-            try:
-                num = int(sale.sale_number.split('-')[-1])
-                numbers.append(num)
-            except (ValueError, IndexError):
-                continue
-        
-        new_number = max(numbers) + 1 if numbers else 1
-    else:
-        new_number = 1
-    
-    # Formato: 01, 02, 03... 99, 100, 101... (sin límite)
-    candidate = f"{prefix}-{new_number:02d}"
-    
-    # Verificar que no exista
-    existing = db.query(models.Sale).filter(
-        models.Sale.sale_number == candidate,
-        models.Sale.organization_id == organization_id
-    ).first()
-    
-    if existing:
-        while existing:
-            new_number += 1
-            candidate = f"{prefix}-{new_number:02d}"
-            existing = db.query(models.Sale).filter(
-                models.Sale.sale_number == candidate,
-                models.Sale.organization_id == organization_id
-            ).first()
-    
-    return candidate
+    return next_document_number(db, "VEN", organization_id)
 
 
 def generate_invoice_number(db: Session, organization_id: int = None) -> str:
     """Genera un número de factura único e infinito por organización (FAC-YYYYMMDD-01, 02, 03...)"""
-    today = datetime.now()
-    prefix = f"FAC-{today.year}{today.month:02d}{today.day:02d}"
-    
-    # Construir query base - buscar TODAS las facturas
-    query = db.query(models.Sale).filter(
-        models.Sale.invoice_number.like("FAC-%"),
-        models.Sale.invoice_number.isnot(None)
-    )
-    
-    # Filtrar por organización si se proporciona
-    if organization_id:
-        query = query.filter(models.Sale.organization_id == organization_id)
-    
-    # Obtener todas las facturas para encontrar el número más alto
-    invoices = query.all()
-    
-    if invoices:
-        # Extraer todos los números
-        numbers = []
-        for invoice in invoices:
-            if invoice.invoice_number:
-                try:
-                    num = int(invoice.invoice_number.split('-')[-1])
-                    numbers.append(num)
-                except (ValueError, IndexError):
-                    continue
-        
-        new_number = max(numbers) + 1 if numbers else 1
-    else:
-        new_number = 1
-    
-    # Formato: 01, 02, 03... 99, 100, 101... (sin límite)
-    candidate = f"{prefix}-{new_number:02d}"
-    
-    # Verificar que no exista
-    existing = db.query(models.Sale).filter(
-        models.Sale.invoice_number == candidate,
-        models.Sale.organization_id == organization_id
-    ).first()
-    
-    if existing:
-        while existing:
-            new_number += 1
-            candidate = f"{prefix}-{new_number:02d}"
-            existing = db.query(models.Sale).filter(
-                models.Sale.invoice_number == candidate,
-                models.Sale.organization_id == organization_id
-            ).first()
-    
-    return candidate
+    return next_document_number(db, "FAC", organization_id)
 
 
 def get_sale(db: Session, sale_id: int):
-    return db.query(models.Sale).join(models.Client, models.Sale.client_id == models.Client.id, isouter=True).filter(models.Sale.id == sale_id).first()
+    return db.query(models.Sale).join(models.Client, models.Sale.client_id == models.Client.id, isouter=True)\
+        .options(*SALE_LOADERS).filter(models.Sale.id == sale_id).first()
 
 
 def get_sales(
@@ -123,11 +36,50 @@ def get_sales(
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    organization_id: Optional[int] = None
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
 ):
-    # Hacer join con la tabla de clientes para incluir la información del cliente
-    query = db.query(models.Sale).join(models.Client, models.Sale.client_id == models.Client.id, isouter=True)
-    
+    # Hacer join con la tabla de clientes; el perfil carga cliente e items para serializar sin N+1
+    query = db.query(models.Sale).join(models.Client, models.Sale.client_id == models.Client.id, isouter=True)\
+        .options(*SALE_LOADERS)
+    query = _filter_sales(query, client_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Sale, skip=skip, limit=limit, cursor=cursor).all()
+
+
+# Columnas del listado resumido (schemas.SaleSummary)
+SALE_SUMMARY_COLUMNS = (
+    models.Sale.id,
+    models.Sale.sale_number,
+    models.Sale.invoice_number,
+    models.Sale.client_id,
+    models.Client.name.label("client_name"),
+    models.Sale.sale_date,
+    models.Sale.status,
+    models.Sale.total,
+    models.Sale.balance,
+    models.Sale.created_at,
+)
+
+
+def get_sales_summary(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    organization_id: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """Listado resumido: mismas filas y orden que get_sales, solo las columnas de la tabla (sin entidades ni items)"""
+    query = db.query(*SALE_SUMMARY_COLUMNS).select_from(models.Sale)\
+        .join(models.Client, models.Sale.client_id == models.Client.id, isouter=True)
+    query = _filter_sales(query, client_id, status, start_date, end_date, organization_id)
+    return paginate(query, models.Sale, skip=skip, limit=limit, cursor=cursor).all()
+
+
+def _filter_sales(query, client_id, status, start_date, end_date, organization_id):
     # Filtrar por organización
     if organization_id:
         query = query.filter(models.Sale.organization_id == organization_id)
@@ -144,18 +96,18 @@ def get_sales(
     if end_date:
         query = query.filter(models.Sale.sale_date <= end_date)
     
-    return query.order_by(desc(models.Sale.created_at)).offset(skip).limit(limit).all()
+    return query
 
 
-def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int):
-    # Obtener el usuario para acceder a su organization_id
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+def create_sale(db: Session, sale: schemas.SaleCreate, user: Union[int, Principal]):
+    # Principal de la autenticación (sin consulta) o id del usuario
+    user = resolve_user(db, user)
     if not user:
         raise ValueError("Usuario no encontrado")
+    user_id = user.id
     
-    # Generar números por organización
-    sale_number = generate_sale_number(db, user.organization_id)
-    invoice_number = generate_invoice_number(db, user.organization_id)
+    # Cargar todos los productos de la venta en una sola consulta (bloqueados hasta el commit)
+    products = get_products_by_ids(db, [item.product_id for item in sale.items], for_update=True)
     
     # Calcular totales
     subtotal = 0
@@ -163,7 +115,7 @@ def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int):
     
     for item in sale.items:
         # Verificar stock
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if not product or product.stock < item.quantity:
             raise ValueError(f"Stock insuficiente para el producto {product.name if product else 'desconocido'}")
         
@@ -176,6 +128,10 @@ def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int):
             "subtotal": item_subtotal
         })
     
+    # Generar números por organización
+    sale_number = generate_sale_number(db, user.organization_id)
+    invoice_number = generate_invoice_number(db, user.organization_id)
+    
     # Calcular impuesto
     subtotal_after_discount = subtotal - sale.discount_amount
     tax_amount = subtotal_after_discount * (sale.tax_rate / 100)
@@ -236,47 +192,64 @@ def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int):
     db.add(db_sale)
     db.flush()
     
-    # Crear items y actualizar stock
+    # Preparar items, movimientos y variaciones de stock en memoria
+    sale_items = []
+    movements = []
+    stock_deltas = {}
+    available_deltas = {}
+    current_stock = {product_id: product.stock for product_id, product in products.items()}
+    
     for item_data in items_data:
-        # Obtener el producto para guardar su nombre
-        product = db.query(models.Product).filter(models.Product.id == item_data['product_id']).first()
+        product = products[item_data['product_id']]
+        quantity = item_data['quantity']
         
-        db_item = models.SaleItem(
-            sale_id=db_sale.id,
-            product_name=product.name if product else None,  # Guardar nombre del producto
+        sale_items.append({
+            "sale_id": db_sale.id,
+            "product_name": product.name,  # Guardar nombre del producto
             **item_data
-        )
-        db.add(db_item)
+        })
         
         # Actualizar stock del producto
-        previous_stock = product.stock
-        product.stock -= item_data['quantity']
+        previous_stock = current_stock[product.id]
+        current_stock[product.id] = previous_stock - quantity
+        stock_deltas[product.id] = stock_deltas.get(product.id, 0) - quantity
         
         # Si el producto es tipo "ambos", también actualizar stock_available
         if product.product_type == "ambos":
-            product.stock_available -= item_data['quantity']
+            available_deltas[product.id] = available_deltas.get(product.id, 0) - quantity
         
         # Registrar movimiento de inventario
-        movement = models.InventoryMovement(
-            product_id=product.id,
-            user_id=user_id,
-            movement_type="venta",
-            quantity=item_data['quantity'],
-            previous_stock=previous_stock,
-            new_stock=product.stock,
-            reference_type="sale",
-            reference_id=db_sale.id,
-            reason=f"Venta {sale_number}",
-            organization_id=user.organization_id
-        )
-        db.add(movement)
+        movements.append({
+            "product_id": product.id,
+            "user_id": user_id,
+            "movement_type": "venta",
+            "quantity": quantity,
+            "previous_stock": previous_stock,
+            "new_stock": current_stock[product.id],
+            "reference_type": "sale",
+            "reference_id": db_sale.id,
+            "reason": f"Venta {sale_number}",
+            "organization_id": user.organization_id
+        })
+    
+    # Un INSERT por tabla (executemany) y un único UPDATE de stock; una venta
+    # sin items no inserta nada (executemany con [] insertaría una fila vacía)
+    if sale_items:
+        db.execute(insert(models.SaleItem), sale_items)
+    if movements:
+        db.execute(insert(models.InventoryMovement), movements)
+    apply_stock_deltas(db, stock_deltas, available_deltas)
+    
+    # Rankings de productos y clientes (los items se insertaron con Core)
+    leaderboards.record_sale(db, db_sale.id)
     
     db.commit()
+    invalidate_organization(user.organization_id)
     db.refresh(db_sale)
     return db_sale
 
 
-def create_sale_from_quotation(db: Session, quotation: models.Quotation, user_id: int, payment_method: str):
+def create_sale_from_quotation(db: Session, quotation: models.Quotation, user: Union[int, Principal], payment_method: str):
     """Crea una venta desde una cotización"""
     # Crear items desde la cotización
     items = []
@@ -306,7 +279,7 @@ def create_sale_from_quotation(db: Session, quotation: models.Quotation, user_id
         items=items
     )
     
-    return create_sale(db, sale_data, user_id)
+    return create_sale(db, sale_data, user)
 
 
 def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
@@ -314,6 +287,14 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
     if db_sale:
         update_data = sale.model_dump(exclude_unset=True)
         
+        # Entrar o salir del estado cancelada cambia los rankings: restar la
+        # venta tal como está guardada y volver a sumarla después del cambio
+        toggles_cancellation = 'status' in update_data and (
+            (update_data['status'] == 'cancelada') != (db_sale.status == 'cancelada')
+        )
+        if toggles_cancellation:
+            leaderboards.record_sale(db, db_sale.id, -1)
+        
         # Si se actualiza el estado a cancelada, devolver stock y registrar movimientos
         if 'status' in update_data and update_data['status'] == 'cancelada':
             # Solo devolver stock si la venta no estaba previamente cancelada
@@ -363,7 +344,12 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
             if field != 'paid_amount':
                 setattr(db_sale, field, value)
         
+        if toggles_cancellation:
+            db.flush()
+            leaderboards.record_sale(db, db_sale.id)
+        
         db.commit()
+        invalidate_organization(db_sale.organization_id)
         db.refresh(db_sale)
     return db_sale
 
@@ -388,6 +374,7 @@ def add_payment(db: Session, payment: schemas.PaymentCreate):
         sale.status = "parcial"
     
     db.commit()
+    invalidate_organization(sale.organization_id)
     db.refresh(db_payment)
     return db_payment
 
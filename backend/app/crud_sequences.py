@@ -0,0 +1,97 @@
+"""
+Numeración de documentos por organización (VEN, FAC, ALQ, COT)
+
+Cada organización tiene un contador por tipo de documento en la tabla
+document_sequences. Asignar un número es un único UPDATE ... RETURNING:
+en PostgreSQL el UPDATE bloquea la fila hasta el commit, y en SQLite toma
+el bloqueo de escritura de la base, así que las asignaciones concurrentes
+quedan serializadas en ambos casos. Si la transacción del documento falla,
+el incremento se revierte con ella y no quedan huecos.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import Optional
+from . import models_extended as models
+
+
+# Tipo de documento -> columna que guarda el número
+DOCUMENT_NUMBER_COLUMNS = {
+    "VEN": models.Sale.sale_number,
+    "FAC": models.Sale.invoice_number,
+    "ALQ": models.Rental.rental_number,
+    "COT": models.Quotation.quotation_number,
+}
+
+
+def _sequence_org_id(organization_id: Optional[int]) -> int:
+    """Los documentos sin organización (super admin) usan el contador 0"""
+    return organization_id or 0
+
+
+def get_current_max_number(db: Session, document_type: str, organization_id: Optional[int] = None) -> int:
+    """
+    Obtiene el número más alto ya emitido para un tipo de documento.
+    Solo se usa una vez por organización para inicializar el contador.
+    """
+    column = DOCUMENT_NUMBER_COLUMNS[document_type]
+    query = db.query(column).filter(column.like(f"{document_type}-%"))
+
+    # Igual que la numeración anterior: sin organización se consideran todos los documentos
+    if organization_id:
+        query = query.filter(column.class_.organization_id == organization_id)
+
+    max_number = 0
+    for (number,) in query.yield_per(1000):
+        try:
+            max_number = max(max_number, int(number.split('-')[-1]))
+        except (ValueError, IndexError, AttributeError):
+            continue
+    return max_number
+
+
+def ensure_sequence(db: Session, document_type: str, organization_id: Optional[int] = None) -> None:
+    """Crea el contador de la organización a partir de los documentos existentes (backfill)"""
+    start = get_current_max_number(db, document_type, organization_id)
+    try:
+        # SAVEPOINT: si otro worker creó el contador al mismo tiempo, se ignora el duplicado
+        with db.begin_nested():
+            db.add(models.DocumentSequence(
+                organization_id=_sequence_org_id(organization_id),
+                document_type=document_type,
+                last_number=start
+            ))
+    except IntegrityError:
+        pass
+
+
+def next_sequence_value(db: Session, document_type: str, organization_id: Optional[int] = None) -> int:
+    """Incrementa atómicamente el contador y devuelve el nuevo valor"""
+    if document_type not in DOCUMENT_NUMBER_COLUMNS:
+        raise ValueError(f"Tipo de documento inválido: {document_type}")
+
+    statement = (
+        update(models.DocumentSequence)
+        .where(
+            models.DocumentSequence.organization_id == _sequence_org_id(organization_id),
+            models.DocumentSequence.document_type == document_type
+        )
+        .values(last_number=models.DocumentSequence.last_number + 1)
+        .returning(models.DocumentSequence.last_number)
+        .execution_options(synchronize_session=False)
+    )
+
+    value = db.execute(statement).scalar()
+    if value is None:
+        # Primera vez para esta organización: inicializar el contador y reintentar
+        ensure_sequence(db, document_type, organization_id)
+        value = db.execute(statement).scalar()
+    return value
+
+
+def next_document_number(db: Session, document_type: str, organization_id: Optional[int] = None) -> str:
+    """Genera el siguiente número con formato PREFIJO-YYYYMMDD-NN (sin límite)"""
+    number = next_sequence_value(db, document_type, organization_id)
+    today = datetime.now()
+    return f"{document_type}-{today.year}{today.month:02d}{today.day:02d}-{number:02d}"
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, and_, case, desc, select
 from typing import Optional
 from datetime import datetime, timedelta
 from . import models_extended as models
+from . import rollups
+from . import leaderboards
 
 
 def get_complete_business_summary(
@@ -15,6 +17,12 @@ def get_complete_business_summary(
     Genera un resumen completo del negocio con todas las métricas importantes
     """
     try:
+        # Sin fechas o con meses completos, el ranking de productos sale de product_leaderboard
+        if start_date is None and end_date is None:
+            leaderboard_periods = (leaderboards.ALL_TIME, leaderboards.ALL_TIME)
+        else:
+            leaderboard_periods = leaderboards.whole_months(start_date, end_date)
+        
         # Si no se especifican fechas, usar valores muy amplios para obtener todo
         if not start_date:
             start_date = datetime(2000, 1, 1)  # Fecha muy antigua para obtener todo
@@ -22,168 +30,195 @@ def get_complete_business_summary(
             end_date = datetime.now()
         
         # ==================== VENTAS ====================
-        sales_query = db.query(models.Sale).filter(
+        # Una sola consulta agrupada por (estado, método de pago); los desgloses
+        # y totales se arman sobre esas pocas filas. Los grupos se ordenan por
+        # fecha de primera aparición, igual que al recorrer las ventas una a una
+        sale_total = func.coalesce(models.Sale.total, 0)
+        sale_paid = func.coalesce(models.Sale.paid_amount, 0)
+        sale_has_pending = sale_total > sale_paid
+        sales_groups = db.query(
+            models.Sale.status,
+            models.Sale.payment_method,
+            func.count(models.Sale.id).label('count'),
+            func.sum(sale_total).label('total_amount'),
+            func.sum(sale_paid).label('paid_amount'),
+            func.count(case((sale_has_pending, 1))).label('pending_count'),
+            func.sum(case((sale_has_pending, sale_total - sale_paid), else_=0)).label('pending_amount')
+        ).filter(
             models.Sale.organization_id == organization_id,
             models.Sale.created_at >= start_date,
             models.Sale.created_at <= end_date
-        )
+        ).group_by(
+            models.Sale.status, models.Sale.payment_method
+        ).order_by(func.min(models.Sale.created_at), func.min(models.Sale.id)).all()
         
-        total_sales = sales_query.count()
-        sales_list = sales_query.all()
+        total_sales = sum(group.count for group in sales_groups)
         
         # Ventas por estado
         sales_by_status = {}
-        for sale in sales_list:
-            status = sale.status
-            if status not in sales_by_status:
-                sales_by_status[status] = {'count': 0, 'total_amount': 0}
-            sales_by_status[status]['count'] += 1
-            sales_by_status[status]['total_amount'] += float(sale.total or 0)
+        for group in sales_groups:
+            if group.status not in sales_by_status:
+                sales_by_status[group.status] = {'count': 0, 'total_amount': 0}
+            sales_by_status[group.status]['count'] += group.count
+            sales_by_status[group.status]['total_amount'] += float(group.total_amount)
         
         # Ventas por método de pago - Solo montos pagados y NO canceladas
+        active_sales_groups = [group for group in sales_groups if group.status != 'cancelada']
         sales_by_payment = {}
-        for sale in sales_list:
-            # Excluir ventas canceladas
-            if sale.status == 'cancelada':
-                continue
-            method = sale.payment_method
-            if method not in sales_by_payment:
-                sales_by_payment[method] = {'count': 0, 'total_amount': 0}
-            sales_by_payment[method]['count'] += 1
-            sales_by_payment[method]['total_amount'] += float(sale.paid_amount or 0)
+        for group in active_sales_groups:
+            if group.payment_method not in sales_by_payment:
+                sales_by_payment[group.payment_method] = {'count': 0, 'total_amount': 0}
+            sales_by_payment[group.payment_method]['count'] += group.count
+            sales_by_payment[group.payment_method]['total_amount'] += float(group.paid_amount)
         
         # Totales de ventas - Excluir canceladas
-        total_sales_amount = sum(float(s.total or 0) for s in sales_list if s.status != 'cancelada')
-        total_sales_paid = sum(float(s.paid_amount or 0) for s in sales_list if s.status != 'cancelada')
+        total_sales_amount = sum(float(group.total_amount) for group in active_sales_groups)
+        total_sales_paid = sum(float(group.paid_amount) for group in active_sales_groups)
         # Calcular pendiente como la diferencia entre total y pagado
-        total_sales_pending = sum(float(s.total or 0) - float(s.paid_amount or 0) for s in sales_list if s.status != 'cancelada' and float(s.total or 0) > float(s.paid_amount or 0))
+        total_sales_pending = sum(float(group.pending_amount) for group in active_sales_groups if group.pending_count)
         
         print(f"DEBUG RESUMEN - Ventas: total_amount={total_sales_amount}, total_paid={total_sales_paid}, pending={total_sales_pending}")
         
         # ==================== ALQUILERES ====================
-        rentals_query = db.query(models.Rental).filter(
+        rentals_filter = (
             models.Rental.organization_id == organization_id,
             models.Rental.created_at >= start_date,
             models.Rental.created_at <= end_date
         )
         
-        total_rentals = rentals_query.count()
-        rentals_list = rentals_query.all()
-        
         # Alquileres por estado
         rentals_by_status = {}
-        for rental in rentals_list:
-            status = rental.status
-            if status not in rentals_by_status:
-                rentals_by_status[status] = {'count': 0, 'total_amount': 0}
-            rentals_by_status[status]['count'] += 1
-            rentals_by_status[status]['total_amount'] += float(rental.total_cost or 0)
+        for group in db.query(
+            models.Rental.status,
+            func.count(models.Rental.id).label('count'),
+            func.sum(func.coalesce(models.Rental.total_cost, 0)).label('total_amount')
+        ).filter(*rentals_filter).group_by(
+            models.Rental.status
+        ).order_by(func.min(models.Rental.created_at), func.min(models.Rental.id)):
+            rentals_by_status[group.status] = {'count': group.count, 'total_amount': float(group.total_amount)}
+        
+        total_rentals = sum(data['count'] for data in rentals_by_status.values())
         
         # Alquileres por método de pago - Usar pagos reales de RentalPayment
         rentals_by_payment = {}
-        # Obtener todos los pagos de alquileres
-        rental_payments = db.query(models.RentalPayment).filter(
+        for group in db.query(
+            models.RentalPayment.payment_method,
+            func.count(models.RentalPayment.id).label('count'),
+            func.sum(func.coalesce(models.RentalPayment.amount, 0)).label('total_amount')
+        ).filter(
             models.RentalPayment.organization_id == organization_id
-        ).all()
-        
-        for payment in rental_payments:
-            method = payment.payment_method
-            if method not in rentals_by_payment:
-                rentals_by_payment[method] = {'count': 0, 'total_amount': 0}
-            rentals_by_payment[method]['count'] += 1
-            rentals_by_payment[method]['total_amount'] += float(payment.amount or 0)
+        ).group_by(
+            models.RentalPayment.payment_method
+        ).order_by(func.min(models.RentalPayment.payment_date), func.min(models.RentalPayment.id)):
+            rentals_by_payment[group.payment_method] = {'count': group.count, 'total_amount': float(group.total_amount)}
         
         # Totales de alquileres - Usar pagos reales de RentalPayment
-        total_rentals_amount = sum(float(p.amount or 0) for p in rental_payments)
-        total_rentals_paid = sum(float(p.amount or 0) for p in rental_payments)
+        total_rentals_amount = sum(data['total_amount'] for data in rentals_by_payment.values())
+        total_rentals_paid = total_rentals_amount
         
         # Calcular pendiente: total_cost de alquileres activos/vencidos menos los pagos recibidos
-        # Crear un mapa de pagos por rental_id
-        payments_by_rental = {}
-        for payment in rental_payments:
-            rental_id = payment.rental_id
-            if rental_id not in payments_by_rental:
-                payments_by_rental[rental_id] = 0
-            payments_by_rental[rental_id] += float(payment.amount or 0)
+        # (pagos de cada alquiler sumados en SQL con una subconsulta correlacionada)
+        rental_paid = select(
+            func.sum(func.coalesce(models.RentalPayment.amount, 0))
+        ).where(
+            models.RentalPayment.rental_id == models.Rental.id,
+            models.RentalPayment.organization_id == organization_id
+        ).scalar_subquery()
         
-        # Calcular pendiente por cada alquiler
-        total_rentals_pending = 0
-        for rental in rentals_list:
-            if rental.status in ['activo', 'vencido']:  # Solo activos y vencidos tienen pendientes
-                total_cost = float(rental.total_cost or 0)
-                paid = payments_by_rental.get(rental.id, 0)
-                pending = total_cost - paid
-                if pending > 0:
-                    total_rentals_pending += pending
+        rental_pending = func.coalesce(models.Rental.total_cost, 0) - func.coalesce(rental_paid, 0)
+        pending_count, pending_amount = db.query(
+            func.count(case((rental_pending > 0, 1))),
+            func.sum(case((rental_pending > 0, rental_pending), else_=0))
+        ).filter(
+            *rentals_filter,
+            models.Rental.status.in_(['activo', 'vencido'])  # Solo activos y vencidos tienen pendientes
+        ).one()
+        total_rentals_pending = float(pending_amount) if pending_count else 0
         
         print(f"DEBUG RESUMEN - Alquileres: total_amount={total_rentals_amount}, total_paid={total_rentals_paid}, pending={total_rentals_pending}")
         
         # ==================== COTIZACIONES ====================
-        quotations_query = db.query(models.Quotation).filter(
+        quotations_by_status = dict(db.query(
+            models.Quotation.status,
+            func.count(models.Quotation.id)
+        ).filter(
             models.Quotation.organization_id == organization_id,
             models.Quotation.created_at >= start_date,
             models.Quotation.created_at <= end_date
-        )
+        ).group_by(models.Quotation.status).all())
         
-        total_quotations = quotations_query.count()
-        pending_quotations = quotations_query.filter(models.Quotation.status == 'pendiente').count()
-        accepted_quotations = quotations_query.filter(models.Quotation.status == 'aceptada').count()
-        converted_quotations = quotations_query.filter(models.Quotation.status == 'convertida').count()
+        total_quotations = sum(quotations_by_status.values())
+        pending_quotations = quotations_by_status.get('pendiente', 0)
+        accepted_quotations = quotations_by_status.get('aceptada', 0)
+        converted_quotations = quotations_by_status.get('convertida', 0)
         
         # ==================== CLIENTES ====================
-        total_clients = db.query(models.Client).filter(
+        total_clients, active_clients, new_clients = db.query(
+            func.count(models.Client.id),
+            func.count(case((models.Client.status == 'activo', 1))),
+            # Clientes nuevos en el período
+            func.count(case((and_(
+                models.Client.created_at >= start_date,
+                models.Client.created_at <= end_date
+            ), 1)))
+        ).filter(
             models.Client.organization_id == organization_id
-        ).count()
-        
-        active_clients = db.query(models.Client).filter(
-            models.Client.organization_id == organization_id,
-            models.Client.status == 'activo'
-        ).count()
-        
-        # Clientes nuevos en el período
-        new_clients = db.query(models.Client).filter(
-            models.Client.organization_id == organization_id,
-            models.Client.created_at >= start_date,
-            models.Client.created_at <= end_date
-        ).count()
+        ).one()
         
         # ==================== PRODUCTOS ====================
-        total_products = db.query(models.Product).filter(
+        total_products, low_stock_products = db.query(
+            func.count(models.Product.id),
+            func.count(case((models.Product.stock <= models.Product.min_stock, 1)))
+        ).filter(
             models.Product.organization_id == organization_id,
             models.Product.is_active == True
-        ).count()
-        
-        low_stock_products = db.query(models.Product).filter(
-            models.Product.organization_id == organization_id,
-            models.Product.is_active == True,
-            models.Product.stock <= models.Product.min_stock
-        ).count()
-        
-        # Productos más vendidos
-        top_products = db.query(
-            models.SaleItem.product_id,
-            models.Product.name,
-            func.sum(models.SaleItem.quantity).label('total_quantity'),
-            func.sum(models.SaleItem.subtotal).label('total_revenue')
-        ).join(
-            models.Product, models.SaleItem.product_id == models.Product.id
-        ).join(
-            models.Sale, models.SaleItem.sale_id == models.Sale.id
-        ).filter(
-            models.Sale.organization_id == organization_id,
-            models.Sale.created_at >= start_date,
-            models.Sale.created_at <= end_date
-        ).group_by(
-            models.SaleItem.product_id, models.Product.name
-        ).order_by(
-            desc('total_quantity')
-        ).limit(5).all()
+        ).one()
+        
+        # Productos más vendidos (sin ventas canceladas)
+        if leaderboard_periods:
+            # Histórico: una fila por producto; meses completos: suma de los meses del rango
+            Board = models.ProductLeaderboard
+            top_products = db.query(
+                Board.product_id,
+                models.Product.name,
+                func.sum(Board.quantity).label('total_quantity'),
+                func.sum(Board.revenue).label('total_revenue')
+            ).join(
+                models.Product, Board.product_id == models.Product.id
+            ).filter(
+                Board.organization_id == (organization_id or 0),
+                Board.period.between(*leaderboard_periods)
+            ).group_by(
+                Board.product_id, models.Product.name
+            ).order_by(
+                desc('total_quantity')
+            ).limit(5).all()
+        else:
+            top_products = db.query(
+                models.SaleItem.product_id,
+                models.Product.name,
+                func.sum(models.SaleItem.quantity).label('total_quantity'),
+                func.sum(models.SaleItem.subtotal).label('total_revenue')
+            ).join(
+                models.Product, models.SaleItem.product_id == models.Product.id
+            ).join(
+                models.Sale, models.SaleItem.sale_id == models.Sale.id
+            ).filter(
+                models.Sale.organization_id == organization_id,
+                func.coalesce(models.Sale.status, '') != 'cancelada',
+                models.Sale.created_at >= start_date,
+                models.Sale.created_at <= end_date
+            ).group_by(
+                models.SaleItem.product_id, models.Product.name
+            ).order_by(
+                desc('total_quantity')
+            ).limit(5).all()
         
         # ==================== MÉTODOS DE PAGO CONSOLIDADOS ====================
         payment_methods_summary = {}
         
         # Combinar ventas y alquileres por método de pago
-        all_methods = set(sales_by_payment.keys()) | set(rentals_by_payment.keys())
+        all_methods = list(sales_by_payment) + [method for method in rentals_by_payment if method not in sales_by_payment]
         
         for method in all_methods:
             sales_data = sales_by_payment.get(method, {'count': 0, 'total_amount': 0})
@@ -212,32 +247,27 @@ def get_complete_business_summary(
         collection_rate = (total_paid / total_amount_with_pending * 100) if total_amount_with_pending > 0 else 0
         
         # ==================== TENDENCIAS (últimos 7 días) ====================
-        last_7_days = datetime.now() - timedelta(days=7)
-        
         daily_sales = {}
         for i in range(7):
             day = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
             daily_sales[day] = {'sales': 0, 'rentals': 0, 'revenue': 0}
         
-        # Ventas por día
-        for sale in db.query(models.Sale).filter(
-            models.Sale.organization_id == organization_id,
-            models.Sale.created_at >= last_7_days
-        ).all():
-            day = sale.created_at.strftime('%Y-%m-%d')
-            if day in daily_sales:
-                daily_sales[day]['sales'] += 1
-                daily_sales[day]['revenue'] += float(sale.total or 0)
-        
-        # Alquileres por día
-        for rental in db.query(models.Rental).filter(
-            models.Rental.organization_id == organization_id,
-            models.Rental.created_at >= last_7_days
-        ).all():
-            day = rental.created_at.strftime('%Y-%m-%d')
-            if day in daily_sales:
-                daily_sales[day]['rentals'] += 1
-                daily_sales[day]['revenue'] += float(rental.total_cost or 0)
+        # Ventas (por fecha de venta) y alquileres por día desde los totales diarios (daily_rollups)
+        today = datetime.now().date()
+        Rollup = models.DailyRollup
+        for source, key in ((rollups.SALE, 'sales'), (rollups.RENTAL, 'rentals')):
+            for day, count, revenue in db.query(
+                Rollup.day,
+                func.sum(Rollup.count),
+                func.sum(Rollup.total_amount)
+            ).filter(
+                rollups.rollup_filter(source, organization_id),
+                rollups.day_window(today - timedelta(days=6), today)
+            ).group_by(Rollup.day).having(func.sum(Rollup.count) > 0):
+                day = str(day)
+                if day in daily_sales:
+                    daily_sales[day][key] += count
+                    daily_sales[day]['revenue'] += float(revenue)
         
         # ==================== CONSTRUIR RESPUESTA ====================
         return {
@@ -0,0 +1,133 @@
+"""
+Reset y eliminación de organizaciones en segundo plano
+
+La petición HTTP solo registra la tarea en organization_data_jobs y responde;
+la tarea corre después en el mismo worker (BackgroundTasks de FastAPI) y
+guarda su progreso en cada paso, así que cualquier worker puede informarlo.
+
+Por organización hay a lo sumo una tarea activa. Si un worker muere a mitad
+de una tarea, esta deja de avanzar y, pasado STALE_AFTER, se marca como
+fallida para permitir lanzarla de nuevo (los pasos se pueden repetir).
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy.orm import Session
+
+from . import crud_organization
+from .cache import invalidate_organization
+from .database import SessionLocal
+from .models_organization import OrganizationDataJob
+
+JOB_RESET = "reset"
+JOB_DELETE = "eliminar"
+
+ACTIVE_STATUSES = ("pendiente", "en_progreso")
+
+# Sin avances durante este tiempo, una tarea activa se considera interrumpida
+STALE_AFTER = timedelta(minutes=15)
+
+
+def start_data_job(db: Session, organization_id: int, kind: str, requested_by: int) -> Tuple[OrganizationDataJob, bool]:
+    """
+    Registra una tarea para la organización. Devuelve (tarea, creada): si ya
+    hay una activa se devuelve esa y no hay que lanzar otra.
+    """
+    active = db.query(OrganizationDataJob).filter(
+        OrganizationDataJob.organization_id == organization_id,
+        OrganizationDataJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(OrganizationDataJob.id.desc()).first()
+    if active is not None:
+        if active.updated_at and datetime.utcnow() - active.updated_at < STALE_AFTER:
+            return active, False
+        active.status = "fallido"
+        active.error = "Tarea interrumpida (sin avances)"
+        active.finished_at = datetime.utcnow()
+
+    job = OrganizationDataJob(
+        organization_id=organization_id,
+        kind=kind,
+        status="pendiente",
+        requested_by=requested_by,
+        updated_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job, True
+
+
+def run_data_job(job_id: int) -> None:
+    """Ejecuta la tarea con su propia sesión, guardando el avance en cada paso"""
+    db = SessionLocal()
+    job = db.get(OrganizationDataJob, job_id)
+    if job is None:
+        db.close()
+        return
+    organization_id = job.organization_id
+
+    def on_step(name: str, done: int, total: int, counts: dict):
+        job.current_step = name
+        job.steps_done = done
+        job.steps_total = total
+        job.result = json.dumps(counts)
+        job.updated_at = datetime.utcnow()
+
+    try:
+        job.status = "en_progreso"
+        job.started_at = job.updated_at = datetime.utcnow()
+        db.commit()
+
+        if job.kind == JOB_DELETE:
+            counts = crud_organization.delete_organization(db, organization_id, on_step)
+            if counts is None:
+                raise ValueError("Organización no encontrada")
+        else:
+            counts = crud_organization.reset_organization_data(db, organization_id, on_step)
+
+        job.status = "completado"
+        job.result = json.dumps(counts)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en la tarea {job.kind} de la organización {organization_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        job.status = "fallido"
+        job.error = str(e)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        invalidate_organization(organization_id)
+        invalidate_organization(None)  # El reset también limpia registros sin organización
+        db.close()
+
+
+def get_data_job(db: Session, job_id: int, organization_id: int = None):
+    query = db.query(OrganizationDataJob).filter(OrganizationDataJob.id == job_id)
+    if organization_id is not None:
+        query = query.filter(OrganizationDataJob.organization_id == organization_id)
+    return query.first()
+
+
+def job_status(job: OrganizationDataJob) -> dict:
+    counts = json.loads(job.result) if job.result else {}
+    return {
+        "job_id": job.id,
+        "organization_id": job.organization_id,
+        "kind": job.kind,
+        "status": job.status,
+        "current_step": job.current_step,
+        "steps_done": job.steps_done,
+        "steps_total": job.steps_total,
+        "progress": round(job.steps_done * 100 / job.steps_total) if job.steps_total else 0,
+        "deleted_counts": {},
+        "orphan_counts": {},
+        **counts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,268 @@
+"""
+Imágenes de la organización (logo y sello)
+
+Al subir una imagen se normaliza una sola vez: se valida con Pillow, se
+corrige la orientación EXIF, se reduce al tamaño máximo del tipo y se guarda
+como PNG (conserva la transparencia del sello). El nombre lleva un hash del
+contenido, así que la URL cambia cuando cambia la imagen y ninguna caché
+(navegador, PDFs) queda obsoleta.
+
+El almacenamiento es intercambiable: Cloudinary o el sistema de archivos
+local bajo static/ (sirve sin conexión y en pruebas). IMAGE_STORAGE vacío
+usa Cloudinary solo si hay credenciales.
+
+Las variantes que se usan al generar PDFs o en la interfaz (pdf, thumb) se
+guardan en static/cache/images/ con el hash del contenido en el nombre; se
+comparten entre workers y procesos de render y nunca se descargan dos veces.
+
+La subida (Pillow + Cloudinary) es bloqueante: los handlers async la
+ejecutan en un pool de hilos propio para no frenar el event loop.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .config import settings
+from .utils.cloudinary_helper import upload_image, delete_image
+
+STATIC_DIR = Path("static")
+CACHE_DIR = STATIC_DIR / "cache" / "images"
+
+# Formatos aceptados al subir
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+# Tamaño máximo (ancho, alto) de la imagen guardada por tipo
+IMAGE_MAX_SIZE = {
+    "logo": (800, 400),
+    "stamp": (600, 600),
+}
+
+# Carpeta por tipo (static/<carpeta> o sistema-gestion/<carpeta> en Cloudinary)
+IMAGE_FOLDERS = {
+    "logo": "logos",
+    "stamp": "stamps",
+}
+
+# Variantes derivadas: tamaño máximo (ancho, alto)
+IMAGE_VARIANTS = {
+    "pdf": (600, 600),
+    "thumb": (160, 160),
+}
+
+# Imágenes anteriores a la normalización: se reducen a este tamaño al cachearlas
+LEGACY_MAX_SIZE = (800, 800)
+
+DOWNLOAD_TIMEOUT_SECONDS = 10
+
+# Hash de contenido al final del nombre de las imágenes normalizadas
+_DIGEST_PATTERN = re.compile(r"_([0-9a-f]{16})\.png$")
+
+
+# ==================== NORMALIZACIÓN ====================
+
+def normalize_image(data: bytes, max_size: Tuple[int, int]) -> bytes:
+    """Valida la imagen y la devuelve como PNG de a lo sumo max_size; ValueError si no es válida"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError("Formato de imagen no soportado. Use JPG, PNG, GIF o WEBP")
+            image.load()
+            image = ImageOps.exif_transpose(image).convert("RGBA")
+            image.thumbnail(max_size, Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, "PNG", optimize=True)
+            return output.getvalue()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("El archivo no es una imagen válida")
+
+
+def _resize(png: bytes, max_size: Tuple[int, int]) -> bytes:
+    with Image.open(io.BytesIO(png)) as image:
+        if image.width <= max_size[0] and image.height <= max_size[1]:
+            return png
+        image.thumbnail(max_size, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, "PNG", optimize=True)
+        return output.getvalue()
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+# ==================== ALMACENAMIENTO ====================
+
+class ImageStorage(ABC):
+    """Interfaz mínima que debe implementar un backend de imágenes"""
+
+    @abstractmethod
+    def save(self, folder: str, name: str, data: bytes) -> str:
+        """Guarda la imagen y devuelve su URL"""
+
+    @abstractmethod
+    def delete(self, url: str) -> None:
+        ...
+
+
+class LocalImageStorage(ImageStorage):
+    """Archivos bajo static/, servidos por el mount /static de la app"""
+
+    def __init__(self, root: Path = STATIC_DIR, url_prefix: str = "/static"):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def save(self, folder: str, name: str, data: bytes) -> str:
+        _write_atomic(self.root / folder / name, data)
+        return f"{self.url_prefix}/{folder}/{name}"
+
+    def delete(self, url: str) -> None:
+        path = _static_path(url)
+        if path.exists():
+            path.unlink()
+            print(f"Imagen eliminada: {path}")
+
+
+class CloudinaryImageStorage(ImageStorage):
+    """Imágenes en Cloudinary (carpeta sistema-gestion/<carpeta>)"""
+
+    def save(self, folder: str, name: str, data: bytes) -> str:
+        url = upload_image(data, folder=f"sistema-gestion/{folder}", public_id=Path(name).stem)
+        if not url:
+            raise RuntimeError("Error al subir la imagen a Cloudinary")
+        return url
+
+    def delete(self, url: str) -> None:
+        # .../image/upload/v123/sistema-gestion/logos/org_1_logo_ab12.png -> sistema-gestion/logos/org_1_logo_ab12
+        match = re.search(r"/upload/(?:v\d+/)?(.+)\.\w+$", url)
+        if match:
+            delete_image(match.group(1))
+
+
+_storages = {
+    "local": LocalImageStorage(),
+    "cloudinary": CloudinaryImageStorage(),
+}
+
+
+def get_image_storage() -> ImageStorage:
+    backend = settings.IMAGE_STORAGE or ("cloudinary" if settings.CLOUDINARY_CLOUD_NAME else "local")
+    if backend not in _storages:
+        raise ValueError(f"IMAGE_STORAGE desconocido: {backend}")
+    return _storages[backend]
+
+
+def delete_stored_image(url: Optional[str]) -> None:
+    """Elimina una imagen guardada (Cloudinary o static/); los errores solo se registran"""
+    if not url:
+        return
+    storage = _storages["cloudinary"] if url.startswith(("http://", "https://")) else _storages["local"]
+    try:
+        storage.delete(url)
+    except Exception as e:
+        print(f"Advertencia: No se pudo eliminar la imagen {url}: {e}")
+
+
+def _static_path(url: str) -> Path:
+    """Ruta local de una URL /static/...; solo se permiten archivos dentro de static/"""
+    path = Path(url.lstrip("/")).resolve()
+    if STATIC_DIR.resolve() not in path.parents:
+        raise ValueError(f"Ruta fuera de static/: {url}")
+    return path
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Escribe en un temporal y lo renombra: otros procesos nunca ven un archivo a medias"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def fetch_image(url: str) -> bytes:
+    """Contenido de una imagen guardada (descarga si es remota)"""
+    if url.startswith(("http://", "https://")):
+        with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            return response.read()
+    return _static_path(url).read_bytes()
+
+
+# ==================== CACHÉ LOCAL DE VARIANTES ====================
+
+def _cache_digest(url: str) -> str:
+    """Hash del contenido si la URL es de una imagen normalizada; si no, hash de la URL"""
+    match = _DIGEST_PATTERN.search(url)
+    return match.group(1) if match else hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def image_variant(url: str, variant: str) -> bytes:
+    """PNG de la variante (pdf o thumb) de una imagen guardada, desde static/cache/images/"""
+    digest = _cache_digest(url)
+    path = CACHE_DIR / f"{digest}_{variant}.png"
+    if path.exists():
+        return path.read_bytes()
+
+    original_path = CACHE_DIR / f"{digest}.png"
+    if original_path.exists():
+        original = original_path.read_bytes()
+    else:
+        original = normalize_image(fetch_image(url), LEGACY_MAX_SIZE)
+        _write_atomic(original_path, original)
+
+    data = _resize(original, IMAGE_VARIANTS[variant])
+    _write_atomic(path, data)
+    return data
+
+
+def variant_url(url: str, variant: str) -> str:
+    """URL pública (mount /static) de la variante ya generada"""
+    return f"/static/cache/images/{_cache_digest(url)}_{variant}.png"
+
+
+# ==================== SUBIDA ====================
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix="image-upload")
+
+
+def store_organization_image(organization_id: int, kind: str, data: bytes) -> str:
+    """
+    Normaliza y guarda el logo o sello (kind) de la organización y devuelve su URL.
+    Deja las variantes en la caché local. La imagen anterior la elimina quien
+    llama, con delete_stored_image, después de confirmar la nueva URL.
+    Bloqueante: desde handlers async usar store_organization_image_async.
+    """
+    png = normalize_image(data, IMAGE_MAX_SIZE[kind])
+    digest = content_digest(png)
+    url = get_image_storage().save(IMAGE_FOLDERS[kind], f"org_{organization_id}_{kind}_{digest}.png", png)
+
+    _write_atomic(CACHE_DIR / f"{digest}.png", png)
+    for variant in IMAGE_VARIANTS:
+        image_variant(url, variant)
+    return url
+
+
+async def store_organization_image_async(organization_id: int, kind: str, data: bytes) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, store_organization_image, organization_id, kind, data)
+
+
+async def delete_stored_image_async(url: Optional[str]) -> None:
+    """delete_stored_image en el pool de hilos (Cloudinary hace una llamada de red)"""
+    if not url:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor, delete_stored_image, url)
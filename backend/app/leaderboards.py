@@ -0,0 +1,189 @@
+"""
+Rankings de productos y clientes (tablas product_leaderboard y client_leaderboard)
+
+Guardan, por organización, los totales acumulados de cada producto
+(cantidad, ingresos) y de cada cliente (compras, monto gastado), en un
+período histórico ('total') y en períodos mensuales ('YYYY-MM', por fecha
+de venta). Las ventas canceladas no cuentan.
+
+Los items de venta se insertan con Core (sin eventos del ORM), así que el
+mantenimiento es explícito: create_sale suma la venta con record_sale() y
+update_sale la resta/suma cuando entra o sale del estado cancelada. La
+contribución se calcula en SQL desde las filas guardadas, con el mismo
+SELECT que usa rebuild_leaderboards(). Las filas que quedan sin ventas se
+eliminan, así que toda fila guardada es un producto o cliente vigente.
+"""
+from datetime import datetime, time, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import String, cast, delete, func, literal, select, true
+from sqlalchemy.orm import Session
+
+from . import models_extended as models
+from .database import SessionLocal
+from .rollups import upsert_sums
+
+ALL_TIME = "total"
+
+PRODUCT_KEY = ["organization_id", "period", "product_id"]
+PRODUCT_MEASURES = ["quantity", "revenue", "line_count"]
+CLIENT_KEY = ["organization_id", "period", "client_id"]
+CLIENT_MEASURES = ["purchases", "total_spent"]
+
+# Columnas por las que se puede ordenar cada ranking
+PRODUCT_ORDERS = {"quantity": "quantity", "revenue": "revenue"}
+CLIENT_ORDERS = {"revenue": "total_spent", "purchases": "purchases"}
+
+
+def month_period(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+
+def _month_expression(column):
+    # 'YYYY-MM' desde la fecha: date() y substr() existen en SQLite y PostgreSQL
+    return func.substr(cast(func.date(column), String), 1, 7)
+
+
+# Las ventas canceladas no cuentan en los rankings
+_COUNTED_SALE = func.coalesce(models.Sale.status, "") != "cancelada"
+
+
+def _product_select(condition, monthly: bool, sign: int):
+    Sale, SaleItem = models.Sale, models.SaleItem
+    organization = func.coalesce(Sale.organization_id, 0)
+    period = _month_expression(Sale.sale_date) if monthly else literal(ALL_TIME)
+    group_by = [organization, period, SaleItem.product_id] if monthly else [organization, SaleItem.product_id]
+    query = select(
+        organization,
+        period,
+        SaleItem.product_id,
+        sign * func.sum(func.coalesce(SaleItem.quantity, 0)),
+        sign * func.sum(func.coalesce(SaleItem.subtotal, 0)),
+        sign * func.count(),
+    ).select_from(SaleItem).join(Sale, SaleItem.sale_id == Sale.id).where(
+        condition, _COUNTED_SALE, SaleItem.product_id.isnot(None)
+    )
+    if monthly:
+        query = query.where(Sale.sale_date.isnot(None))
+    return query.group_by(*group_by)
+
+
+def _client_select(condition, monthly: bool, sign: int):
+    Sale = models.Sale
+    organization = func.coalesce(Sale.organization_id, 0)
+    period = _month_expression(Sale.sale_date) if monthly else literal(ALL_TIME)
+    group_by = [organization, period, Sale.client_id] if monthly else [organization, Sale.client_id]
+    query = select(
+        organization,
+        period,
+        Sale.client_id,
+        sign * func.count(),
+        sign * func.sum(func.coalesce(Sale.total, 0)),
+    ).where(condition, _COUNTED_SALE, Sale.client_id.isnot(None))
+    if monthly:
+        query = query.where(Sale.sale_date.isnot(None))
+    return query.group_by(*group_by)
+
+
+def _product_contribution(condition, sign: int = 1):
+    return _product_select(condition, False, sign).union_all(_product_select(condition, True, sign))
+
+
+def _client_contribution(condition, sign: int = 1):
+    return _client_select(condition, False, sign).union_all(_client_select(condition, True, sign))
+
+
+def record_sale(db: Session, sale_id: int, sign: int = 1) -> None:
+    """
+    Suma (sign=1) o resta (sign=-1) una venta guardada en los rankings.
+    Una venta cancelada no aporta nada, así que restar antes de un cambio de
+    estado y sumar después deja los rankings al día en cualquier transición.
+    """
+    connection = db.connection()
+    condition = models.Sale.id == sale_id
+    upsert_sums(connection, models.ProductLeaderboard, PRODUCT_KEY, PRODUCT_MEASURES, _product_contribution(condition, sign))
+    upsert_sums(connection, models.ClientLeaderboard, CLIENT_KEY, CLIENT_MEASURES, _client_contribution(condition, sign))
+    if sign < 0:
+        _delete_empty_rows(connection, sale_id)
+
+
+def _delete_empty_rows(connection, sale_id: int) -> None:
+    """
+    Elimina las filas que quedaron sin ventas al restar una venta, para que
+    el top-N lea el índice sin filtrar filas vacías
+    """
+    Sale, SaleItem = models.Sale, models.SaleItem
+    Products, Clients = models.ProductLeaderboard, models.ClientLeaderboard
+    organization = select(func.coalesce(Sale.organization_id, 0)).where(Sale.id == sale_id).scalar_subquery()
+    connection.execute(delete(Products).where(
+        Products.organization_id == organization,
+        Products.product_id.in_(select(SaleItem.product_id).where(SaleItem.sale_id == sale_id)),
+        Products.line_count == 0
+    ))
+    connection.execute(delete(Clients).where(
+        Clients.organization_id == organization,
+        Clients.client_id == select(Sale.client_id).where(Sale.id == sale_id).scalar_subquery(),
+        Clients.purchases == 0
+    ))
+
+
+def rebuild_leaderboards(db: Session, organization_id: Optional[int] = None, all_organizations: bool = False) -> None:
+    """Recalcula los rankings desde las ventas, para una organización o para todas. No hace commit."""
+    if all_organizations:
+        condition = true()
+    elif organization_id:
+        condition = models.Sale.organization_id == organization_id
+    else:
+        condition = models.Sale.organization_id.is_(None)
+
+    for target, key, measures, contribution in [
+        (models.ProductLeaderboard, PRODUCT_KEY, PRODUCT_MEASURES, _product_contribution),
+        (models.ClientLeaderboard, CLIENT_KEY, CLIENT_MEASURES, _client_contribution),
+    ]:
+        delete_statement = delete(target)
+        if not all_organizations:
+            delete_statement = delete_statement.where(target.organization_id == (organization_id or 0))
+        db.execute(delete_statement)
+        db.execute(target.__table__.insert().from_select(key + measures, contribution(condition)))
+
+
+def ensure_leaderboards(engine) -> None:
+    """Llena los rankings la primera vez (tablas vacías con ventas existentes)"""
+    db = SessionLocal(bind=engine)
+    try:
+        if db.query(models.ProductLeaderboard.id).first() is not None:
+            return
+        if db.query(models.Sale.id).first() is None:
+            return
+        print("Calculando rankings de productos y clientes por primera vez...")
+        rebuild_leaderboards(db, all_organizations=True)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ No se pudieron calcular los rankings: {e}")
+    finally:
+        db.close()
+
+
+# ==================== LECTURA ====================
+
+def whole_months(start: Optional[datetime], end: Optional[datetime]) -> Optional[Tuple[str, str]]:
+    """
+    (primer mes, último mes) como 'YYYY-MM' si el rango cubre meses completos,
+    None si no. El inicio debe ser el día 1 a medianoche; el fin, el día 1 a
+    medianoche del mes siguiente o el último día del mes a las 23:59:59.
+    """
+    if start is None or end is None:
+        return None
+    if start.day != 1 or start.time() != time(0, 0):
+        return None
+
+    if end.day == 1 and end.time() == time(0, 0):
+        last_month = datetime(end.year - 1, 12, 1) if end.month == 1 else datetime(end.year, end.month - 1, 1)
+    elif end.time() >= time(23, 59, 59) and (end + timedelta(days=1)).day == 1:
+        last_month = end
+    else:
+        return None
+    if last_month < start:
+        return None
+    return month_period(start), month_period(last_month)
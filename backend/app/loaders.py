@@ -0,0 +1,50 @@
+"""
+Perfiles de carga de relaciones para los listados y detalles
+
+Los schemas de respuesta anidan relaciones (cliente, items, pagos, producto
+con categoría y proveedor). Sin opciones de carga, serializar una página de
+100 filas dispara una consulta por fila y relación (N+1). Cada perfil carga
+todo lo que lee su response_model:
+
+- contains_eager para el cliente/producto que la consulta ya une por JOIN
+  (requiere ese JOIN en la consulta, sin alias)
+- joinedload para las demás many-to-one
+- selectinload para las colecciones: una consulta IN por relación, sin
+  multiplicar las filas de la página (LIMIT sigue contando documentos)
+
+benchmarks/check_statement_budget.py verifica que cada listado cueste un
+número constante de sentencias. Si un schema agrega una relación, hay que
+agregarla al perfil correspondiente.
+"""
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+
+from . import models_extended as models
+
+# schemas.Product: categoría y proveedor
+PRODUCT_LOADERS = (
+    joinedload(models.Product.category),
+    joinedload(models.Product.supplier),
+)
+
+# schemas.Sale: cliente (JOIN de la consulta) e items con su producto (ProductSimple)
+SALE_LOADERS = (
+    contains_eager(models.Sale.client),
+    selectinload(models.Sale.items).joinedload(models.SaleItem.product),
+)
+
+# schemas.Rental: cliente y producto (JOIN de la consulta), items con su
+# producto y pagos; los productos (schemas.Product) con categoría y proveedor
+RENTAL_LOADERS = (
+    contains_eager(models.Rental.client),
+    contains_eager(models.Rental.product).joinedload(models.Product.category),
+    contains_eager(models.Rental.product).joinedload(models.Product.supplier),
+    selectinload(models.Rental.items).joinedload(models.RentalItem.product).joinedload(models.Product.category),
+    selectinload(models.Rental.items).joinedload(models.RentalItem.product).joinedload(models.Product.supplier),
+    selectinload(models.Rental.payments),
+)
+
+# schemas.Quotation: cliente (JOIN de la consulta) e items con su producto (ProductSimple)
+QUOTATION_LOADERS = (
+    contains_eager(models.Quotation.client),
+    selectinload(models.Quotation.items).joinedload(models.QuotationItem.product),
+)
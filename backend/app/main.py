@@ -8,8 +8,14 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from sqlalchemy import text
+from .search import ensure_search_index
+from .rollups import ensure_rollups
+from .leaderboards import ensure_leaderboards
+from .crud_notifications import ensure_notification_index
+from .scheduler import start_scheduler, stop_scheduler
+from .pdf_service import shutdown_pdf_pool
 from .routers import auth, products, categories, suppliers, inventory
-from .routers import clients, quotations, sales, rentals, dashboard, organizations, summary, notifications, failures
+from .routers import clients, quotations, sales, rentals, dashboard, organizations, summary, notifications, failures, exports
 
 # Importar modelos
 from . import models_extended
@@ -42,6 +48,56 @@ def startup_event():
             conn.commit()
         except:
             pass
+    
+    # Versión de los tokens (token_revocation.py); conexión propia: en PostgreSQL
+    # un ALTER fallido anterior deja abortada la transacción
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0;"))
+            conn.commit()
+        except:
+            conn.rollback()
+    
+    # RNC normalizado de clientes (ver migrate_client_rnc.py para el índice único)
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE clients ADD COLUMN rnc_normalized VARCHAR;"))
+            conn.commit()
+        except:
+            conn.rollback()
+        try:
+            conn.execute(text("""
+                UPDATE clients
+                SET rnc_normalized = NULLIF(TRIM(REPLACE(REPLACE(rnc, '-', ''), ' ', '')), '')
+                WHERE rnc_normalized IS NULL AND rnc IS NOT NULL
+            """))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ No se pudo completar rnc_normalized: {e}")
+    
+    # Índices de búsqueda de productos y clientes (FTS5 en SQLite, pg_trgm en PostgreSQL).
+    # Después de rnc_normalized: clients_fts lo indexa
+    ensure_search_index(engine)
+    
+    # Totales diarios (daily_rollups): se calculan la primera vez desde el historial
+    ensure_rollups(engine)
+    
+    # Rankings de productos y clientes: también se calculan la primera vez
+    ensure_leaderboards(engine)
+    
+    # Índice único de notificaciones vigentes (ON CONFLICT del generador) en bases existentes
+    ensure_notification_index(engine)
+    
+    # Barridos periódicos (alquileres y cotizaciones vencidas, notificaciones);
+    # solo el worker que obtiene el lock de líder los ejecuta
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_scheduler()
+    shutdown_pdf_pool()
 
 # Configurar CORS - Permitir frontend en producción y desarrollo
 import os
@@ -66,7 +122,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor"],
 )
 
 import logging
@@ -114,6 +170,9 @@ app.include_router(notifications.router)
 # Router de fallas del sistema
 app.include_router(failures.router)
 
+# Router de exportaciones (CSV / Excel)
+app.include_router(exports.router)
+
 # Crear directorio static si no existe
 static_dir = Path("static")
 static_dir.mkdir(exist_ok=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Enum, Numeric, Date
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Enum, Numeric, Date, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -82,6 +82,8 @@ class User(Base):
     last_login = Column(DateTime)
     failed_login_attempts = Column(Integer, default=0)
     locked_until = Column(DateTime, nullable=True)
+    # Claim "ver" de los tokens: al incrementarlo se invalidan todos los tokens emitidos
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=get_rd_now)
     updated_at = Column(DateTime, default=get_rd_now, onupdate=get_rd_now)
     
@@ -100,12 +102,19 @@ class User(Base):
 # Modelo de Cliente
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Listados por organización ordenados por (created_at, id): paginación por cursor
+        Index('ix_clients_org_created_id', 'organization_id', 'created_at', 'id'),
+        # Un RNC/Cédula (normalizado) por organización
+        Index('uq_clients_org_rnc_normalized', 'organization_id', 'rnc_normalized', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     client_type = Column(String, default=ClientType.PARTICULAR)  # hospital, medico, empresa, particular
     status = Column(String, default=ClientStatus.ACTIVO)  # activo, inactivo, suspendido
     rnc = Column(String, unique=True, index=True)  # RNC o cédula
+    rnc_normalized = Column(String)  # RNC sin guiones ni espacios (búsqueda y duplicados)
     email = Column(String)
     phone = Column(String)
     mobile = Column(String)
@@ -217,6 +226,12 @@ class Supplier(Base):
 # Modelo de Cotización
 class Quotation(Base):
     __tablename__ = "quotations"
+    __table_args__ = (
+        # Listados por organización ordenados por (created_at, id): paginación por cursor
+        Index('ix_quotations_org_created_id', 'organization_id', 'created_at', 'id'),
+        # Listados y métricas filtrados por estado
+        Index('ix_quotations_org_status_created', 'organization_id', 'status', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     quotation_number = Column(String, index=True, nullable=False)
@@ -284,6 +299,12 @@ class QuotationItem(Base):
 # Modelo de Venta
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Listados por organización ordenados por (created_at, id): paginación por cursor
+        Index('ix_sales_org_created_id', 'organization_id', 'created_at', 'id'),
+        # Listados y métricas filtrados por estado
+        Index('ix_sales_org_status_created', 'organization_id', 'status', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sale_number = Column(String, index=True, nullable=False)
@@ -334,6 +355,10 @@ class Sale(Base):
 # Items de Venta
 class SaleItem(Base):
     __tablename__ = "sale_items"
+    __table_args__ = (
+        # Líneas de una venta (detalle y productos más vendidos del período)
+        Index('ix_sale_items_sale_product', 'sale_id', 'product_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
@@ -369,6 +394,18 @@ class Payment(Base):
 # Modelo de Alquiler
 class Rental(Base):
     __tablename__ = "rentals"
+    __table_args__ = (
+        # Listados por organización ordenados por (created_at, id): paginación por cursor
+        Index('ix_rentals_org_created_id', 'organization_id', 'created_at', 'id'),
+        # Listados y métricas filtrados por estado
+        Index('ix_rentals_org_status_created', 'organization_id', 'status', 'created_at'),
+        # Barrido de vencidos: solo alquileres activos (índice parcial)
+        Index(
+            'ix_rentals_active_end_date', 'end_date',
+            postgresql_where=text("status = 'activo'"),
+            sqlite_where=text("status = 'activo'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     rental_number = Column(String, index=True, nullable=False)
@@ -447,6 +484,14 @@ class RentalItem(Base):
 # Modelo de Pagos de Alquiler
 class RentalPayment(Base):
     __tablename__ = "rental_payments"
+    __table_args__ = (
+        # Ingresos por período
+        Index('ix_rental_payments_org_payment_date', 'organization_id', 'payment_date'),
+        # Pagos de un alquiler (cubre la suma de montos sin leer la tabla)
+        Index('ix_rental_payments_rental_org_amount', 'rental_id', 'organization_id', 'amount'),
+        # Desglose por método de pago del resumen (solo índice, sin leer la tabla)
+        Index('ix_rental_payments_org_method', 'organization_id', 'payment_method', 'payment_date', 'amount'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     rental_id = Column(Integer, ForeignKey("rentals.id"), nullable=False)
@@ -468,6 +513,10 @@ class RentalPayment(Base):
 # Modelo de Movimientos de Inventario
 class InventoryMovement(Base):
     __tablename__ = "inventory_movements"
+    __table_args__ = (
+        # Listados por organización ordenados por (created_at, id): paginación por cursor
+        Index('ix_inventory_movements_org_created_id', 'organization_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -542,6 +591,23 @@ class SystemConfig(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Búsqueda de la notificación vigente por clave (generador de notificaciones)
+        Index('ix_notifications_org_key_deleted', 'organization_id', 'notification_key', 'is_deleted'),
+        # Una sola notificación vigente por clave: destino del INSERT ... ON CONFLICT del generador
+        Index(
+            'uq_notifications_org_key_live', 'organization_id', 'notification_key',
+            unique=True,
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+        # Bandeja de notificaciones: solo las no eliminadas (índice parcial)
+        Index(
+            'ix_notifications_org_live_created', 'organization_id', 'created_at',
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True, index=True)
@@ -563,6 +629,10 @@ class Notification(Base):
 class SystemFailure(Base):
     """Modelo para rastrear todas las fallas del sistema"""
     __tablename__ = "system_failures"
+    __table_args__ = (
+        # Listado y estadísticas de fallas por organización y período
+        Index('ix_system_failures_org_created', 'organization_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True, index=True)
@@ -599,3 +669,123 @@ class SystemFailure(Base):
     organization = relationship("Organization")
     user = relationship("User", foreign_keys=[user_id])
     resolver = relationship("User", foreign_keys=[resolved_by])
+
+
+class DocumentSequence(Base):
+    """
+    Contador de numeración de documentos por organización y tipo
+    (VEN, FAC, ALQ, COT). Reemplaza el escaneo de todos los números existentes.
+    """
+    __tablename__ = "document_sequences"
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'document_type', name='uq_document_sequence_org_type'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False, default=0)  # 0 = sin organización (super admin)
+    document_type = Column(String, nullable=False)  # VEN, FAC, ALQ, COT
+    last_number = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=get_rd_now, onupdate=get_rd_now)
+
+
+class RevokedToken(Base):
+    """
+    Tokens revocados antes de vencer (logout de una sesión), por su claim jti.
+    Cada worker los mantiene en memoria (token_revocation.py); las filas
+    vencidas se borran al revocar nuevos tokens.
+    """
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, nullable=True)  # Sin FK: el borrado de organizaciones elimina usuarios por conjunto
+    expires_at = Column(DateTime, nullable=False, index=True)  # exp del token (UTC)
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DailyRollup(Base):
+    """
+    Totales diarios pre-agregados por organización (ventas, alquileres y pagos
+    de alquiler) por estado y método de pago. Se mantiene en cada flush desde
+    rollups.py y alimenta los gráficos y totales del dashboard.
+    """
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            'organization_id', 'source', 'day', 'status', 'payment_method',
+            name='uq_daily_rollup_key'
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False, default=0)  # 0 = sin organización (super admin)
+    source = Column(String, nullable=False)  # venta, alquiler, pago_alquiler
+    day = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="")  # '' = sin estado
+    payment_method = Column(String, nullable=False, default="")  # '' = sin método
+    count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0)
+    paid_amount = Column(Float, nullable=False, default=0)
+    pending_balance = Column(Float, nullable=False, default=0)  # Solo saldos positivos (por cobrar)
+
+
+class ProductLeaderboard(Base):
+    """
+    Ranking de productos vendidos por organización: totales acumulados de
+    cantidad e ingresos, históricos (period='total') y por mes
+    (period='YYYY-MM'). Lo mantiene leaderboards.py al crear o cancelar ventas.
+    """
+    __tablename__ = "product_leaderboard"
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'period', 'product_id', name='uq_product_leaderboard_key'),
+        # Top-N por cantidad o por ingresos recorriendo el índice
+        Index('ix_product_leaderboard_quantity', 'organization_id', 'period', 'quantity'),
+        Index('ix_product_leaderboard_revenue', 'organization_id', 'period', 'revenue'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False, default=0)  # 0 = sin organización (super admin)
+    period = Column(String(7), nullable=False)  # 'total' o 'YYYY-MM'
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    line_count = Column(Integer, nullable=False, default=0)  # Líneas de venta; al llegar a 0 la fila se elimina
+
+
+class ClientLeaderboard(Base):
+    """
+    Ranking de clientes por organización: compras y monto gastado, históricos
+    (period='total') y por mes (period='YYYY-MM'). Lo mantiene leaderboards.py.
+    """
+    __tablename__ = "client_leaderboard"
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'period', 'client_id', name='uq_client_leaderboard_key'),
+        Index('ix_client_leaderboard_spent', 'organization_id', 'period', 'total_spent'),
+        Index('ix_client_leaderboard_purchases', 'organization_id', 'period', 'purchases'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False, default=0)  # 0 = sin organización (super admin)
+    period = Column(String(7), nullable=False)  # 'total' o 'YYYY-MM'
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    purchases = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Float, nullable=False, default=0)
+
+
+class ScheduledJobRun(Base):
+    """
+    Última ejecución de cada tarea periódica del scheduler. La escribe el
+    worker líder y la puede leer cualquier worker.
+    """
+    __tablename__ = "scheduled_job_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, unique=True, nullable=False)
+    last_started_at = Column(DateTime)
+    last_finished_at = Column(DateTime)
+    last_duration_ms = Column(Float)
+    last_result = Column(Text)  # Resumen de la última ejecución exitosa
+    last_error = Column(Text)  # Error de la última ejecución fallida (None si terminó bien)
+    run_count = Column(Integer, nullable=False, default=0)
+    failure_count = Column(Integer, nullable=False, default=0)
+    worker_pid = Column(Integer)  # Proceso que la ejecutó
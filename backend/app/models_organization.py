@@ -173,3 +173,29 @@ class OrganizationInvitation(Base):
             return False
         return True
 
+
+
+class OrganizationDataJob(Base):
+    """
+    Reset o eliminación de los datos de una organización ejecutado en segundo
+    plano (data_jobs.py). Guarda el progreso paso a paso para que cualquier
+    worker pueda informarlo.
+    """
+    __tablename__ = "organization_data_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False, index=True)  # Sin FK: sobrevive a la eliminación
+    kind = Column(String, nullable=False)  # reset, eliminar
+    status = Column(String, nullable=False, default="pendiente")  # pendiente, en_progreso, completado, fallido
+    requested_by = Column(Integer)
+    
+    current_step = Column(String)
+    steps_done = Column(Integer, nullable=False, default=0)
+    steps_total = Column(Integer, nullable=False, default=0)
+    result = Column(Text)  # JSON con los registros eliminados por paso
+    error = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # Último avance; detecta tareas interrumpidas
+    finished_at = Column(DateTime)
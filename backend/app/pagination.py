@@ -0,0 +1,92 @@
+"""
+Paginación por cursor (keyset) para los listados
+
+Los listados ordenan por (created_at DESC, id DESC). En vez de OFFSET, la
+página siguiente se pide con un cursor opaco que codifica el (created_at, id)
+de la última fila entregada, así que el costo no crece con la profundidad y
+las filas insertadas mientras se pagina no desplazan los resultados.
+
+El modo offset (skip/limit) se mantiene por compatibilidad. En ambos modos,
+cuando la página viene llena, el router devuelve el cursor de la página
+siguiente en el header X-Next-Cursor (el cuerpo sigue siendo una lista).
+
+Los listados de ventas, alquileres y cotizaciones aceptan view=summary: la
+consulta trae solo las columnas de la tabla y list_response serializa las
+filas directamente, sin el response_model anidado.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Codifica la posición (created_at, id) como un string opaco apto para URL"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica un cursor generado por encode_cursor; lanza ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
+
+
+def paginate(query: Query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Query:
+    """
+    Aplica el orden (created_at DESC, id DESC) y la paginación a un listado.
+    Con cursor usa keyset; sin cursor, offset/limit como antes.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id)
+            )
+        )
+        return query.limit(limit)
+
+    return query.offset(skip).limit(limit)
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """Cursor de la página siguiente, o None si esta página fue la última"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if last.created_at is None:
+        return None
+    return encode_cursor(last.created_at, last.id)
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Agrega el header X-Next-Cursor a la respuesta cuando hay más páginas"""
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def list_response(adapter: TypeAdapter, rows: Sequence, limit: int) -> Response:
+    """
+    Serializa una página de filas con el adapter (p. ej. List[schemas.SaleSummary])
+    y agrega X-Next-Cursor. Al devolver la Response directamente, FastAPI no
+    vuelve a validar el cuerpo contra el response_model del endpoint.
+    """
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    response = Response(content=body, media_type="application/json")
+    set_next_cursor(response, rows, limit)
+    return response
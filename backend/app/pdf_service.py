@@ -0,0 +1,356 @@
+"""
+Servicio de PDFs: cotizaciones, facturas y contratos de alquiler
+
+ReportLab es CPU puro y retiene el GIL, así que el render se hace en un pool
+de procesos (PDF_WORKERS por worker de gunicorn) y no bloquea las demás
+peticiones. A los procesos se les envían datos planos (ver *_payload); cada
+proceso guarda los estilos y el encabezado de cada organización (logo y sello
+ya descargados) entre documentos.
+
+Los PDFs terminados se guardan en una caché LRU acotada por tamaño
+(PDF_CACHE_MAX_MB). La clave incluye el updated_at del documento, del
+cliente y de la organización, así que cualquier cambio genera un PDF nuevo
+sin tener que invalidar nada.
+"""
+import multiprocessing
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from . import models_extended as models
+from .config import settings
+from .models_organization import Organization
+from .utils.pdf_generator import render_pdf
+
+# El ZIP del lote pasa a disco al superar este tamaño
+ARCHIVE_SPOOL_BYTES = 16 * 1024 * 1024
+
+# Bloques de lectura al enviar el ZIP
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+
+GENERAL_CLIENT = {"name": "Cliente General", "rnc": None, "phone": None}
+
+
+class PDFCache:
+    """Caché LRU de PDFs terminados, acotada por la suma de bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> bytes
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+            return pdf
+
+    def set(self, key: tuple, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = pdf
+            self.size += len(pdf)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+pdf_cache = PDFCache(settings.PDF_CACHE_MAX_MB * 1024 * 1024)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los procesos no heredan conexiones ni hilos del worker
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_pool() -> None:
+    """Detiene los procesos de render (shutdown de la app)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render(kind: str, payload: dict) -> bytes:
+    pool = _get_pool()
+    try:
+        return pool.submit(render_pdf, kind, payload).result(timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        # Un proceso murió (p. ej. por memoria): se recrea el pool y se reintenta una vez
+        _reset_pool(pool)
+        return _get_pool().submit(render_pdf, kind, payload).result(timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)
+
+
+# ==================== DATOS PARA LOS PROCESOS ====================
+
+def _version(obj) -> Optional[str]:
+    updated_at = getattr(obj, "updated_at", None) if obj is not None else None
+    return updated_at.isoformat() if updated_at else None
+
+
+def _company_payload(organization: Optional[Organization]) -> Optional[dict]:
+    if organization is None:
+        return None
+    address = " ".join(part for part in (organization.address, organization.address_number) if part)
+    if organization.city:
+        address = f"{address}, {organization.city}" if address else organization.city
+    return {
+        "id": organization.id,
+        "version": _version(organization),
+        "name": organization.name,
+        "address": address,
+        "phone": organization.phone,
+        "email": organization.invoice_email or organization.email,
+        "rnc": organization.rnc,
+        "logo_url": organization.logo_url,
+        "stamp_url": organization.stamp_url,
+    }
+
+
+def _client_payload(client: Optional[models.Client]) -> dict:
+    if client is None:
+        return dict(GENERAL_CLIENT)
+    return {"name": client.name, "rnc": client.rnc, "phone": client.phone}
+
+
+def _item_name(item) -> str:
+    if item.product_name:
+        return item.product_name
+    return item.product.name if item.product is not None else ""
+
+
+def _items_payload(items) -> List[dict]:
+    return [
+        {
+            "product_name": _item_name(item),
+            "quantity": item.quantity,
+            "unit_price": item.unit_price or 0,
+            "subtotal": item.subtotal or 0,
+        }
+        for item in items
+    ]
+
+
+def quotation_payload(quotation: models.Quotation) -> dict:
+    return {
+        "company": _company_payload(quotation.organization),
+        "client": _client_payload(quotation.client),
+        "items": _items_payload(quotation.items),
+        "document": {
+            "quotation_number": quotation.quotation_number,
+            "quotation_date": quotation.quotation_date or quotation.created_at,
+            "valid_until": quotation.valid_until,
+            "subtotal": quotation.subtotal or 0,
+            "discount_amount": quotation.discount_amount or 0,
+            "tax_amount": quotation.tax_amount or 0,
+            "total": quotation.total or 0,
+            "notes": quotation.notes,
+            "terms_conditions": quotation.terms_conditions,
+        },
+    }
+
+
+def invoice_payload(sale: models.Sale) -> dict:
+    return {
+        "company": _company_payload(sale.organization),
+        "client": _client_payload(sale.client),
+        "items": _items_payload(sale.items),
+        "document": {
+            "sale_number": sale.sale_number,
+            "invoice_number": sale.invoice_number,
+            "sale_date": sale.sale_date or sale.created_at,
+            "payment_method": sale.payment_method or "N/A",
+            "subtotal": sale.subtotal or 0,
+            "discount_amount": sale.discount_amount or 0,
+            "tax_amount": sale.tax_amount or 0,
+            "total": sale.total or 0,
+            "paid_amount": sale.paid_amount or 0,
+            "balance": sale.balance or 0,
+        },
+    }
+
+
+def rental_contract_payload(rental: models.Rental) -> dict:
+    if rental.product is not None:
+        product = {
+            "name": rental.product.name,
+            "sku": rental.product.sku,
+            "description": rental.product.description,
+        }
+    else:
+        # Alquiler de varios equipos: se listan los items
+        product = {
+            "name": ", ".join(f"{item.quantity} x {_item_name(item)}" for item in rental.items) or "N/A",
+            "sku": ", ".join(item.product.sku for item in rental.items if item.product is not None) or "N/A",
+            "description": None,
+        }
+    return {
+        "company": _company_payload(rental.organization),
+        "client": _client_payload(rental.client),
+        "product": product,
+        "document": {
+            "rental_number": rental.rental_number,
+            "start_date": rental.start_date,
+            "end_date": rental.end_date,
+            "condition_out": rental.condition_out,
+            "rental_period": rental.rental_period or "",
+            "rental_price": rental.rental_price or 0,
+            "deposit": rental.deposit or 0,
+            "total_cost": rental.total_cost or 0,
+            "paid_amount": rental.paid_amount or 0,
+            "balance": rental.balance or 0,
+        },
+    }
+
+
+PAYLOAD_BUILDERS = {
+    "quotation": quotation_payload,
+    "invoice": invoice_payload,
+    "rental_contract": rental_contract_payload,
+}
+
+
+def _cache_key(kind: str, document) -> tuple:
+    key = (kind, document.id, _version(document), _version(document.client), _version(document.organization))
+    if kind == "rental_contract":
+        key += (_version(document.product),)
+    return key
+
+
+# ==================== RENDER ====================
+
+def render_document(kind: str, document) -> bytes:
+    """PDF de un documento (quotation, invoice o rental_contract), desde la caché si no cambió"""
+    key = _cache_key(kind, document)
+    pdf = pdf_cache.get(key)
+    if pdf is None:
+        payload = PAYLOAD_BUILDERS[kind](document)
+        pdf = _render(kind, payload)
+        pdf_cache.set(key, pdf)
+    return pdf
+
+
+def render_documents(kind: str, documents) -> Iterator[Tuple[object, bytes]]:
+    """
+    PDFs de varios documentos, en el mismo orden. Mantiene como máximo
+    2 x PDF_WORKERS renders en curso para no acumular PDFs en memoria.
+    """
+    pool = _get_pool()
+    window = max(1, settings.PDF_WORKERS * 2)
+    pending = deque()  # (documento, clave, future o bytes)
+    try:
+        for document in documents:
+            key = _cache_key(kind, document)
+            pdf = pdf_cache.get(key)
+            if pdf is None:
+                pdf = pool.submit(render_pdf, kind, PAYLOAD_BUILDERS[kind](document))
+            pending.append((document, key, pdf))
+            while len(pending) > window:
+                yield _resolve(pending.popleft())
+        while pending:
+            yield _resolve(pending.popleft())
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    finally:
+        for _, _, result in pending:
+            if not isinstance(result, bytes):
+                result.cancel()
+
+
+def _resolve(entry) -> Tuple[object, bytes]:
+    document, key, result = entry
+    if isinstance(result, bytes):
+        return document, result
+    pdf = result.result(timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)
+    pdf_cache.set(key, pdf)
+    return document, pdf
+
+
+def _month_range(month: str) -> Tuple[datetime, datetime]:
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Mes inválido: {month}. Use el formato YYYY-MM")
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def build_invoice_archive(db: Session, organization_id: int, month: str):
+    """
+    ZIP con las facturas del mes (YYYY-MM) de la organización.
+    Devuelve (archivo temporal posicionado al inicio, cantidad de facturas).
+    """
+    start, end = _month_range(month)
+    sales = db.query(models.Sale).options(
+        joinedload(models.Sale.client),
+        joinedload(models.Sale.organization),
+        selectinload(models.Sale.items).joinedload(models.SaleItem.product)
+    ).filter(
+        models.Sale.organization_id == organization_id,
+        models.Sale.sale_date >= start,
+        models.Sale.sale_date < end
+    ).order_by(models.Sale.sale_date, models.Sale.id).all()
+
+    archive = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+    used_names = set()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for sale, pdf in render_documents("invoice", sales):
+            name = re.sub(r"[^\w.-]", "_", sale.invoice_number or sale.sale_number or str(sale.id))
+            if name in used_names:
+                name = f"{name}_{sale.id}"
+            used_names.add(name)
+            zip_file.writestr(f"{name}.pdf", pdf)
+    archive.seek(0)
+    return archive, len(sales)
+
+
+def iter_archive(archive) -> Iterator[bytes]:
+    """Envía el ZIP por bloques y cierra el archivo temporal al terminar"""
+    try:
+        while True:
+            chunk = archive.read(ARCHIVE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        archive.close()
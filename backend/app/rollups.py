@@ -0,0 +1,224 @@
+"""
+Totales diarios pre-agregados (tabla daily_rollups)
+
+Cada fila acumula, para una organización, un día, un estado y un método de
+pago: cantidad de documentos, total, pagado y saldo pendiente. Hay tres
+fuentes: ventas (por sale_date), alquileres (por created_at) y pagos de
+alquiler (por payment_date).
+
+Mantenimiento incremental: listeners de la sesión restan la contribución de
+las filas modificadas o eliminadas antes del flush y suman la de las filas
+nuevas o modificadas después del flush. La contribución siempre se calcula
+en SQL a partir de la fila guardada (INSERT ... SELECT ... ON CONFLICT DO
+UPDATE con sumas), igual que en la reconstrucción, así que ambos caminos dan
+el mismo resultado y las escrituras concurrentes solo suman deltas.
+
+Las operaciones masivas que no pasan por el ORM (reset de la organización)
+deben limpiar o reconstruir los totales con rebuild_rollups().
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, inspect, literal, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import BindParameter
+
+from . import models_extended as models
+from .database import SessionLocal
+
+SALE = "venta"
+RENTAL = "alquiler"
+RENTAL_PAYMENT = "pago_alquiler"
+
+ROLLUP_KEY = ["organization_id", "source", "day", "status", "payment_method"]
+ROLLUP_MEASURES = ["count", "total_amount", "paid_amount", "pending_balance"]
+
+
+def _source_columns():
+    """Modelo -> (fuente, día, estado, método, total, pagado, saldo)"""
+    Sale, Rental, RentalPayment = models.Sale, models.Rental, models.RentalPayment
+    return {
+        Sale: (SALE, Sale.sale_date, Sale.status, Sale.payment_method, Sale.total, Sale.paid_amount, Sale.balance),
+        Rental: (RENTAL, Rental.created_at, Rental.status, Rental.payment_method, Rental.total_cost, Rental.paid_amount, Rental.balance),
+        RentalPayment: (RENTAL_PAYMENT, RentalPayment.payment_date, None, RentalPayment.payment_method, RentalPayment.amount, RentalPayment.amount, None),
+    }
+
+
+ROLLUP_SOURCES = _source_columns()
+
+# Atributos que cambian la contribución de una fila; otros cambios (notas, fechas de devolución...) se ignoran
+TRACKED_ATTRIBUTES = {
+    model: ["organization_id"] + [column.key for column in columns[1:] if column is not None]
+    for model, columns in ROLLUP_SOURCES.items()
+}
+
+
+def contribution_select(model, condition, sign: int = 1):
+    """SELECT con la contribución de las filas de `model` que cumplen `condition`, agrupada por clave"""
+    source, day_column, status, method, total, paid, balance = ROLLUP_SOURCES[model]
+    day = func.date(day_column)
+    status = func.coalesce(status, "") if status is not None else literal("")
+    method = func.coalesce(method, "")
+    pending = case((balance > 0, balance), else_=0) if balance is not None else literal(0)
+    organization = func.coalesce(model.organization_id, 0)
+    # Las constantes no van en el GROUP BY (PostgreSQL no acepta literales ahí)
+    group_by = [organization, day, status, method]
+    return select(
+        organization,
+        literal(source),
+        day,
+        status,
+        method,
+        sign * func.count(),
+        sign * func.sum(func.coalesce(total, 0)),
+        sign * func.sum(func.coalesce(paid, 0)),
+        sign * func.sum(pending),
+    ).where(condition, day_column.isnot(None)).group_by(
+        *[expression for expression in group_by if not isinstance(expression, BindParameter)]
+    )
+
+
+def upsert_sums(connection, target, key, measures, source_select) -> None:
+    """
+    INSERT ... SELECT sobre `target`; si la clave ya existe, suma las medidas
+    a las guardadas (ON CONFLICT DO UPDATE). Sirve para sumar y para restar.
+    """
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    statement = insert(target).from_select(key + measures, source_select)
+    statement = statement.on_conflict_do_update(
+        index_elements=key,
+        set_={
+            measure: getattr(target, measure) + getattr(statement.excluded, measure)
+            for measure in measures
+        }
+    )
+    connection.execute(statement)
+
+
+def apply_contributions(connection, model, condition, sign: int) -> None:
+    """Suma (sign=1) o resta (sign=-1) la contribución de las filas a daily_rollups"""
+    upsert_sums(
+        connection, models.DailyRollup, ROLLUP_KEY, ROLLUP_MEASURES,
+        contribution_select(model, condition, sign)
+    )
+
+
+def rebuild_rollups(db: Session, organization_id: Optional[int] = None, all_organizations: bool = False) -> None:
+    """
+    Recalcula daily_rollups desde las tablas originales, para una organización
+    o para todas. No hace commit.
+    """
+    delete_statement = delete(models.DailyRollup)
+    if not all_organizations:
+        delete_statement = delete_statement.where(models.DailyRollup.organization_id == (organization_id or 0))
+    db.execute(delete_statement)
+
+    for model in ROLLUP_SOURCES:
+        if all_organizations:
+            condition = true()
+        elif organization_id:
+            condition = model.organization_id == organization_id
+        else:
+            condition = model.organization_id.is_(None)
+        db.execute(
+            models.DailyRollup.__table__.insert().from_select(
+                ROLLUP_KEY + ROLLUP_MEASURES, contribution_select(model, condition)
+            )
+        )
+
+
+def ensure_rollups(engine) -> None:
+    """Llena daily_rollups la primera vez (tabla vacía con historial existente)"""
+    db = SessionLocal(bind=engine)
+    try:
+        if db.query(models.DailyRollup.id).first() is not None:
+            return
+        if not any(db.query(model.id).first() is not None for model in ROLLUP_SOURCES):
+            return
+        print("Calculando totales diarios (daily_rollups) por primera vez...")
+        rebuild_rollups(db, all_organizations=True)
+        db.commit()
+    except Exception as e:
+        # Otro worker pudo llenarla al mismo tiempo (clave única)
+        db.rollback()
+        print(f"⚠️ No se pudieron calcular los totales diarios: {e}")
+    finally:
+        db.close()
+
+
+# ==================== MANTENIMIENTO EN EL FLUSH ====================
+
+def _rollup_changed(instance) -> bool:
+    state = inspect(instance)
+    return any(state.attrs[key].history.has_changes() for key in TRACKED_ATTRIBUTES[type(instance)])
+
+
+def _identity(instance) -> int:
+    return inspect(instance).identity[0]
+
+
+def _before_flush(session, flush_context, instances):
+    """Resta la contribución guardada de las filas que se van a modificar o eliminar"""
+    dirty = {}
+    for model in ROLLUP_SOURCES:
+        dirty[model] = [
+            _identity(instance) for instance in session.dirty
+            if type(instance) is model and _rollup_changed(instance)
+        ]
+        deleted = [_identity(instance) for instance in session.deleted if type(instance) is model]
+        if dirty[model] or deleted:
+            apply_contributions(session.connection(), model, model.id.in_(dirty[model] + deleted), -1)
+    session.info["rollup_dirty"] = dirty
+
+
+def _after_flush(session, flush_context):
+    """Suma la contribución de las filas nuevas y de las modificadas, ya guardadas"""
+    dirty = session.info.pop("rollup_dirty", {})
+    for model in ROLLUP_SOURCES:
+        ids = dirty.get(model, []) + [instance.id for instance in session.new if type(instance) is model]
+        if ids:
+            apply_contributions(session.connection(), model, model.id.in_(ids), 1)
+
+
+event.listen(SessionLocal, "before_flush", _before_flush)
+event.listen(SessionLocal, "after_flush", _after_flush)
+
+
+# ==================== LECTURA ====================
+
+def whole_days(start: Optional[datetime], end: Optional[datetime]) -> Optional[Tuple[Optional[date], Optional[date]]]:
+    """
+    (primer día, último día) si el rango cubre días completos, None si no.
+    El inicio debe ser medianoche; el fin puede ser medianoche (el día anterior
+    es el último, como envía el frontend) o 23:59:59. Un extremo None queda abierto.
+    """
+    if start is not None and start.time() != time(0, 0):
+        return None
+    first_day = start.date() if start is not None else None
+
+    if end is None:
+        return first_day, None
+    if end.time() == time(0, 0):
+        return first_day, end.date() - timedelta(days=1)
+    if end.time() >= time(23, 59, 59):
+        return first_day, end.date()
+    return None
+
+
+def day_window(first_day: Optional[date], last_day: Optional[date]):
+    """Condición sobre daily_rollups.day para un rango de días (extremos opcionales)"""
+    conditions = []
+    if first_day is not None:
+        conditions.append(models.DailyRollup.day >= first_day)
+    if last_day is not None:
+        conditions.append(models.DailyRollup.day <= last_day)
+    return and_(true(), *conditions)
+
+
+def rollup_filter(source: str, organization_id: Optional[int]):
+    """Filas de una fuente para una organización (None = registros sin organización)"""
+    return and_(
+        models.DailyRollup.organization_id == (organization_id or 0),
+        models.DailyRollup.source == source
+    )
@@ -1,6 +1,7 @@
-from datetime import timedelta
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..config import settings
@@ -11,7 +12,8 @@ from ..auth import get_current_active_user
 from .. import schemas_extended as schemas
 from .. import models_extended as models
 from ..limiter import limiter
-import datetime
+from ..token_revocation import bump_token_version, revoke_token
+from ..timezone_utils import get_rd_now
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -72,42 +74,24 @@ def register(
 @router.post("/login", response_model=schemas.Token)
 @limiter.limit("5/minute")
 def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    print(f"🔐 Intento de login:")
-    print(f"   Username/Email: {form_data.username}")
+    # Una sola lectura del usuario; la hora de RD sin zona, como se guarda locked_until
+    user = auth.get_login_user(db, form_data.username)
+    now = get_rd_now().replace(tzinfo=None)
     
-    # 1. Chequear bloqueo previo
-    user_check = db.query(models.User).filter(
-        (models.User.username == form_data.username) | (models.User.email == form_data.username)
-    ).first()
-
-    if user_check and user_check.locked_until:
-        # Usa get_rd_now si es posible, o utcnow()
-        from ..timezone_utils import get_rd_now
-        now = get_rd_now()
-        if user_check.locked_until > now:
-            raise HTTPException(
-                status_code=403,
-                detail="Cuenta bloqueada temporalmente por demasiados intentos fallidos. Inténtalo en 15 minutos."
-            )
-        else:
-            user_check.locked_until = None
-            user_check.failed_login_attempts = 0
-            db.commit()
-
-    # 2. Autenticar
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    if user and auth.is_locked_out(user, now):
+        raise HTTPException(
+            status_code=403,
+            detail=f"Cuenta bloqueada temporalmente por demasiados intentos fallidos. Inténtalo en {auth.LOGIN_LOCKOUT_MINUTES} minutos."
+        )
     
-    if not user:
-        print(f"❌ Login fallido: Usuario no encontrado o contraseña incorrecta")
-        # Incrementar fallos si el usuario existe
-        if user_check:
-            user_check.failed_login_attempts = (user_check.failed_login_attempts or 0) + 1
-            if user_check.failed_login_attempts >= 5:
-                from ..timezone_utils import get_rd_now
-                user_check.locked_until = get_rd_now() + datetime.timedelta(minutes=15)
-            db.commit()
-            print(f"   ⚠️ Incrementando fallos: {user_check.failed_login_attempts}/5")
-        
+    # Handler síncrono: las consultas corren en el threadpool y el hash en el pool de auth.py
+    is_valid, new_hash = False, None
+    if user:
+        is_valid, new_hash = auth.verify_password_pooled(form_data.password, user.hashed_password)
+    
+    if not is_valid:
+        if user:
+            auth.record_login_failure(db, user.id, now)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
@@ -115,31 +99,34 @@ def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db
         )
     
     if not user.is_active:
-        print(f"❌ Login fallido: Usuario inactivo (ID: {user.id})")
         raise HTTPException(status_code=400, detail="Usuario inactivo")
-        
-    # 3. Éxito: Resetear fallos
-    user.failed_login_attempts = 0
-    user.locked_until = None
-    db.commit()
     
-    print(f"✅ Login exitoso:")
-    print(f"   User ID: {user.id}")
-    print(f"   Email: {user.email}")
-    print(f"   Username: {user.username}")
-    print(f"   Role: {user.role}")
+    # Éxito: limpiar fallos (y guardar el hash rehecho) solo si hace falta
+    auth.record_login_success(db, user, new_hash)
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": auth.create_user_token(user), "token_type": "bearer"}
+
+
+@router.post("/logout")
+def logout(
+    token: str = Depends(auth.oauth2_scheme),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cierra la sesión actual: el token queda revocado hasta su vencimiento"""
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if current_user.jti:
+        revoke_token(db, current_user.jti, current_user.id, datetime.utcfromtimestamp(payload["exp"]))
+    return {"message": "Sesión cerrada exitosamente"}
 
 
 @router.get("/me")
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
+def read_users_me(
+    principal: auth.Principal = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """Obtener información del usuario actual"""
+    current_user = auth.load_user(db, principal)
     try:
         return {
             "id": current_user.id,
@@ -163,10 +150,11 @@ async def read_users_me(current_user: models.User = Depends(auth.get_current_act
 @router.put("/change-password")
 async def change_password(
     password_data: dict,
-    current_user: models.User = Depends(auth.get_current_active_user),
+    principal: auth.Principal = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Cambia la contraseña del usuario actual"""
+    current_user = auth.load_user(db, principal)
     current_password = password_data.get("current_password")
     new_password = password_data.get("new_password")
     
@@ -177,7 +165,8 @@ async def change_password(
         )
     
     # Verificar contraseña actual
-    if not auth.verify_password(current_password, current_user.hashed_password):
+    is_valid, _ = await auth.verify_password_async(current_password, current_user.hashed_password)
+    if not is_valid:
         raise HTTPException(
             status_code=400,
             detail="La contraseña actual es incorrecta"
@@ -190,14 +179,19 @@ async def change_password(
             detail="La nueva contraseña debe tener al menos 6 caracteres"
         )
     
-    # Actualizar contraseña
-    new_hashed_password = auth.get_password_hash(new_password)
+    # Actualizar contraseña; las demás sesiones se cierran y la actual recibe un token nuevo
+    new_hashed_password = await auth.get_password_hash_async(new_password)
     current_user.hashed_password = new_hashed_password
+    bump_token_version(db, user_id=current_user.id)
     
     db.commit()
-    db.refresh(current_user)
+    auth.invalidate_principal(current_user.id)
     
-    return {"message": "Contraseña cambiada exitosamente"}
+    return {
+        "message": "Contraseña cambiada exitosamente",
+        "access_token": auth.create_user_token(current_user),
+        "token_type": "bearer"
+    }
 
 
 @router.put("/session-settings")
@@ -237,17 +231,23 @@ async def update_session_settings(
 
 
 @router.post("/logout-all-sessions")
-async def logout_all_sessions(
-    current_user: schemas.User = Depends(get_current_active_user),
+def logout_all_sessions(
+    principal: auth.Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Cierra todas las sesiones del usuario excepto la actual"""
-    # TODO: Implementar lógica para invalidar tokens JWT
-    # Por ahora solo retornamos un mensaje de éxito
+    """
+    Cierra todas las sesiones del usuario: incrementa token_version, así que
+    todos los tokens emitidos dejan de valer. La sesión actual sigue con el
+    token nuevo de la respuesta.
+    """
+    bump_token_version(db, user_id=principal.id)
+    db.commit()
+    auth.invalidate_principal(principal.id)
     
     return {
         "message": "Todas las sesiones han sido cerradas exitosamente",
-        "sessions_closed": 1  # Simulado
+        "access_token": auth.create_user_token(auth.load_user(db, principal)),
+        "token_type": "bearer"
     }
 
 
@@ -286,7 +286,7 @@ async def create_user_by_admin(
         )
     
     # Crear usuario
-    hashed_password = auth.get_password_hash(user_data.password)
+    hashed_password = await auth.get_password_hash_async(user_data.password)
     # Generar username desde el email
     username = user_data.email.split('@')[0]
     db_user = models.User(
@@ -340,6 +340,7 @@ async def update_user_by_admin(
         user.role = user_data['role']
     
     db.commit()
+    auth.invalidate_principal(user.id)
     db.refresh(user)
     
     return user
@@ -365,9 +366,11 @@ async def reset_user_password(
     if not new_password:
         raise HTTPException(status_code=400, detail="Se requiere la nueva contraseña")
     
-    # Actualizar contraseña
-    user.hashed_password = auth.get_password_hash(new_password)
+    # Actualizar contraseña y cerrar las sesiones abiertas del usuario
+    user.hashed_password = await auth.get_password_hash_async(new_password)
+    bump_token_version(db, user_id=user.id)
     db.commit()
+    auth.invalidate_principal(user.id)
     
     return {"message": "Contraseña actualizada exitosamente"}
 
@@ -396,6 +399,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    auth.invalidate_principal(user_id)
     
     return {"message": "Usuario eliminado exitosamente"}
 
@@ -478,6 +482,7 @@ async def recover_super_admin(db: Session = Depends(get_db)):
             existing.username = "superadmin"
             existing.full_name = "Super Administrador"
             db.commit()
+            auth.invalidate_principal(existing.id)
             
             return {
                 "status": "success",
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
+from ..pagination import set_next_cursor
 from ..auth import get_current_active_user
 from .. import models_extended as models, schemas_extended as schemas
 from ..crud_clients import (
     get_client, get_clients, create_client, update_client, 
-    delete_client, get_client_by_rnc, get_client_stats
+    delete_client, get_client_by_rnc, get_client_stats, search_clients_typeahead
 )
 
 router = APIRouter(prefix="/api/clients", tags=["clients"])
@@ -14,18 +15,37 @@ router = APIRouter(prefix="/api/clients", tags=["clients"])
 
 @router.get("/", response_model=List[schemas.Client])
 def read_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Obtiene lista de clientes con filtros opcionales"""
-    clients = get_clients(db, skip=skip, limit=limit, search=search, status=status, organization_id=current_user.organization_id)
+    try:
+        clients = get_clients(db, skip=skip, limit=limit, search=search, status=status, organization_id=current_user.organization_id, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not search:
+        # Con búsqueda el orden es por relevancia y no hay cursor
+        set_next_cursor(response, clients, limit)
     return clients
 
 
+@router.get("/typeahead", response_model=List[schemas.ClientTypeahead])
+def read_clients_typeahead(
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Sugerencias de clientes para autocompletar (id, nombre y RNC)"""
+    return search_clients_typeahead(db, q, limit=limit, organization_id=current_user.organization_id)
+
+
 @router.get("/{client_id}", response_model=schemas.Client)
 def read_client(
     client_id: int,
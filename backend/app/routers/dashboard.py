@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..database import get_db
-from ..auth import get_current_active_user
+from ..auth import get_current_active_user, get_current_super_admin
+from ..cache import dashboard_cache
+from ..config import settings
+from ..scheduler import get_scheduler_status
 from .. import models_extended as models, schemas_extended as schemas
 from ..crud_dashboard import (
     get_dashboard_stats, get_sales_chart_data, get_rentals_chart_data, get_top_products,
@@ -25,10 +28,14 @@ def read_dashboard_stats(
     # Usuarios normales solo ven datos de su organización
     org_id = current_user.organization_id
     
-    stats = get_dashboard_stats(db, org_id, start_date, end_date)
+    stats = dashboard_cache.get_or_compute(
+        "stats", org_id, {"start_date": start_date, "end_date": end_date},
+        lambda: get_dashboard_stats(db, org_id, start_date, end_date)
+    )
     
-    # Generar notificaciones basadas en las estadísticas
-    if org_id:
+    # Generar notificaciones basadas en las estadísticas (con el scheduler
+    # activo las genera el barrido periódico, no cada carga del dashboard)
+    if org_id and not settings.SCHEDULER_ENABLED:
         generate_dashboard_notifications(db, org_id, stats)
     
     return stats
@@ -45,8 +52,13 @@ def read_sales_chart(
     """Obtiene datos del gráfico de ventas para la organización del usuario"""
     org_id = current_user.organization_id
     
+    data = dashboard_cache.get_or_compute(
+        "sales-chart", org_id, {"days": days, "start_date": start_date, "end_date": end_date},
+        lambda: get_sales_chart_data(db, org_id, days, start_date, end_date)
+    )
+    
     return {
-        "data": get_sales_chart_data(db, org_id, days, start_date, end_date),
+        "data": data,
         "period": f"{days} días"
     }
 
@@ -62,8 +74,13 @@ def read_rentals_chart(
     """Obtiene datos del gráfico de alquileres para la organización del usuario"""
     org_id = current_user.organization_id
     
+    data = dashboard_cache.get_or_compute(
+        "rentals-chart", org_id, {"days": days, "start_date": start_date, "end_date": end_date},
+        lambda: get_rentals_chart_data(db, org_id, days, start_date, end_date)
+    )
+    
     return {
-        "data": get_rentals_chart_data(db, org_id, days, start_date, end_date),
+        "data": data,
         "period": f"{days} días"
     }
 
@@ -71,23 +88,33 @@ def read_rentals_chart(
 @router.get("/top-products")
 def read_top_products(
     limit: int = 10,
+    order_by: str = Query("quantity", pattern="^(quantity|revenue)$"),
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mes YYYY-MM; sin valor = histórico"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Obtiene los productos más vendidos de la organización del usuario"""
     org_id = current_user.organization_id
-    return get_top_products(db, org_id, limit)
+    return dashboard_cache.get_or_compute(
+        "top-products", org_id, {"limit": limit, "order_by": order_by, "month": month},
+        lambda: get_top_products(db, org_id, limit, order_by, month)
+    )
 
 
 @router.get("/top-clients")
 def read_top_clients(
     limit: int = 10,
+    order_by: str = Query("revenue", pattern="^(revenue|purchases)$"),
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mes YYYY-MM; sin valor = histórico"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Obtiene los clientes que más compran de la organización del usuario"""
     org_id = current_user.organization_id
-    return get_top_clients(db, org_id, limit)
+    return dashboard_cache.get_or_compute(
+        "top-clients", org_id, {"limit": limit, "order_by": order_by, "month": month},
+        lambda: get_top_clients(db, org_id, limit, order_by, month)
+    )
 
 
 @router.get("/recent-activities")
@@ -98,4 +125,21 @@ def read_recent_activities(
 ):
     """Obtiene actividades recientes de la organización del usuario"""
     org_id = current_user.organization_id
-    return get_recent_activities(db, org_id, limit)
\ No newline at end of file
+    return get_recent_activities(db, org_id, limit)
+
+
+@router.get("/cache-stats")
+def read_cache_stats(
+    current_user: models.User = Depends(get_current_super_admin)
+):
+    """Contadores de aciertos/fallos de la caché del dashboard (por worker)"""
+    return dashboard_cache.stats()
+
+
+@router.get("/scheduler-status")
+def read_scheduler_status(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_super_admin)
+):
+    """Última ejecución de cada tarea periódica (duración, resultado y errores)"""
+    return get_scheduler_status(db)
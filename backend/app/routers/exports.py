@@ -0,0 +1,123 @@
+"""
+Router de exportaciones a CSV y Excel
+
+Las filas se envían a medida que se leen de la base (ver crud_exports): el
+CSV empieza a llegar de inmediato y el XLSX se arma con memoria acotada.
+Fechas opcionales en formato YYYY-MM-DD (la fecha final incluye todo el día).
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from .. import models_extended as models
+from ..auth import get_current_active_user
+from ..crud_exports import (
+    ExportQuery, clients_export, products_export, sales_export,
+    rentals_export, inventory_movements_export, iter_export_rows
+)
+from ..database import SessionLocal
+from ..utils.excel_exporter import stream_csv, stream_xlsx
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+FORMAT_PATTERN = "^(csv|xlsx)$"
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _parse_date(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    if not value or not value.strip():
+        return None
+    try:
+        parsed = datetime.strptime(value.strip(), '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {value}. Use el formato YYYY-MM-DD")
+    if end_of_day:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return parsed
+
+
+def _export_response(export: ExportQuery, format: str) -> StreamingResponse:
+    def rows():
+        # Sesión propia: vive mientras se envía la respuesta
+        db = SessionLocal()
+        try:
+            yield from iter_export_rows(db, export)
+        finally:
+            db.close()
+
+    filename = f"{export.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    if format == "xlsx":
+        body = stream_xlsx(export.sheet_name, export.headers, rows())
+        media_type = XLSX_MEDIA_TYPE
+    else:
+        body = stream_csv(export.headers, rows())
+        media_type = "text/csv; charset=utf-8"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/clients")
+def export_clients(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Exporta los clientes (filtro de fechas por fecha de creación)"""
+    export = clients_export(current_user.organization_id, _parse_date(start_date), _parse_date(end_date, True))
+    return _export_response(export, format)
+
+
+@router.get("/products")
+def export_products(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Exporta los productos (filtro de fechas por fecha de creación)"""
+    export = products_export(current_user.organization_id, _parse_date(start_date), _parse_date(end_date, True))
+    return _export_response(export, format)
+
+
+@router.get("/sales")
+def export_sales(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Exporta las ventas (filtro de fechas por fecha de venta)"""
+    export = sales_export(current_user.organization_id, _parse_date(start_date), _parse_date(end_date, True))
+    return _export_response(export, format)
+
+
+@router.get("/rentals")
+def export_rentals(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Exporta los alquileres (filtro de fechas por fecha de inicio)"""
+    export = rentals_export(current_user.organization_id, _parse_date(start_date), _parse_date(end_date, True))
+    return _export_response(export, format)
+
+
+@router.get("/inventory-movements")
+def export_inventory_movements(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Exporta los movimientos de inventario (filtro de fechas por fecha del movimiento)"""
+    export = inventory_movements_export(current_user.organization_id, _parse_date(start_date), _parse_date(end_date, True))
+    return _export_response(export, format)
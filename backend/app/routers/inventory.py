@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 # Usar modelos extendidos por defecto
 from .. import schemas_extended as schemas
@@ -7,6 +7,7 @@ from .. import models_extended as models
 
 from .. import crud, auth
 from ..database import get_db
+from ..pagination import set_next_cursor
 
 router = APIRouter(prefix="/api/inventory", tags=["inventory"])
 
@@ -36,19 +37,26 @@ def create_movement(
 
 @router.get("/movements", response_model=List[schemas.InventoryMovement])
 def read_movements(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     product_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    movements = crud.get_inventory_movements(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        product_id=product_id,
-        organization_id=current_user.organization_id
-    )
+    try:
+        movements = crud.get_inventory_movements(
+            db, 
+            skip=skip, 
+            limit=limit, 
+            product_id=product_id,
+            organization_id=current_user.organization_id,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, movements, limit)
     return movements
 
 
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
 from ..auth import get_current_active_user
+from ..config import settings
 from .. import models_extended as models, schemas_extended as schemas
 from ..crud_notifications import (
     get_notifications, get_notification, create_notification, update_notification,
@@ -24,15 +25,15 @@ def read_notifications(
     print(f"DEBUG: read_notifications called for org_id={current_user.organization_id}, user_id={current_user.id}")
     
     # Generar notificaciones automáticamente basadas en datos actuales
-    from ..crud_notification_generator import generate_dashboard_notifications
-    from ..crud_dashboard import get_dashboard_stats
-    
-    # Obtener estadísticas actuales y generar notificaciones
-    stats = get_dashboard_stats(db, current_user.organization_id)
-    print(f"DEBUG: Stats obtenidas: {stats}")
-    
-    generated = generate_dashboard_notifications(db, current_user.organization_id, stats)
-    print(f"DEBUG: Notificaciones generadas: {len(generated)}")
+    # (con el scheduler activo las genera el barrido periódico)
+    if not settings.SCHEDULER_ENABLED:
+        from ..crud_notification_generator import generate_dashboard_notifications
+        from ..crud_dashboard import get_dashboard_stats
+        
+        # Obtener estadísticas actuales y generar notificaciones
+        stats = get_dashboard_stats(db, current_user.organization_id)
+        generated = generate_dashboard_notifications(db, current_user.organization_id, stats)
+        print(f"DEBUG: Notificaciones generadas: {len(generated)}")
     
     # Obtener notificaciones SIN filtrar por user_id (son a nivel de organización)
     notifications = get_notifications(db, current_user.organization_id, None, skip, limit)
@@ -72,7 +73,10 @@ def create_new_notification(
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Crea una nueva notificación"""
-    return create_notification(db, notification, current_user.organization_id, current_user.id)
+    try:
+        return create_notification(db, notification, current_user.organization_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/{notification_id}", response_model=schemas.Notification)
@@ -1,22 +1,21 @@
 """
 Router para gestión de organizaciones (Sistema SaaS)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
 import shutil
 import os
-from pathlib import Path
 
 from ..database import get_db
 from .. import models_extended
 from .. import models_organization
 from .. import schemas_organization as schemas
 from .. import crud_organization as crud
+from .. import data_jobs
 from ..auth import get_current_active_user, get_current_admin_user
 from ..models_organization import OrganizationStatus
-from ..utils.cloudinary_helper import upload_image, delete_image
+from ..image_service import store_organization_image_async, delete_stored_image, delete_stored_image_async, variant_url
 
 # Alias para facilitar el uso
 models = models_extended
@@ -24,6 +23,8 @@ Organization = models_organization.Organization
 
 router = APIRouter(prefix="/api/organizations", tags=["organizations"])
 
+MAX_IMAGE_UPLOAD_BYTES = 10 * 1024 * 1024
+
 
 # ============================================================================
 # RUTAS PÚBLICAS (Sin autenticación)
@@ -294,74 +295,84 @@ def update_my_organization_settings(
         raise HTTPException(status_code=500, detail="Error interno al actualizar configuración")
 
 
+async def _read_image_upload(file: UploadFile) -> bytes:
+    """Lee la imagen subida y valida su tipo real por firmas (Magic Numbers)"""
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo debe ser una imagen"
+        )
+    
+    file_content = await file.read()
+    if len(file_content) > MAX_IMAGE_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail="La imagen no puede superar los 10 MB")
+    
+    is_valid_image = False
+    if file_content.startswith(b'\xff\xd8\xff'):
+        is_valid_image = True # JPEG
+    elif file_content.startswith(b'\x89PNG\r\n\x1a\n'):
+        is_valid_image = True # PNG
+    elif file_content.startswith(b'GIF87a') or file_content.startswith(b'GIF89a'):
+        is_valid_image = True # GIF
+    elif file_content.startswith(b'RIFF') and file_content[8:12] == b'WEBP':
+        is_valid_image = True # WEBP
+        
+    if not is_valid_image:
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo no es una imagen válida (falsificación de extensión detectada). Intentaste subir un archivo peligroso."
+        )
+    return file_content
+
+
+async def _store_image(organization_id: int, kind: str, file_content: bytes) -> str:
+    """Normaliza y guarda la imagen en el pool de hilos de image_service"""
+    try:
+        return await store_organization_image_async(organization_id, kind, file_content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error al guardar imagen ({kind}): {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al procesar la imagen: {str(e)}"
+        )
+
+
 @router.post("/me/upload-logo")
 async def upload_organization_logo(
     file: UploadFile = File(...),
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Sube el logo de la organización a Cloudinary"""
+    """Sube el logo de la organización (normalizado a PNG, ver image_service)"""
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(
             status_code=403,
             detail="Solo el administrador puede cambiar el logo"
         )
     
-    # Validar tipo de archivo
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400,
-            detail="El archivo debe ser una imagen"
-        )
+    file_content = await _read_image_upload(file)
     
-    try:
-        # Leer contenido del archivo
-        file_content = await file.read()
-        
-        # Validar extensión real por firmas (Magic Numbers)
-        is_valid_image = False
-        if file_content.startswith(b'\xff\xd8\xff'):
-            is_valid_image = True # JPEG
-        elif file_content.startswith(b'\x89PNG\r\n\x1a\n'):
-            is_valid_image = True # PNG
-        elif file_content.startswith(b'GIF87a') or file_content.startswith(b'GIF89a'):
-            is_valid_image = True # GIF
-        elif file_content.startswith(b'RIFF') and file_content[8:12] == b'WEBP':
-            is_valid_image = True # WEBP
-            
-        if not is_valid_image:
-            raise HTTPException(
-                status_code=400,
-                detail="El archivo no es una imagen válida (falsificación de extensión detectada). Intentaste subir un archivo peligroso."
-            )
-        
-        # Subir a Cloudinary
-        public_id = f"org_{current_user.organization_id}_logo"
-        logo_url = upload_image(
-            file_content,
-            folder="sistema-gestion/logos",
-            public_id=public_id
-        )
-        
-        if not logo_url:
-            raise HTTPException(
-                status_code=500,
-                detail="Error al subir la imagen a Cloudinary"
-            )
-        
-        # Actualizar URL del logo en la organización
-        organization = crud.update_organization_logo(db, current_user.organization_id, logo_url)
-        
-        if not organization:
-            raise HTTPException(status_code=404, detail="Organización no encontrada")
-        
-        return {"logo_url": logo_url, "message": "Logo actualizado correctamente"}
+    organization = crud.get_organization(db, current_user.organization_id)
+    if not organization:
+        raise HTTPException(status_code=404, detail="Organización no encontrada")
     
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al procesar la imagen: {str(e)}"
-        )
+    previous_url = organization.logo_url
+    logo_url = await _store_image(current_user.organization_id, "logo", file_content)
+    
+    # Actualizar URL del logo en la organización
+    crud.update_organization_logo(db, current_user.organization_id, logo_url)
+    
+    # La imagen anterior se elimina solo cuando la nueva URL ya está guardada
+    if previous_url != logo_url:
+        await delete_stored_image_async(previous_url)
+    
+    return {
+        "logo_url": logo_url,
+        "thumbnail_url": variant_url(logo_url, "thumb"),
+        "message": "Logo actualizado correctamente"
+    }
 
 
 @router.delete("/me/logo")
@@ -381,21 +392,15 @@ def delete_organization_logo(
         if not organization:
             raise HTTPException(status_code=404, detail="Organización no encontrada")
         
-        # Eliminar archivo físico si existe (solo si es URL local, no Cloudinary)
-        if organization.logo_url and not organization.logo_url.startswith('http'):
-            try:
-                logo_path = Path(f"static/logos/{organization.logo_url.split('/')[-1]}")
-                if logo_path.exists():
-                    logo_path.unlink()
-                    print(f"Logo eliminado: {logo_path}")
-            except Exception as file_error:
-                print(f"Advertencia: No se pudo eliminar archivo físico: {file_error}")
-        
         # Actualizar la organización para quitar el logo
+        logo_url = organization.logo_url
         organization.logo_url = None
         db.commit()
         db.refresh(organization)
         
+        # Eliminar la imagen guardada (static/ o Cloudinary), ya sin referencias
+        delete_stored_image(logo_url)
+        
         return {"message": "Logo eliminado correctamente"}
     
     except HTTPException:
@@ -413,71 +418,36 @@ async def upload_organization_stamp(
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Sube el sello/firma de la organización para facturas a Cloudinary"""
+    """Sube el sello/firma de la organización para facturas (normalizado a PNG, ver image_service)"""
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(
             status_code=403,
             detail="Solo el administrador puede cambiar el sello"
         )
     
-    # Validar tipo de archivo
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400,
-            detail="El archivo debe ser una imagen"
-        )
+    file_content = await _read_image_upload(file)
     
-    try:
-        # Leer contenido del archivo
-        file_content = await file.read()
-        
-        # Validar extensión real por firmas (Magic Numbers)
-        is_valid_image = False
-        if file_content.startswith(b'\xff\xd8\xff'):
-            is_valid_image = True # JPEG
-        elif file_content.startswith(b'\x89PNG\r\n\x1a\n'):
-            is_valid_image = True # PNG
-        elif file_content.startswith(b'GIF87a') or file_content.startswith(b'GIF89a'):
-            is_valid_image = True # GIF
-        elif file_content.startswith(b'RIFF') and file_content[8:12] == b'WEBP':
-            is_valid_image = True # WEBP
-            
-        if not is_valid_image:
-            raise HTTPException(
-                status_code=400,
-                detail="El archivo no es una imagen válida (falsificación de extensión detectada). Intentaste subir un archivo peligroso."
-            )
-        
-        # Subir a Cloudinary
-        public_id = f"org_{current_user.organization_id}_stamp"
-        stamp_url = upload_image(
-            file_content,
-            folder="sistema-gestion/stamps",
-            public_id=public_id
-        )
-        
-        if not stamp_url:
-            raise HTTPException(
-                status_code=500,
-                detail="Error al subir la imagen a Cloudinary"
-            )
-        
-        # Actualizar URL del sello en la organización
-        organization = crud.get_organization(db, current_user.organization_id)
-        if not organization:
-            raise HTTPException(status_code=404, detail="Organización no encontrada")
-        
-        organization.stamp_url = stamp_url
-        db.commit()
-        db.refresh(organization)
-        
-        return {"stamp_url": stamp_url, "message": "Sello actualizado correctamente"}
+    organization = crud.get_organization(db, current_user.organization_id)
+    if not organization:
+        raise HTTPException(status_code=404, detail="Organización no encontrada")
     
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al procesar la imagen: {str(e)}"
-        )
+    previous_url = organization.stamp_url
+    stamp_url = await _store_image(current_user.organization_id, "stamp", file_content)
+    
+    # Actualizar URL del sello en la organización
+    organization.stamp_url = stamp_url
+    db.commit()
+    db.refresh(organization)
+    
+    # La imagen anterior se elimina solo cuando la nueva URL ya está guardada
+    if previous_url != stamp_url:
+        await delete_stored_image_async(previous_url)
+    
+    return {
+        "stamp_url": stamp_url,
+        "thumbnail_url": variant_url(stamp_url, "thumb"),
+        "message": "Sello actualizado correctamente"
+    }
 
 
 @router.delete("/me/stamp")
@@ -497,21 +467,15 @@ def delete_organization_stamp(
         if not organization:
             raise HTTPException(status_code=404, detail="Organización no encontrada")
         
-        # Eliminar archivo físico si existe (solo si es URL local, no Cloudinary)
-        if organization.stamp_url and not organization.stamp_url.startswith('http'):
-            try:
-                stamp_path = Path(f"static/stamps/{organization.stamp_url.split('/')[-1]}")
-                if stamp_path.exists():
-                    stamp_path.unlink()
-                    print(f"Sello eliminado: {stamp_path}")
-            except Exception as file_error:
-                print(f"Advertencia: No se pudo eliminar archivo físico: {file_error}")
-        
         # Actualizar la organización para quitar el sello
+        stamp_url = organization.stamp_url
         organization.stamp_url = None
         db.commit()
         db.refresh(organization)
         
+        # Eliminar la imagen guardada (static/ o Cloudinary), ya sin referencias
+        delete_stored_image(stamp_url)
+        
         return {"message": "Sello eliminado correctamente"}
     
     except HTTPException:
@@ -671,8 +635,9 @@ def get_currency_symbol(currency: str) -> str:
     return symbols.get(currency, "$")
 
 
-@router.delete("/me/reset-data")
+@router.delete("/me/reset-data", status_code=status.HTTP_202_ACCEPTED)
 def reset_organization_data(
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -681,6 +646,9 @@ def reset_organization_data(
     MANTIENE: La organización, usuarios y configuraciones básicas
     ELIMINA: Todos los datos de negocio
     Solo admin puede ejecutar esta acción
+    
+    El reset corre en segundo plano: la respuesta trae el job_id para
+    consultar el avance en GET /me/reset-data/{job_id}
     """
     # Verificar permisos
     if current_user.role not in ["admin", "super_admin"]:
@@ -689,211 +657,35 @@ def reset_organization_data(
             detail="Solo el administrador puede resetear los datos de la organización"
         )
     
-    try:
-        organization_id = current_user.organization_id
-        if not organization_id:
-            raise HTTPException(status_code=400, detail="Usuario no pertenece a ninguna organización")
-        
-        print(f"Iniciando reset para organización {organization_id}")
-        
-        # Contar registros antes del reset
-        counts_before = {
-            'movements': db.query(models.InventoryMovement).filter(models.InventoryMovement.organization_id == organization_id).count(),
-            'sales': db.query(models.Sale).filter(models.Sale.organization_id == organization_id).count(),
-            'quotations': db.query(models.Quotation).filter(models.Quotation.organization_id == organization_id).count(),
-            'rentals': db.query(models.Rental).filter(models.Rental.organization_id == organization_id).count(),
-            'products': db.query(models.Product).filter(models.Product.organization_id == organization_id).count(),
-            'clients': db.query(models.Client).filter(models.Client.organization_id == organization_id).count(),
-            'categories': db.query(models.Category).filter(models.Category.organization_id == organization_id).count(),
-            'suppliers': db.query(models.Supplier).filter(models.Supplier.organization_id == organization_id).count()
-        }
-        
-        print(f"Registros antes del reset: {counts_before}")
-        
-        # Eliminar en orden para respetar las foreign keys
-        # NOTA: También eliminamos registros con organization_id = NULL para limpiar completamente
-        
-        # 1. Eliminar movimientos de inventario
-        movements_deleted = db.query(models.InventoryMovement).filter(
-            models.InventoryMovement.organization_id == organization_id
-        ).delete(synchronize_session=False)
-        print(f"Movimientos eliminados: {movements_deleted}")
-        
-        # 2. Eliminar items de ventas
-        sales = db.query(models.Sale).filter(models.Sale.organization_id == organization_id).all()
-        sale_items_deleted = 0
-        for sale in sales:
-            deleted = db.query(models.SaleItem).filter(models.SaleItem.sale_id == sale.id).delete()
-            sale_items_deleted += deleted
-        print(f"Items de ventas eliminados: {sale_items_deleted}")
-        
-        # 2.5. Eliminar pagos de ventas (antes de eliminar las ventas)
-        payments_deleted = db.query(models.Payment).filter(models.Payment.sale_id.in_([s.id for s in sales])).delete(synchronize_session=False)
-        print(f"Pagos de ventas eliminados: {payments_deleted}")
-        
-        # 3. Eliminar ventas
-        sales_deleted = db.query(models.Sale).filter(models.Sale.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Ventas eliminadas: {sales_deleted}")
-        
-        # 4. Eliminar items de cotizaciones
-        quotations = db.query(models.Quotation).filter(models.Quotation.organization_id == organization_id).all()
-        quotation_items_deleted = 0
-        for quotation in quotations:
-            deleted = db.query(models.QuotationItem).filter(models.QuotationItem.quotation_id == quotation.id).delete()
-            quotation_items_deleted += deleted
-        print(f"Items de cotizaciones eliminados: {quotation_items_deleted}")
-        
-        # 5. Eliminar cotizaciones
-        quotations_deleted = db.query(models.Quotation).filter(models.Quotation.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Cotizaciones eliminadas: {quotations_deleted}")
-        
-        # 6. Eliminar pagos de alquileres
-        rentals = db.query(models.Rental).filter(models.Rental.organization_id == organization_id).all()
-        rental_payments_deleted = 0
-        for rental in rentals:
-            deleted = db.query(models.RentalPayment).filter(models.RentalPayment.rental_id == rental.id).delete()
-            rental_payments_deleted += deleted
-        print(f"Pagos de alquileres eliminados: {rental_payments_deleted}")
-        
-        # 7. Eliminar alquileres
-        rentals_deleted = db.query(models.Rental).filter(models.Rental.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Alquileres eliminados: {rentals_deleted}")
-        
-        # 8. Eliminar productos
-        products_deleted = db.query(models.Product).filter(models.Product.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Productos eliminados: {products_deleted}")
-        
-        # 9. Eliminar clientes
-        clients_deleted = db.query(models.Client).filter(models.Client.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Clientes eliminados: {clients_deleted}")
-        
-        # 10. Eliminar categorías (solo las de esta organización)
-        categories_deleted = db.query(models.Category).filter(models.Category.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Categorías eliminadas: {categories_deleted}")
-        
-        # 11. Eliminar proveedores (solo los de esta organización)
-        suppliers_deleted = db.query(models.Supplier).filter(models.Supplier.organization_id == organization_id).delete(synchronize_session=False)
-        print(f"Proveedores eliminados: {suppliers_deleted}")
-        
-        # 11. LIMPIEZA ADICIONAL: Eliminar registros huérfanos (organization_id = NULL)
-        # Esto es para limpiar registros que no tienen organization_id asignado
-        print("Iniciando limpieza de registros huérfanos...")
-        
-        # Eliminar registros huérfanos
-        orphan_movements = db.query(models.InventoryMovement).filter(models.InventoryMovement.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Movimientos huérfanos eliminados: {orphan_movements}")
-        
-        # Eliminar items de ventas huérfanas
-        orphan_sales = db.query(models.Sale).filter(models.Sale.organization_id.is_(None)).all()
-        orphan_sale_items = 0
-        for sale in orphan_sales:
-            deleted = db.query(models.SaleItem).filter(models.SaleItem.sale_id == sale.id).delete()
-            orphan_sale_items += deleted
-        print(f"Items de ventas huérfanas eliminados: {orphan_sale_items}")
-        
-        # Eliminar ventas huérfanas
-        orphan_sales_deleted = db.query(models.Sale).filter(models.Sale.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Ventas huérfanas eliminadas: {orphan_sales_deleted}")
-        
-        # Eliminar items de cotizaciones huérfanas
-        orphan_quotations = db.query(models.Quotation).filter(models.Quotation.organization_id.is_(None)).all()
-        orphan_quotation_items = 0
-        for quotation in orphan_quotations:
-            deleted = db.query(models.QuotationItem).filter(models.QuotationItem.quotation_id == quotation.id).delete()
-            orphan_quotation_items += deleted
-        print(f"Items de cotizaciones huérfanas eliminados: {orphan_quotation_items}")
-        
-        # Eliminar cotizaciones huérfanas
-        orphan_quotations_deleted = db.query(models.Quotation).filter(models.Quotation.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Cotizaciones huérfanas eliminadas: {orphan_quotations_deleted}")
-        
-        # Eliminar pagos de alquileres huérfanos
-        orphan_rentals = db.query(models.Rental).filter(models.Rental.organization_id.is_(None)).all()
-        orphan_rental_payments = 0
-        for rental in orphan_rentals:
-            deleted = db.query(models.RentalPayment).filter(models.RentalPayment.rental_id == rental.id).delete()
-            orphan_rental_payments += deleted
-        print(f"Pagos de alquileres huérfanos eliminados: {orphan_rental_payments}")
-        
-        # Eliminar alquileres huérfanos
-        orphan_rentals_deleted = db.query(models.Rental).filter(models.Rental.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Alquileres huérfanos eliminados: {orphan_rentals_deleted}")
-        
-        # Eliminar productos huérfanos
-        orphan_products_deleted = db.query(models.Product).filter(models.Product.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Productos huérfanos eliminados: {orphan_products_deleted}")
-        
-        # Eliminar clientes huérfanos
-        orphan_clients_deleted = db.query(models.Client).filter(models.Client.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Clientes huérfanos eliminados: {orphan_clients_deleted}")
-        
-        # Eliminar categorías huérfanas
-        orphan_categories_deleted = db.query(models.Category).filter(models.Category.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Categorías huérfanas eliminadas: {orphan_categories_deleted}")
-        
-        # Eliminar proveedores huérfanos
-        orphan_suppliers_deleted = db.query(models.Supplier).filter(models.Supplier.organization_id.is_(None)).delete(synchronize_session=False)
-        print(f"Proveedores huérfanos eliminados: {orphan_suppliers_deleted}")
-        
-        # Resetear configuraciones del dashboard
-        organization = crud.get_organization(db, organization_id)
-        if organization:
-            organization.monthly_sales_goal = 0
-            organization.monthly_growth_target = 0
-            organization.conversion_rate_target = 0
-            print("Configuraciones del dashboard reseteadas")
-        
-        db.commit()
-        print("Commit realizado exitosamente")
-        
-        # Verificar que se eliminaron los registros
-        counts_after = {
-            'movements': db.query(models.InventoryMovement).filter(models.InventoryMovement.organization_id == organization_id).count(),
-            'sales': db.query(models.Sale).filter(models.Sale.organization_id == organization_id).count(),
-            'quotations': db.query(models.Quotation).filter(models.Quotation.organization_id == organization_id).count(),
-            'rentals': db.query(models.Rental).filter(models.Rental.organization_id == organization_id).count(),
-            'products': db.query(models.Product).filter(models.Product.organization_id == organization_id).count(),
-            'clients': db.query(models.Client).filter(models.Client.organization_id == organization_id).count(),
-            'categories': db.query(models.Category).filter(models.Category.organization_id == organization_id).count(),
-            'suppliers': db.query(models.Supplier).filter(models.Supplier.organization_id == organization_id).count()
-        }
-        
-        print(f"Registros después del reset: {counts_after}")
-        
-        return {
-            "message": "Datos de la organización reseteados exitosamente",
-            "reset_at": datetime.utcnow().isoformat(),
-            "organization_id": organization_id,
-            "deleted_counts": {
-                "movements": movements_deleted,
-                "sales": sales_deleted,
-                "quotations": quotations_deleted,
-                "rental_payments": rental_payments_deleted,
-                "rentals": rentals_deleted,
-                "products": products_deleted,
-                "clients": clients_deleted,
-                "categories": categories_deleted,
-                "suppliers": suppliers_deleted
-            },
-            "orphan_counts": {
-                "movements": orphan_movements,
-                "sales": orphan_sales_deleted,
-                "quotations": orphan_quotations_deleted,
-                "rental_payments": orphan_rental_payments,
-                "rentals": orphan_rentals_deleted,
-                "products": orphan_products_deleted,
-                "clients": orphan_clients_deleted,
-                "categories": orphan_categories_deleted,
-                "suppliers": orphan_suppliers_deleted
-            }
-        }
-        
-    except Exception as e:
-        db.rollback()
-        print(f"Error al resetear datos de la organización: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+    organization_id = current_user.organization_id
+    if not organization_id:
+        raise HTTPException(status_code=400, detail="Usuario no pertenece a ninguna organización")
+    
+    job, created = data_jobs.start_data_job(db, organization_id, data_jobs.JOB_RESET, current_user.id)
+    if created:
+        background_tasks.add_task(data_jobs.run_data_job, job.id)
+    
+    return {
+        "message": "Reset de datos iniciado" if created else "Ya hay un reset en curso para esta organización",
+        **data_jobs.job_status(job)
+    }
+
+
+@router.get("/me/reset-data/{job_id}")
+def get_reset_data_status(
+    job_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Avance de un reset de datos de la organización"""
+    if current_user.role not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para ver esta información")
+    
+    job = data_jobs.get_data_job(db, job_id, current_user.organization_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    
+    return data_jobs.job_status(job)
 
 
 # ============================================================================
@@ -1286,15 +1078,18 @@ def update_organization_admin(
     return organization
 
 
-@router.delete("/admin/{organization_id}")
+@router.delete("/admin/{organization_id}", status_code=status.HTTP_202_ACCEPTED)
 def delete_organization(
     organization_id: int,
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
     Elimina una organización y todos sus datos (solo super admin)
     ⚠️ ACCIÓN DESTRUCTIVA - Elimina TODO
+    La eliminación corre en segundo plano; el avance se consulta en
+    GET /admin/data-jobs/{job_id}
     """
     if current_user.role != "super_admin":
         raise HTTPException(
@@ -1302,18 +1097,34 @@ def delete_organization(
             detail="Solo el Super Admin puede eliminar organizaciones"
         )
     
-    try:
-        organization = crud.delete_organization(db, organization_id)
-        
-        if not organization:
-            raise HTTPException(status_code=404, detail="Organización no encontrada")
-        
-        return {"message": "Organización eliminada correctamente"}
-    except Exception as e:
-        print(f"Error al eliminar organización: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error al eliminar: {str(e)}")
+    if not crud.get_organization(db, organization_id):
+        raise HTTPException(status_code=404, detail="Organización no encontrada")
+    
+    job, created = data_jobs.start_data_job(db, organization_id, data_jobs.JOB_DELETE, current_user.id)
+    if created:
+        background_tasks.add_task(data_jobs.run_data_job, job.id)
+    
+    return {
+        "message": "Eliminación de la organización iniciada" if created else "Ya hay una tarea en curso para esta organización",
+        **data_jobs.job_status(job)
+    }
+
+
+@router.get("/admin/data-jobs/{job_id}")
+def get_data_job_status(
+    job_id: int,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Avance de un reset o eliminación de organización (solo super admin)"""
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Solo el Super Admin puede ver esta información")
+    
+    job = data_jobs.get_data_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    
+    return data_jobs.job_status(job)
 
 
 @router.get("/stats", response_model=dict)
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 # Intentar importar modelos extendidos, si no, usar los básicos
 try:
@@ -18,14 +18,18 @@ router = APIRouter(prefix="/api/products", tags=["products"])
 
 @router.get("/", response_model=List[schemas.Product])
 def read_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
-    product_type: Optional[str] = None,
+    product_type: Optional[List[str]] = Query(None),
     stock_available_gt: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
+    # axios envía los arrays como product_type[]=alquiler&product_type[]=ambos
+    product_type = (product_type or []) + request.query_params.getlist("product_type[]")
+    
     products = crud.get_products(
         db, 
         skip=skip, 
@@ -1,30 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+from pydantic import TypeAdapter
 from ..database import get_db
+from ..pagination import list_response, set_next_cursor
 from ..auth import get_current_active_user
 from .. import models_extended as models, schemas_extended as schemas
+from ..cache import invalidate_organization
+from ..pdf_service import render_document
 from ..crud_quotations import (
-    get_quotation, get_quotations, create_quotation, update_quotation,
+    get_quotation, get_quotations, get_quotations_summary, create_quotation, update_quotation,
     delete_quotation, convert_quotation_to_sale, convert_quotation_to_rental, check_expired_quotations
 )
 
 router = APIRouter(prefix="/api/quotations", tags=["quotations"])
 
+# Serializador del listado con view=summary
+_summary_adapter = TypeAdapter(List[schemas.QuotationSummary])
+
 
 @router.get("/", response_model=List[schemas.Quotation])
 def read_quotations(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Obtiene lista de cotizaciones con filtros opcionales"""
+    """
+    Obtiene lista de cotizaciones con filtros opcionales.
+    view=summary devuelve solo las columnas de la tabla (schemas.QuotationSummary).
+    """
     # Convertir strings de fecha a datetime si existen y no están vacíos
     parsed_start_date = None
     parsed_end_date = None
@@ -42,11 +55,18 @@ def read_quotations(
         except ValueError:
             pass
     
-    quotations = get_quotations(
-        db, skip=skip, limit=limit, client_id=client_id,
-        status=status, start_date=parsed_start_date, end_date=parsed_end_date,
-        organization_id=current_user.organization_id
-    )
+    try:
+        fetch = get_quotations_summary if view == "summary" else get_quotations
+        quotations = fetch(
+            db, skip=skip, limit=limit, client_id=client_id,
+            status=status, start_date=parsed_start_date, end_date=parsed_end_date,
+            organization_id=current_user.organization_id, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if view == "summary":
+        return list_response(_summary_adapter, quotations, limit)
+    set_next_cursor(response, quotations, limit)
     return quotations
 
 
@@ -88,6 +108,25 @@ def read_quotation(
     return quotation
 
 
+@router.get("/{quotation_id}/pdf")
+def read_quotation_pdf(
+    quotation_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Cotización en PDF"""
+    quotation = get_quotation(db, quotation_id)
+    if not quotation:
+        raise HTTPException(status_code=404, detail="Cotización no encontrada")
+    if quotation.organization_id != current_user.organization_id and current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="No tienes permiso para acceder a esta cotización")
+    return Response(
+        content=render_document("quotation", quotation),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{quotation.quotation_number}.pdf"'}
+    )
+
+
 @router.post("/", response_model=schemas.Quotation, status_code=status.HTTP_201_CREATED)
 def create_new_quotation(
     quotation: schemas.QuotationCreate,
@@ -96,7 +135,7 @@ def create_new_quotation(
 ):
     """Crea una nueva cotización"""
     try:
-        return create_quotation(db, quotation, current_user.id)
+        return create_quotation(db, quotation, current_user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -154,6 +193,7 @@ def update_quotation_status(
     
     db_quotation.status = status
     db.commit()
+    invalidate_organization(db_quotation.organization_id)
     db.refresh(db_quotation)
     
     return db_quotation
@@ -190,7 +230,7 @@ def convert_to_sale(
 ):
     """Convierte una cotización en venta"""
     try:
-        sale = convert_quotation_to_sale(db, quotation_id, current_user.id, payment_method)
+        sale = convert_quotation_to_sale(db, quotation_id, current_user, payment_method)
         if not sale:
             raise HTTPException(
                 status_code=400,
@@ -225,7 +265,7 @@ def convert_to_rental(
         if isinstance(rental_data.get('end_date'), str):
             rental_data['end_date'] = datetime.fromisoformat(rental_data['end_date'].replace('Z', '+00:00'))
         
-        rental = convert_quotation_to_rental(db, quotation_id, current_user.id, rental_data)
+        rental = convert_quotation_to_rental(db, quotation_id, current_user, rental_data)
         if not rental:
             raise HTTPException(
                 status_code=400,
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+from pydantic import TypeAdapter
 from ..database import get_db
+from ..pagination import list_response, set_next_cursor
 from ..auth import get_current_active_user
 from .. import models_extended as models, schemas_extended as schemas
+from ..pdf_service import render_document
 from ..crud_rentals import (
-    get_rental, get_rentals, create_rental, update_rental, cancel_rental,
+    get_rental, get_rentals, get_rentals_summary, create_rental, update_rental, cancel_rental,
     check_overdue_rentals, get_rental_history, get_client_rental_history,
     get_active_rentals_report, add_rental_payment, update_rental_status_automatically
 )
 
 router = APIRouter(prefix="/api/rentals", tags=["rentals"])
 
+# Serializador del listado con view=summary
+_summary_adapter = TypeAdapter(List[schemas.RentalSummary])
+
 
 @router.get("/", response_model=List[schemas.Rental])
 def read_rentals(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
@@ -23,10 +30,15 @@ def read_rentals(
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Obtiene lista de alquileres con filtros opcionales"""
+    """
+    Obtiene lista de alquileres con filtros opcionales.
+    view=summary devuelve solo las columnas de la tabla (schemas.RentalSummary).
+    """
     # Convertir strings de fecha a datetime si existen y no están vacíos
     parsed_start_date = None
     parsed_end_date = None
@@ -44,12 +56,19 @@ def read_rentals(
         except ValueError:
             pass
     
-    rentals = get_rentals(
-        db, skip=skip, limit=limit, client_id=client_id,
-        product_id=product_id, status=status,
-        start_date=parsed_start_date, end_date=parsed_end_date,
-        organization_id=current_user.organization_id
-    )
+    try:
+        fetch = get_rentals_summary if view == "summary" else get_rentals
+        rentals = fetch(
+            db, skip=skip, limit=limit, client_id=client_id,
+            product_id=product_id, status=status,
+            start_date=parsed_start_date, end_date=parsed_end_date,
+            organization_id=current_user.organization_id, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if view == "summary":
+        return list_response(_summary_adapter, rentals, limit)
+    set_next_cursor(response, rentals, limit)
     return rentals
 
 
@@ -68,6 +87,25 @@ def read_rental(
     return rental
 
 
+@router.get("/{rental_id}/pdf")
+def read_rental_contract_pdf(
+    rental_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Contrato de alquiler en PDF"""
+    rental = get_rental(db, rental_id)
+    if not rental:
+        raise HTTPException(status_code=404, detail="Alquiler no encontrado")
+    if rental.organization_id != current_user.organization_id and current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este alquiler")
+    return Response(
+        content=render_document("rental_contract", rental),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{rental.rental_number}.pdf"'}
+    )
+
+
 @router.post("/", response_model=schemas.Rental, status_code=status.HTTP_201_CREATED)
 def create_new_rental(
     rental: schemas.RentalCreate,
@@ -83,7 +121,7 @@ def create_new_rental(
     
     try:
         print(f"Creando alquiler con items: {rental.items}")
-        result = create_rental(db, rental, current_user.id)
+        result = create_rental(db, rental, current_user)
         print(f"Alquiler creado: {result.rental_number}")
         return result
     except ValueError as e:
@@ -117,7 +155,10 @@ def update_existing_rental(
     if rental_check.organization_id != current_user.organization_id and current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="No tienes permiso para modificar este alquiler")
         
-    db_rental = update_rental(db, rental_id, rental)
+    try:
+        db_rental = update_rental(db, rental_id, rental, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return db_rental
 
 
@@ -135,7 +176,7 @@ def cancel_existing_rental(
         )
     
     try:
-        return cancel_rental(db, rental_id, current_user.id)
+        return cancel_rental(db, rental_id, current_user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -200,7 +241,7 @@ def add_payment_to_rental(
 ):
     """Agrega un pago a un alquiler"""
     try:
-        payment_result = add_rental_payment(db, rental_id, payment, current_user.id)
+        payment_result = add_rental_payment(db, rental_id, payment, current_user)
         return payment_result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
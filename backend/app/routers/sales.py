@@ -1,30 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+from pydantic import TypeAdapter
 from ..database import get_db
+from ..pagination import list_response, set_next_cursor
 from ..auth import get_current_active_user
 from .. import models_extended as models, schemas_extended as schemas
+from ..cache import invalidate_organization
+from .. import leaderboards
+from ..pdf_service import render_document, build_invoice_archive, iter_archive
 from ..crud_sales import (
-    get_sale, get_sales, create_sale, update_sale,
+    get_sale, get_sales, get_sales_summary, create_sale, update_sale,
     add_payment, get_sales_report
 )
 
 router = APIRouter(prefix="/api/sales", tags=["sales"])
 
+# Serializador del listado con view=summary
+_summary_adapter = TypeAdapter(List[schemas.SaleSummary])
+
 
 @router.get("/", response_model=List[schemas.Sale])
 def read_sales(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Obtiene lista de ventas con filtros opcionales"""
+    """
+    Obtiene lista de ventas con filtros opcionales.
+    view=summary devuelve solo las columnas de la tabla (schemas.SaleSummary).
+    """
     # Convertir strings de fecha a datetime si existen y no están vacíos
     parsed_start_date = None
     parsed_end_date = None
@@ -43,11 +58,18 @@ def read_sales(
         except ValueError:
             pass
     
-    sales = get_sales(
-        db, skip=skip, limit=limit, client_id=client_id,
-        status=status, start_date=parsed_start_date, end_date=parsed_end_date,
-        organization_id=current_user.organization_id
-    )
+    try:
+        fetch = get_sales_summary if view == "summary" else get_sales
+        sales = fetch(
+            db, skip=skip, limit=limit, client_id=client_id,
+            status=status, start_date=parsed_start_date, end_date=parsed_end_date,
+            organization_id=current_user.organization_id, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if view == "summary":
+        return list_response(_summary_adapter, sales, limit)
+    set_next_cursor(response, sales, limit)
     return sales
 
 
@@ -66,6 +88,50 @@ def read_sale(
     return sale
 
 
+@router.get("/{sale_id}/pdf")
+def read_sale_invoice_pdf(
+    sale_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Factura de la venta en PDF"""
+    sale = get_sale(db, sale_id)
+    if not sale:
+        raise HTTPException(status_code=404, detail="Venta no encontrada")
+    if sale.organization_id != current_user.organization_id and current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="No tienes permiso para acceder a esta venta")
+    return Response(
+        content=render_document("invoice", sale),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{sale.invoice_number or sale.sale_number}.pdf"'}
+    )
+
+
+@router.get("/invoices/batch")
+def download_invoices_batch(
+    month: str = Query(..., pattern=r"^\d{4}-\d{2}$", description="Mes en formato YYYY-MM"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """ZIP con las facturas en PDF de todas las ventas del mes (para contabilidad)"""
+    if current_user.role not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para descargar las facturas del mes")
+    if not current_user.organization_id:
+        raise HTTPException(status_code=400, detail="El usuario no pertenece a una organización")
+    try:
+        archive, count = build_invoice_archive(db, current_user.organization_id, month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if count == 0:
+        archive.close()
+        raise HTTPException(status_code=404, detail=f"No hay ventas en {month}")
+    return StreamingResponse(
+        iter_archive(archive),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="facturas_{month}.zip"'}
+    )
+
+
 @router.post("/", response_model=schemas.Sale, status_code=status.HTTP_201_CREATED)
 def create_new_sale(
     sale: schemas.SaleCreate,
@@ -76,7 +142,7 @@ def create_new_sale(
     try:
         print(f"Creando venta para usuario {current_user.id}, organización {current_user.organization_id}")
         print(f"Datos de la venta: {sale.model_dump()}")
-        result = create_sale(db, sale, current_user.id)
+        result = create_sale(db, sale, current_user)
         print(f"Venta creada exitosamente: {result.id}")
         return result
     except ValueError as e:
@@ -143,6 +209,12 @@ def update_sale_status(
     if new_status not in ['completada', 'parcial', 'pendiente_pago', 'cancelada']:
         raise HTTPException(status_code=400, detail="Estado inválido")
     
+    # Entrar o salir del estado cancelada cambia los rankings: restar la
+    # venta tal como está guardada y volver a sumarla después del cambio
+    toggles_cancellation = (new_status == 'cancelada') != (sale.status == 'cancelada')
+    if toggles_cancellation:
+        leaderboards.record_sale(db, sale.id, -1)
+    
     # Actualizar estado y monto pagado
     sale.status = new_status
     
@@ -154,7 +226,12 @@ def update_sale_status(
         sale.paid_amount = paid_amount
         sale.balance = sale.total - paid_amount
     
+    if toggles_cancellation:
+        db.flush()
+        leaderboards.record_sale(db, sale.id)
+    
     db.commit()
+    invalidate_organization(sale.organization_id)
     db.refresh(sale)
     return sale
 
@@ -6,6 +6,7 @@ from ..database import get_db
 from ..auth import get_current_active_user
 from .. import models_extended as models
 from ..crud_summary import get_complete_business_summary
+from ..cache import dashboard_cache
 
 router = APIRouter(prefix="/api/summary", tags=["summary"])
 
@@ -24,11 +25,16 @@ def get_business_overview(
         end_dt = datetime.fromisoformat(end_date) if end_date else None
         
         # Obtener resumen completo
-        summary = get_complete_business_summary(
-            db,
+        summary = dashboard_cache.get_or_compute(
+            "business-overview",
             current_user.organization_id,
-            start_dt,
-            end_dt
+            {"start_date": start_date, "end_date": end_date},
+            lambda: get_complete_business_summary(
+                db,
+                current_user.organization_id,
+                start_dt,
+                end_dt
+            )
         )
         
         return summary
@@ -0,0 +1,292 @@
+"""
+Tareas periódicas en segundo plano (barridos de estado)
+
+Cada worker de gunicorn arranca un hilo del scheduler en el startup, pero
+solo el que obtiene el lock de líder ejecuta las tareas; los demás reintentan
+tomarlo por si el líder muere. El lock es:
+
+- PostgreSQL: pg_try_advisory_lock en una conexión dedicada (se libera solo
+  si el proceso o la conexión se caen).
+- Otras bases (SQLite): flock sobre un archivo local, compartido por los
+  workers de la misma máquina.
+
+Tareas:
+- alquileres_vencidos: marca alquileres activos con fecha de fin pasada.
+- cotizaciones_vencidas: marca cotizaciones pendientes con validez pasada.
+- notificaciones: genera las notificaciones del dashboard de cada organización.
+
+La última ejecución de cada tarea (duración, resultado, error) se guarda en
+scheduled_job_runs para que cualquier worker pueda mostrarla.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from . import models_extended as models
+from .cache import dashboard_cache
+from .config import settings
+from .database import SessionLocal, engine
+from .models_organization import Organization, OrganizationStatus
+from .timezone_utils import get_rd_now
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, cada proceso se considera líder
+    fcntl = None
+
+# Cada cuánto se revisa el lock y las tareas pendientes
+TICK_SECONDS = 5
+
+# Clave del advisory lock de PostgreSQL (fija para toda la aplicación)
+ADVISORY_LOCK_KEY = zlib.crc32(b"sistema-gestion:scheduler")
+
+
+class LeaderLock:
+    """Lock de líder entre procesos; try_acquire() nunca bloquea"""
+
+    def __init__(self):
+        self._connection = None
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._connection is not None or self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self.held:
+            return self._check()
+        if engine.dialect.name == "postgresql":
+            return self._acquire_advisory()
+        return self._acquire_file()
+
+    def _acquire_advisory(self) -> bool:
+        connection = engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if acquired:
+            self._connection = connection
+        else:
+            connection.close()
+        return bool(acquired)
+
+    def _acquire_file(self) -> bool:
+        if fcntl is None:
+            self._file = True
+            return True
+        path = settings.SCHEDULER_LOCK_FILE or os.path.join(tempfile.gettempdir(), "sistema-gestion-scheduler.lock")
+        lock_file = open(path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def _check(self) -> bool:
+        """Comprueba que la conexión que sostiene el advisory lock siga viva"""
+        if self._connection is None:
+            return True
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Scheduler: se perdió la conexión del lock de líder: {e}")
+            self.release()
+            return False
+
+    def release(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()  # Cerrar la sesión libera el advisory lock
+            except Exception:
+                pass
+            self._connection = None
+        if self._file is not None:
+            if fcntl is not None:
+                self._file.close()  # Cerrar el archivo libera el flock
+            self._file = None
+
+
+class PeriodicJob:
+    """Tarea que se ejecuta cada `interval` segundos con su propia sesión"""
+
+    def __init__(self, name: str, interval: int, run: Callable):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.next_run = 0.0  # La primera vez se ejecuta apenas el worker es líder
+
+
+class Scheduler:
+    def __init__(self, jobs: List[PeriodicJob]):
+        self.jobs = jobs
+        self.lock = LeaderLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock.held
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=TICK_SECONDS * 2)
+            self._thread = None
+        self.lock.release()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.lock.try_acquire():
+                    self.run_due_jobs()
+            except Exception as e:
+                print(f"⚠️ Scheduler: error en el ciclo: {e}")
+            self._stop.wait(TICK_SECONDS)
+
+    def run_due_jobs(self) -> None:
+        for job in self.jobs:
+            if self._stop.is_set():
+                return
+            if time.monotonic() >= job.next_run:
+                run_job(job)
+                job.next_run = time.monotonic() + job.interval
+
+
+def run_job(job: PeriodicJob) -> None:
+    """Ejecuta una tarea y guarda su duración y resultado en scheduled_job_runs"""
+    started_at = get_rd_now()
+    started = time.perf_counter()
+    result, error = None, None
+    db = SessionLocal()
+    try:
+        result = job.run(db)
+    except Exception as e:
+        db.rollback()
+        error = str(e)
+        print(f"❌ Scheduler: la tarea '{job.name}' falló: {e}")
+    finally:
+        db.close()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    db = SessionLocal()
+    try:
+        run = db.query(models.ScheduledJobRun).filter(models.ScheduledJobRun.job_name == job.name).first()
+        if run is None:
+            run = models.ScheduledJobRun(job_name=job.name, run_count=0, failure_count=0)
+            db.add(run)
+        run.last_started_at = started_at
+        run.last_finished_at = get_rd_now()
+        run.last_duration_ms = round(duration_ms, 2)
+        run.run_count += 1
+        run.worker_pid = os.getpid()
+        if error is None:
+            run.last_result = json.dumps(result, default=str)
+            run.last_error = None
+        else:
+            run.failure_count += 1
+            run.last_error = error
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Scheduler: no se pudo registrar la ejecución de '{job.name}': {e}")
+    finally:
+        db.close()
+
+
+# ==================== TAREAS ====================
+
+def _by_organization(marked: Dict[Optional[int], int]) -> dict:
+    return {"total": sum(marked.values()), "organizations": {str(org_id): count for org_id, count in marked.items()}}
+
+
+def sweep_overdue_rentals(db) -> dict:
+    from .crud_rentals import mark_overdue_rentals
+    return _by_organization(mark_overdue_rentals(db))
+
+
+def sweep_expired_quotations(db) -> dict:
+    from .crud_quotations import mark_expired_quotations
+    return _by_organization(mark_expired_quotations(db))
+
+
+def sweep_notifications(db) -> dict:
+    """Notificaciones del dashboard de cada organización activa (usa la caché de estadísticas)"""
+    from .crud_dashboard import get_dashboard_stats
+    from .crud_notification_generator import generate_dashboard_notifications
+
+    organization_ids = [
+        org_id for (org_id,) in db.query(Organization.id).filter(
+            Organization.status == OrganizationStatus.active
+        ).all()
+    ]
+    generated = 0
+    for org_id in organization_ids:
+        stats = dashboard_cache.get_or_compute(
+            "stats", org_id, {"start_date": None, "end_date": None},
+            lambda: get_dashboard_stats(db, org_id)
+        )
+        generated += len(generate_dashboard_notifications(db, org_id, stats))
+    return {"organizations": len(organization_ids), "notifications": generated}
+
+
+scheduler = Scheduler([
+    PeriodicJob("alquileres_vencidos", settings.OVERDUE_RENTALS_INTERVAL_SECONDS, sweep_overdue_rentals),
+    PeriodicJob("cotizaciones_vencidas", settings.EXPIRED_QUOTATIONS_INTERVAL_SECONDS, sweep_expired_quotations),
+    PeriodicJob("notificaciones", settings.NOTIFICATIONS_INTERVAL_SECONDS, sweep_notifications),
+])
+
+
+def start_scheduler() -> None:
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+
+
+def stop_scheduler() -> None:
+    scheduler.stop()
+
+
+def get_scheduler_status(db) -> dict:
+    """Últimas ejecuciones registradas y si este worker es el líder"""
+    runs = {run.job_name: run for run in db.query(models.ScheduledJobRun).all()}
+    jobs = []
+    for job in scheduler.jobs:
+        run = runs.get(job.name)
+        jobs.append({
+            "name": job.name,
+            "interval_seconds": job.interval,
+            "last_started_at": run.last_started_at if run else None,
+            "last_finished_at": run.last_finished_at if run else None,
+            "last_duration_ms": run.last_duration_ms if run else None,
+            "last_result": json.loads(run.last_result) if run and run.last_result else None,
+            "last_error": run.last_error if run else None,
+            "run_count": run.run_count if run else 0,
+            "failure_count": run.failure_count if run else 0,
+            "worker_pid": run.worker_pid if run else None,
+        })
+    return {
+        "enabled": settings.SCHEDULER_ENABLED,
+        "this_worker_pid": os.getpid(),
+        "this_worker_is_leader": scheduler.is_leader,
+        "jobs": jobs,
+    }
@@ -161,6 +161,16 @@ class Client(ClientBase):
         from_attributes = True
 
 
+class ClientTypeahead(BaseModel):
+    """Sugerencia liviana para autocompletar clientes"""
+    id: int
+    name: str
+    rnc: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
 # Product Schemas Extendidos
 class ProductBase(BaseModel):
     sku: str
@@ -287,6 +297,23 @@ class Quotation(QuotationBase):
         from_attributes = True
 
 
+class QuotationSummary(BaseModel):
+    """Fila del listado de cotizaciones (view=summary): sin items ni cliente completo"""
+    id: int
+    quotation_number: str
+    quotation_type: str = "venta"
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    quotation_date: datetime
+    valid_until: Optional[datetime] = None
+    status: QuotationStatus
+    total: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 # Product Simple Schema (para items)
 class ProductSimple(BaseModel):
     id: int
@@ -367,6 +394,23 @@ class Sale(SaleBase):
         from_attributes = True
 
 
+class SaleSummary(BaseModel):
+    """Fila del listado de ventas (view=summary): sin items ni cliente completo"""
+    id: int
+    sale_number: str
+    invoice_number: Optional[str] = None
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    sale_date: datetime
+    status: SaleStatus
+    total: float
+    balance: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 # Payment Schema
 class PaymentBase(BaseModel):
     sale_id: int
@@ -462,6 +506,24 @@ class Rental(RentalBase):
         from_attributes = True
 
 
+class RentalSummary(BaseModel):
+    """Fila del listado de alquileres (view=summary): sin items, pagos ni producto"""
+    id: int
+    rental_number: str
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    start_date: datetime
+    end_date: datetime
+    status: RentalStatus
+    total_cost: float
+    balance: float
+    payment_status: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 # Rental Payment Schemas
 class RentalPaymentBase(BaseModel):
     rental_id: int
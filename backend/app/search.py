@@ -0,0 +1,318 @@
+"""
+Búsqueda en el servidor con índices de texto (productos y clientes)
+
+- PostgreSQL: pg_trgm. Índices GIN de trigramas (TRIGRAM_INDEXES) aceleran
+  el ILIKE '%texto%' y la búsqueda aproximada (operador %). El ranking usa
+  similarity(). No se declaran en los modelos: create_all se ejecuta al
+  importar la app y fallaría si el usuario de la base no puede crear la
+  extensión.
+- SQLite: tablas FTS5 (rowid = id de la fila original) mantenidas con
+  triggers. Se busca por prefijo de cada palabra y se ordena por bm25().
+- Si el índice no está disponible se usa LIKE sin ranking.
+
+Productos: nombre, SKU y nombre de categoría.
+Clientes: nombre, RNC/Cédula (normalizado), email y teléfono.
+
+ensure_search_index() se llama al iniciar la app: crea la extensión y los
+índices de trigramas, o las tablas FTS y sus triggers, si faltan, y llena
+cada tabla FTS la primera vez. migrate_indexes.py también crea los de trigramas.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import text, func, or_, false, literal_column, select, table, column
+from sqlalchemy.orm import Query
+
+from . import models_extended as models
+
+# Se activan en ensure_search_index() según lo que exista en la base
+_fts_available = False
+_trigram_available = False
+
+PRODUCTS_FTS = "products_fts"
+CLIENTS_FTS = "clients_fts"
+
+# Pesos de bm25 por columna: más peso = más relevante
+PRODUCTS_FTS_WEIGHTS = (5.0, 8.0, 1.0)  # name, sku, category_name
+CLIENTS_FTS_WEIGHTS = (5.0, 10.0, 2.0, 2.0)  # name, rnc_normalized, email, phone_digits
+
+FTS_TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2'"
+
+# Índices GIN de trigramas (solo PostgreSQL): nombre -> (tabla, columna)
+TRIGRAM_INDEXES = {
+    "ix_products_name_trgm": ("products", "name"),
+    "ix_products_sku_trgm": ("products", "sku"),
+    "ix_categories_name_trgm": ("categories", "name"),
+    "ix_clients_name_trgm": ("clients", "name"),
+    "ix_clients_rnc_trgm": ("clients", "rnc"),
+    "ix_clients_email_trgm": ("clients", "email"),
+    "ix_clients_phone_trgm": ("clients", "phone"),
+}
+
+# Teléfono solo con dígitos, para buscar "8095551234" aunque se guardó "(809) 555-1234"
+_PHONE_DIGITS_SQL = "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE({phone}, '-', ''), ' ', ''), '(', ''), ')', ''), '+', '')"
+
+
+def _client_fts_values(row: str) -> str:
+    return f"{row}.id, {row}.name, {row}.rnc_normalized, {row}.email, {_PHONE_DIGITS_SQL.format(phone=f'{row}.phone')}"
+
+
+# Tabla FTS -> (DDL de la tabla y sus triggers, consulta para llenarla)
+SQLITE_FTS_INDEXES = {
+    PRODUCTS_FTS: (
+        [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCTS_FTS} USING fts5(name, sku, category_name, {FTS_TOKENIZER})",
+            f"""
+            CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                INSERT INTO {PRODUCTS_FTS}(rowid, name, sku, category_name)
+                VALUES (new.id, new.name, new.sku, (SELECT name FROM categories WHERE id = new.category_id));
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, sku, category_id ON products BEGIN
+                DELETE FROM {PRODUCTS_FTS} WHERE rowid = old.id;
+                INSERT INTO {PRODUCTS_FTS}(rowid, name, sku, category_name)
+                VALUES (new.id, new.name, new.sku, (SELECT name FROM categories WHERE id = new.category_id));
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                DELETE FROM {PRODUCTS_FTS} WHERE rowid = old.id;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS categories_fts_update AFTER UPDATE OF name ON categories BEGIN
+                UPDATE {PRODUCTS_FTS} SET category_name = new.name
+                WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS categories_fts_delete AFTER DELETE ON categories BEGIN
+                UPDATE {PRODUCTS_FTS} SET category_name = NULL
+                WHERE rowid IN (SELECT id FROM products WHERE category_id = old.id);
+            END
+            """,
+        ],
+        f"""
+        INSERT INTO {PRODUCTS_FTS}(rowid, name, sku, category_name)
+        SELECT p.id, p.name, p.sku, c.name
+        FROM products p LEFT JOIN categories c ON c.id = p.category_id
+        """,
+    ),
+    CLIENTS_FTS: (
+        [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {CLIENTS_FTS} USING fts5(name, rnc_normalized, email, phone_digits, {FTS_TOKENIZER})",
+            f"""
+            CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+                INSERT INTO {CLIENTS_FTS}(rowid, name, rnc_normalized, email, phone_digits)
+                VALUES ({_client_fts_values('new')});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF name, rnc_normalized, email, phone ON clients BEGIN
+                DELETE FROM {CLIENTS_FTS} WHERE rowid = old.id;
+                INSERT INTO {CLIENTS_FTS}(rowid, name, rnc_normalized, email, phone_digits)
+                VALUES ({_client_fts_values('new')});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+                DELETE FROM {CLIENTS_FTS} WHERE rowid = old.id;
+            END
+            """,
+        ],
+        f"""
+        INSERT INTO {CLIENTS_FTS}(rowid, name, rnc_normalized, email, phone_digits)
+        SELECT {_client_fts_values('clients')} FROM clients
+        """,
+    ),
+}
+
+
+def trigram_index_ddl(name: str, concurrently: bool = False) -> str:
+    """CREATE INDEX ... USING gin (columna gin_trgm_ops) de uno de TRIGRAM_INDEXES"""
+    table_name, column_name = TRIGRAM_INDEXES[name]
+    mode = "CONCURRENTLY " if concurrently else ""
+    return f"CREATE INDEX {mode}IF NOT EXISTS {name} ON {table_name} USING gin ({column_name} gin_trgm_ops)"
+
+
+def rebuild_sqlite_fts(conn, fts_table: str) -> None:
+    """Vuelve a llenar una tabla FTS desde su tabla original"""
+    _, populate_sql = SQLITE_FTS_INDEXES[fts_table]
+    conn.execute(text(f"DELETE FROM {fts_table}"))
+    conn.execute(text(populate_sql))
+
+
+def ensure_search_index(engine) -> None:
+    """Prepara los índices de búsqueda según el motor de base de datos"""
+    global _fts_available, _trigram_available
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            try:
+                for fts_table, (ddl, _) in SQLITE_FTS_INDEXES.items():
+                    exists = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {"name": fts_table}
+                    ).first() is not None
+                    for statement in ddl:
+                        conn.execute(text(statement))
+                    if not exists:
+                        rebuild_sqlite_fts(conn, fts_table)
+                conn.commit()
+                _fts_available = True
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ FTS5 no disponible, la búsqueda usará LIKE: {e}")
+
+        elif engine.dialect.name == "postgresql":
+            try:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.commit()
+                _trigram_available = True
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ pg_trgm no disponible, la búsqueda usará ILIKE: {e}")
+
+    if _trigram_available:
+        # CONCURRENTLY no bloquea escrituras, pero no puede ir dentro de una transacción.
+        # Si falla, la búsqueda funciona sin índice; migrate_indexes.py lo reconstruye
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name in TRIGRAM_INDEXES:
+                try:
+                    conn.execute(text(trigram_index_ddl(name, concurrently=True)))
+                except Exception as e:
+                    print(f"⚠️ No se pudo crear el índice {name}: {e}")
+
+
+def _like_pattern(search: str) -> str:
+    """Patrón '%texto%' escapando los comodines del usuario"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_fts_query(search: str) -> Optional[str]:
+    """Convierte el texto del usuario en una consulta FTS5: cada palabra como prefijo (AND)"""
+    tokens = re.findall(r"\w+", search.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _digits_only(search: str) -> Optional[str]:
+    """Si el texto es un número (RNC, cédula, teléfono) devuelve solo sus dígitos"""
+    if re.fullmatch(r"[\d\s\-()+]+", search):
+        digits = re.sub(r"\D", "", search)
+        return digits or None
+    return None
+
+
+def _fts_matches(fts_table: str, fts_query: str, weights):
+    """Subconsulta (id, rank) con las filas que coinciden en la tabla FTS"""
+    fts = table(fts_table, column("rowid"))
+    return (
+        select(
+            fts.c.rowid.label("row_id"),
+            func.bm25(literal_column(fts_table), *weights).label("rank")
+        )
+        .where(literal_column(fts_table).match(fts_query))
+        .subquery()
+    )
+
+
+def apply_product_search(query: Query, search: str, dialect_name: str) -> Query:
+    """Filtra y ordena por relevancia una consulta de productos"""
+    search = search.strip()
+    if not search:
+        return query
+
+    if dialect_name == "sqlite" and _fts_available:
+        fts_query = build_fts_query(search)
+        if fts_query is None:
+            return query
+        matches = _fts_matches(PRODUCTS_FTS, fts_query, PRODUCTS_FTS_WEIGHTS)
+        return (
+            query.join(matches, matches.c.row_id == models.Product.id)
+            .order_by(
+                (func.lower(models.Product.sku) == search.lower()).desc(),
+                matches.c.rank,
+                models.Product.name
+            )
+        )
+
+    pattern = _like_pattern(search)
+    query = query.outerjoin(models.Category, models.Product.category_id == models.Category.id)
+    conditions = [
+        models.Product.name.ilike(pattern, escape="\\"),
+        models.Product.sku.ilike(pattern, escape="\\"),
+        models.Category.name.ilike(pattern, escape="\\"),
+    ]
+
+    if dialect_name == "postgresql" and _trigram_available:
+        # Coincidencias aproximadas (errores de tipeo) con el operador % de pg_trgm
+        conditions.append(models.Product.name.op("%")(search))
+        rank = func.greatest(
+            func.similarity(models.Product.name, search),
+            func.similarity(models.Product.sku, search),
+            func.coalesce(func.similarity(models.Category.name, search), 0)
+        )
+        return query.filter(or_(*conditions)).order_by(
+            (func.lower(models.Product.sku) == search.lower()).desc(),
+            rank.desc(),
+            models.Product.name
+        )
+
+    return query.filter(or_(*conditions)).order_by(models.Product.name)
+
+
+def apply_client_search(query: Query, search: str, dialect_name: str) -> Query:
+    """Filtra y ordena por relevancia una consulta de clientes (entidad o columnas)"""
+    search = search.strip()
+    if not search:
+        return query
+
+    digits = _digits_only(search)
+
+    if dialect_name == "sqlite" and _fts_available:
+        if digits:
+            # RNC/Cédula o teléfono escrito con o sin guiones
+            fts_query = f'{{rnc_normalized phone_digits}} : "{digits}"*'
+        else:
+            fts_query = build_fts_query(search)
+            if fts_query is None:
+                # Solo signos de puntuación: no hay palabras que buscar
+                return query.filter(false())
+        matches = _fts_matches(CLIENTS_FTS, fts_query, CLIENTS_FTS_WEIGHTS)
+        return (
+            query.join(matches, matches.c.row_id == models.Client.id)
+            .order_by(
+                (models.Client.rnc_normalized == (digits or search)).desc(),
+                matches.c.rank,
+                models.Client.name
+            )
+        )
+
+    pattern = _like_pattern(search)
+    conditions = [
+        models.Client.name.ilike(pattern, escape="\\"),
+        models.Client.rnc.ilike(pattern, escape="\\"),
+        models.Client.email.ilike(pattern, escape="\\"),
+        models.Client.phone.ilike(pattern, escape="\\"),
+    ]
+    if digits:
+        conditions.append(models.Client.rnc_normalized.like(f"{digits}%"))
+
+    if dialect_name == "postgresql" and _trigram_available:
+        # Coincidencias aproximadas del nombre con el operador % de pg_trgm
+        conditions.append(models.Client.name.op("%")(search))
+        rank = func.greatest(
+            func.similarity(models.Client.name, search),
+            func.coalesce(func.similarity(models.Client.email, search), 0)
+        )
+        return query.filter(or_(*conditions)).order_by(
+            (models.Client.rnc_normalized == (digits or search)).desc(),
+            rank.desc(),
+            models.Client.name
+        )
+
+    return query.filter(or_(*conditions)).order_by(models.Client.name)
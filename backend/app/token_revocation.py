@@ -0,0 +1,106 @@
+"""
+Revocación de tokens JWT
+
+Dos mecanismos, ninguno agrega consultas al camino de cada petición:
+
+- Versión por usuario (claim "ver" = users.token_version). Cerrar todas las
+  sesiones, cambiar la contraseña o desactivar la organización la incrementa
+  y todos los tokens anteriores dejan de valer. auth.get_current_user la
+  compara con el Principal en caché, que se relee de la base de datos cuando
+  vence su TTL (AUTH_CACHE_TTL_SECONDS): en el worker que hace el cambio es
+  inmediato y en los demás tarda a lo sumo ese TTL.
+
+- Tokens sueltos (logout de una sesión) por su claim jti, en la tabla
+  revoked_tokens. Cada worker la copia en un set en memoria (jti -> vencimiento)
+  y la vuelve a leer completa, como mucho cada TOKEN_REVOCATION_SYNC_SECONDS.
+  Una fila deja de importar cuando el token vence, así que la tabla y el set
+  se mantienen del tamaño de los logouts recientes. No se lee por id
+  incremental: los ids se reutilizan en SQLite al purgar las filas vencidas y
+  en PostgreSQL pueden confirmarse fuera de orden.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from . import models_extended as models
+from .config import settings
+
+
+class RevocationSet:
+    """Copia en memoria de los tokens vigentes de revoked_tokens, recargada periódicamente"""
+
+    def __init__(self, sync_seconds: int):
+        self.sync_seconds = sync_seconds
+        self._expires = {}  # jti -> vencimiento (UTC)
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def is_revoked(self, db: Session, jti: Optional[str]) -> bool:
+        """Consulta el set; solo toca la base de datos cuando toca sincronizar"""
+        if time.monotonic() >= self._next_sync:
+            self.sync(db)
+        return jti is not None and jti in self._expires
+
+    def sync(self, db: Session) -> None:
+        # Un solo hilo sincroniza; los demás siguen con el set actual
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            now = datetime.utcnow()
+            rows = db.execute(
+                select(models.RevokedToken.jti, models.RevokedToken.expires_at)
+                .where(models.RevokedToken.expires_at > now)
+            ).all()
+            expires = {row.jti: row.expires_at for row in rows}
+            with self._lock:
+                # Un revoke_token de este worker confirmado después del SELECT no se pierde
+                for jti, expires_at in self._expires.items():
+                    if jti not in expires and expires_at > now:
+                        expires[jti] = expires_at
+                self._expires = expires
+            self._next_sync = time.monotonic() + self.sync_seconds
+        finally:
+            self._sync_lock.release()
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._expires[jti] = expires_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires.clear()
+            self._next_sync = 0.0
+
+    def size(self) -> int:
+        return len(self._expires)
+
+
+revoked_tokens = RevocationSet(settings.TOKEN_REVOCATION_SYNC_SECONDS)
+
+
+def revoke_token(db: Session, jti: str, user_id: Optional[int], expires_at: datetime) -> None:
+    """Revoca un token (jti) hasta su vencimiento y purga las filas ya vencidas. Confirma la transacción."""
+    db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= datetime.utcnow()))
+    if not db.query(models.RevokedToken.id).filter(models.RevokedToken.jti == jti).first():
+        db.add(models.RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    db.commit()
+    revoked_tokens.add(jti, expires_at)
+
+
+def bump_token_version(db: Session, user_id: Optional[int] = None, organization_id: Optional[int] = None) -> None:
+    """
+    Invalida todos los tokens emitidos de un usuario o de todos los usuarios de
+    una organización. No confirma: va en la misma transacción que el cambio que
+    la motiva; después del commit, invalidar la caché de principals (auth.py).
+    """
+    query = update(models.User).values(token_version=models.User.token_version + 1)
+    if user_id is not None:
+        query = query.where(models.User.id == user_id)
+    else:
+        query = query.where(models.User.organization_id == organization_id)
+    db.execute(query)
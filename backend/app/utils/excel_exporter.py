@@ -1,9 +1,252 @@
 """
-Utilidad para exportar datos a Excel
+Utilidad para exportar datos a Excel y CSV
+
+Las filas se escriben a medida que llegan (iterables o generadores), sin
+armar listas ni DataFrames intermedios:
+- stream_csv: genera el CSV en bloques de bytes para una StreamingResponse.
+- stream_xlsx / iter_xlsx: generan el XLSX en bloques de bytes. El XML de
+  cada hoja se escribe fila por fila dentro de un ZIP sin posicionamiento
+  (descriptores de datos al final de cada entrada), así que el archivo se
+  envía mientras se genera y la memoria no depende del número de filas.
 """
-import pandas as pd
-from datetime import datetime
-from typing import List, Dict
+import csv
+import io
+import math
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Sequence
+from xml.sax.saxutils import escape
+
+# Filas por bloque enviado (CSV y XLSX)
+CSV_CHUNK_ROWS = 1000
+XLSX_CHUNK_ROWS = 1000
+
+# Excel cuenta los días desde 1899-12-30
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Caracteres de control que XML no admite
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Estilos de celda definidos en styles.xml (índices de cellXfs)
+_STYLE_DATETIME = 1
+_STYLE_DATE = 2
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/><numFmt numFmtId="165" formatCode="yyyy-mm-dd"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_STYLE_HEADER = 3
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def stream_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    CSV en UTF-8 (con BOM para que Excel muestre bien los acentos), en bloques
+    de CSV_CHUNK_ROWS filas. El encabezado sale de inmediato.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        pending += 1
+        if pending == CSV_CHUNK_ROWS:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode('utf-8')
+
+
+# ==================== XLSX ====================
+
+class _ChunkSink(io.RawIOBase):
+    """Destino del ZIP sin posicionamiento: acumula lo escrito hasta drain()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(reference: str, value, style: int = 0) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, Decimal)) or (isinstance(value, float) and math.isfinite(value)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{reference}" s="{_STYLE_DATETIME}"><v>{serial}</v></c>'
+    if isinstance(value, date):
+        serial = (value - EXCEL_EPOCH.date()).days
+        return f'<c r="{reference}" s="{_STYLE_DATE}"><v>{serial}</v></c>'
+    text = escape(_INVALID_XML_CHARS.sub('', str(value)))
+    style_attribute = f' s="{style}"' if style else ''
+    return f'<c r="{reference}"{style_attribute} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, letters: List[str], values: Sequence, style: int = 0) -> str:
+    cells = ''.join(
+        _xlsx_cell(f'{letter}{number}', value, style)
+        for letter, value in zip(letters, values)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def iter_xlsx(sheets: Dict[str, tuple]) -> Iterator[bytes]:
+    """
+    XLSX con una hoja por entrada {nombre: (encabezados, filas)}, en bloques
+    de bytes de XLSX_CHUNK_ROWS filas comprimidas.
+    """
+    # El compresor retiene datos entre bloques: no enviar bloques vacíos
+    return (chunk for chunk in _xlsx_chunks(sheets) if chunk)
+
+
+def _xlsx_chunks(sheets: Dict[str, tuple]) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    names = list(sheets)
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES.format(sheets=''.join(
+            _SHEET_CONTENT_TYPE.format(index=index) for index in range(1, len(names) + 1)
+        )))
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+            f'<sheet name="{escape(name[:31], {chr(34): "&quot;"})}" sheetId="{index}" r:id="rId{index}"/>'
+            for index, name in enumerate(names, start=1)
+        )))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(sheets=''.join(
+            f'<Relationship Id="rId{index}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{index}.xml"/>'
+            for index in range(1, len(names) + 1)
+        )))
+        archive.writestr('xl/styles.xml', _STYLES)
+        yield sink.drain()
+
+        for index, name in enumerate(names, start=1):
+            headers, rows = sheets[name]
+            letters = [_column_letter(column) for column in range(len(headers))]
+            with archive.open(f'xl/worksheets/sheet{index}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write((_SHEET_START + _xlsx_row(1, letters, headers, _STYLE_HEADER)).encode('utf-8'))
+                yield sink.drain()
+
+                pending = []
+                for number, row in enumerate(rows, start=2):
+                    pending.append(_xlsx_row(number, letters, row))
+                    if len(pending) == XLSX_CHUNK_ROWS:
+                        sheet.write(''.join(pending).encode('utf-8'))
+                        pending.clear()
+                        yield sink.drain()
+                sheet.write((''.join(pending) + _SHEET_END).encode('utf-8'))
+    yield sink.drain()
+
+
+def stream_xlsx(sheet_name: str, headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """XLSX de una sola hoja en bloques de bytes (para una StreamingResponse)"""
+    return iter_xlsx({sheet_name: (headers, rows)})
+
+
+def write_xlsx(target: str, sheets: Dict[str, tuple]) -> str:
+    """Escribe en `target` un XLSX con una hoja por entrada {nombre: (encabezados, filas)}"""
+    with open(target, 'wb') as output:
+        for chunk in iter_xlsx(sheets):
+            output.write(chunk)
+    return target
 
 
 class ExcelExporter:
@@ -11,175 +254,163 @@ class ExcelExporter:
     @staticmethod
     def export_clients(clients: List, filename: str):
         """Exporta clientes a Excel"""
-        data = []
-        for client in clients:
-            data.append({
-                'ID': client.id,
-                'Nombre': client.name,
-                'Tipo': client.client_type,
-                'Estado': client.status,
-                'RNC/Cédula': client.rnc or '',
-                'Email': client.email or '',
-                'Teléfono': client.phone or '',
-                'Móvil': client.mobile or '',
-                'Ciudad': client.city or '',
-                'Dirección': client.address or '',
-                'Límite Crédito': client.credit_limit,
-                'Días Crédito': client.credit_days,
-                'Fecha Creación': client.created_at.strftime('%Y-%m-%d')
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False, sheet_name='Clientes')
+        headers = ['ID', 'Nombre', 'Tipo', 'Estado', 'RNC/Cédula', 'Email', 'Teléfono', 'Móvil', 'Ciudad', 'Dirección', 'Límite Crédito', 'Días Crédito', 'Fecha Creación']
+        rows = (
+            (
+                client.id,
+                client.name,
+                client.client_type,
+                client.status,
+                client.rnc or '',
+                client.email or '',
+                client.phone or '',
+                client.mobile or '',
+                client.city or '',
+                client.address or '',
+                client.credit_limit,
+                client.credit_days,
+                client.created_at.strftime('%Y-%m-%d')
+            )
+            for client in clients
+        )
+        write_xlsx(filename, {'Clientes': (headers, rows)})
         return filename
     
     @staticmethod
     def export_products(products: List, filename: str):
         """Exporta productos a Excel"""
-        data = []
-        for product in products:
-            data.append({
-                'SKU': product.sku,
-                'Nombre': product.name,
-                'Tipo': product.product_type,
-                'Categoría': product.category.name if product.category else '',
-                'Proveedor': product.supplier.name if product.supplier else '',
-                'Precio Venta': product.price,
-                'Precio Alquiler Diario': product.rental_price_daily or 0,
-                'Precio Alquiler Semanal': product.rental_price_weekly or 0,
-                'Precio Alquiler Mensual': product.rental_price_monthly or 0,
-                'Costo': product.cost or 0,
-                'Stock': product.stock,
-                'Stock Disponible': product.stock_available,
-                'Stock Mínimo': product.min_stock,
-                'Ubicación': product.location or '',
-                'Activo': 'Sí' if product.is_active else 'No'
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False, sheet_name='Productos')
+        headers = ['SKU', 'Nombre', 'Tipo', 'Categoría', 'Proveedor', 'Precio Venta', 'Precio Alquiler Diario', 'Precio Alquiler Semanal', 'Precio Alquiler Mensual', 'Costo', 'Stock', 'Stock Disponible', 'Stock Mínimo', 'Ubicación', 'Activo']
+        rows = (
+            (
+                product.sku,
+                product.name,
+                product.product_type,
+                product.category.name if product.category else '',
+                product.supplier.name if product.supplier else '',
+                product.price,
+                product.rental_price_daily or 0,
+                product.rental_price_weekly or 0,
+                product.rental_price_monthly or 0,
+                product.cost or 0,
+                product.stock,
+                product.stock_available,
+                product.min_stock,
+                product.location or '',
+                'Sí' if product.is_active else 'No'
+            )
+            for product in products
+        )
+        write_xlsx(filename, {'Productos': (headers, rows)})
         return filename
     
     @staticmethod
     def export_sales(sales: List, filename: str):
         """Exporta ventas a Excel"""
-        data = []
-        for sale in sales:
-            data.append({
-                'Número Venta': sale.sale_number,
-                'Número Factura': sale.invoice_number or '',
-                'Cliente': sale.client.name if sale.client else '',
-                'Fecha': sale.sale_date.strftime('%Y-%m-%d'),
-                'Estado': sale.status,
-                'Método Pago': sale.payment_method,
-                'Subtotal': sale.subtotal,
-                'Descuento': sale.discount_amount,
-                'Impuesto': sale.tax_amount,
-                'Total': sale.total,
-                'Pagado': sale.paid_amount,
-                'Saldo': sale.balance,
-                'Vendedor': sale.created_by_user.full_name if sale.created_by_user else ''
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False, sheet_name='Ventas')
+        headers = ['Número Venta', 'Número Factura', 'Cliente', 'Fecha', 'Estado', 'Método Pago', 'Subtotal', 'Descuento', 'Impuesto', 'Total', 'Pagado', 'Saldo', 'Vendedor']
+        rows = (
+            (
+                sale.sale_number,
+                sale.invoice_number or '',
+                sale.client.name if sale.client else '',
+                sale.sale_date.strftime('%Y-%m-%d'),
+                sale.status,
+                sale.payment_method,
+                sale.subtotal,
+                sale.discount_amount,
+                sale.tax_amount,
+                sale.total,
+                sale.paid_amount,
+                sale.balance,
+                sale.created_by_user.full_name if sale.created_by_user else ''
+            )
+            for sale in sales
+        )
+        write_xlsx(filename, {'Ventas': (headers, rows)})
         return filename
     
     @staticmethod
     def export_quotations(quotations: List, filename: str):
         """Exporta cotizaciones a Excel"""
-        data = []
-        for quotation in quotations:
-            data.append({
-                'Número': quotation.quotation_number,
-                'Cliente': quotation.client.name if quotation.client else '',
-                'Fecha': quotation.quotation_date.strftime('%Y-%m-%d'),
-                'Válida Hasta': quotation.valid_until.strftime('%Y-%m-%d') if quotation.valid_until else '',
-                'Estado': quotation.status,
-                'Subtotal': quotation.subtotal,
-                'Descuento': quotation.discount_amount,
-                'Impuesto': quotation.tax_amount,
-                'Total': quotation.total,
-                'Creado Por': quotation.created_by_user.full_name if quotation.created_by_user else ''
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False, sheet_name='Cotizaciones')
+        headers = ['Número', 'Cliente', 'Fecha', 'Válida Hasta', 'Estado', 'Subtotal', 'Descuento', 'Impuesto', 'Total', 'Creado Por']
+        rows = (
+            (
+                quotation.quotation_number,
+                quotation.client.name if quotation.client else '',
+                quotation.quotation_date.strftime('%Y-%m-%d'),
+                quotation.valid_until.strftime('%Y-%m-%d') if quotation.valid_until else '',
+                quotation.status,
+                quotation.subtotal,
+                quotation.discount_amount,
+                quotation.tax_amount,
+                quotation.total,
+                quotation.created_by_user.full_name if quotation.created_by_user else ''
+            )
+            for quotation in quotations
+        )
+        write_xlsx(filename, {'Cotizaciones': (headers, rows)})
         return filename
     
     @staticmethod
     def export_rentals(rentals: List, filename: str):
         """Exporta alquileres a Excel"""
-        data = []
-        for rental in rentals:
-            data.append({
-                'Número': rental.rental_number,
-                'Cliente': rental.client.name if rental.client else '',
-                'Producto': rental.product.name if rental.product else '',
-                'Fecha Inicio': rental.start_date.strftime('%Y-%m-%d'),
-                'Fecha Fin': rental.end_date.strftime('%Y-%m-%d'),
-                'Fecha Devolución': rental.actual_return_date.strftime('%Y-%m-%d') if rental.actual_return_date else '',
-                'Estado': rental.status,
-                'Período': rental.rental_period,
-                'Precio': rental.rental_price,
-                'Depósito': rental.deposit,
-                'Costo Total': rental.total_cost,
-                'Pagado': rental.paid_amount,
-                'Saldo': rental.balance,
-                'Creado Por': rental.created_by_user.full_name if rental.created_by_user else ''
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False, sheet_name='Alquileres')
+        headers = ['Número', 'Cliente', 'Producto', 'Fecha Inicio', 'Fecha Fin', 'Fecha Devolución', 'Estado', 'Período', 'Precio', 'Depósito', 'Costo Total', 'Pagado', 'Saldo', 'Creado Por']
+        rows = (
+            (
+                rental.rental_number,
+                rental.client.name if rental.client else '',
+                rental.product.name if rental.product else '',
+                rental.start_date.strftime('%Y-%m-%d'),
+                rental.end_date.strftime('%Y-%m-%d'),
+                rental.actual_return_date.strftime('%Y-%m-%d') if rental.actual_return_date else '',
+                rental.status,
+                rental.rental_period,
+                rental.rental_price,
+                rental.deposit,
+                rental.total_cost,
+                rental.paid_amount,
+                rental.balance,
+                rental.created_by_user.full_name if rental.created_by_user else ''
+            )
+            for rental in rentals
+        )
+        write_xlsx(filename, {'Alquileres': (headers, rows)})
         return filename
     
     @staticmethod
     def export_sales_report(report_data: Dict, filename: str):
         """Exporta reporte completo de ventas a Excel"""
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        sheets = {
             # Resumen
-            summary_data = {
-                'Métrica': ['Total Ventas', 'Monto Total', 'Total Pagado', 'Total Pendiente'],
-                'Valor': [
-                    report_data['total_sales'],
-                    f"${report_data['total_amount']:,.2f}",
-                    f"${report_data['total_paid']:,.2f}",
-                    f"${report_data['total_pending']:,.2f}"
-                ]
-            }
-            df_summary = pd.DataFrame(summary_data)
-            df_summary.to_excel(writer, sheet_name='Resumen', index=False)
-            
-            # Por Estado
-            if report_data.get('by_status'):
-                status_data = []
-                for status, count in report_data['by_status'].items():
-                    status_data.append({'Estado': status, 'Cantidad': count})
-                df_status = pd.DataFrame(status_data)
-                df_status.to_excel(writer, sheet_name='Por Estado', index=False)
-            
-            # Por Método de Pago
-            if report_data.get('by_payment_method'):
-                payment_data = []
-                for method, count in report_data['by_payment_method'].items():
-                    payment_data.append({'Método': method, 'Cantidad': count})
-                df_payment = pd.DataFrame(payment_data)
-                df_payment.to_excel(writer, sheet_name='Por Método Pago', index=False)
-            
-            # Detalle de Ventas
-            if report_data.get('sales'):
-                sales_data = []
-                for sale in report_data['sales']:
-                    sales_data.append({
-                        'Número': sale.sale_number,
-                        'Cliente': sale.client.name if sale.client else '',
-                        'Fecha': sale.sale_date.strftime('%Y-%m-%d'),
-                        'Total': sale.total,
-                        'Estado': sale.status
-                    })
-                df_sales = pd.DataFrame(sales_data)
-                df_sales.to_excel(writer, sheet_name='Detalle Ventas', index=False)
+            'Resumen': (['Métrica', 'Valor'], [
+                ('Total Ventas', report_data['total_sales']),
+                ('Monto Total', f"${report_data['total_amount']:,.2f}"),
+                ('Total Pagado', f"${report_data['total_paid']:,.2f}"),
+                ('Total Pendiente', f"${report_data['total_pending']:,.2f}")
+            ])
+        }
+        
+        # Por Estado
+        if report_data.get('by_status'):
+            sheets['Por Estado'] = (['Estado', 'Cantidad'], report_data['by_status'].items())
+        
+        # Por Método de Pago
+        if report_data.get('by_payment_method'):
+            sheets['Por Método Pago'] = (['Método', 'Cantidad'], report_data['by_payment_method'].items())
+        
+        # Detalle de Ventas
+        if report_data.get('sales'):
+            sheets['Detalle Ventas'] = (['Número', 'Cliente', 'Fecha', 'Total', 'Estado'], (
+                (
+                    sale.sale_number,
+                    sale.client.name if sale.client else '',
+                    sale.sale_date.strftime('%Y-%m-%d'),
+                    sale.total,
+                    sale.status
+                )
+                for sale in report_data['sales']
+            ))
         
+        write_xlsx(filename, sheets)
         return filename
 
 
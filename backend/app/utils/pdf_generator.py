@@ -1,14 +1,45 @@
 """
 Utilidad para generar PDFs de facturas, cotizaciones y contratos
+
+Los estilos se preparan una sola vez por instancia y el encabezado de cada
+organización (textos y la variante "pdf" del logo y el sello, ver
+image_service) se guarda en una caché por proceso. render_pdf() es el punto
+de entrada de los procesos de pdf_service: recibe datos planos (picklables)
+y devuelve los bytes del PDF.
 """
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from collections import OrderedDict
 from datetime import datetime
-import os
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+from typing import Optional
+import io
+import time
+
+# Encabezados de organización guardados por proceso
+COMPANY_CACHE_SIZE = 64
+
+# Si el logo o el sello no se pudo cargar, se reintenta pasado este tiempo
+IMAGE_RETRY_SECONDS = 300
+
+
+class CompanyInfo:
+    """Datos del encabezado de una organización, con el logo y el sello ya descargados"""
+    
+    def __init__(self, name, address="", phone="", email="", rnc=None, logo=None, stamp=None):
+        self.name = name
+        self.address = address
+        self.phone = phone
+        self.email = email
+        self.rnc = rnc
+        self.logo = logo  # Bytes de la imagen o None
+        self.stamp = stamp  # Bytes de la imagen o None
 
 
 class PDFGenerator:
@@ -18,10 +49,12 @@ class PDFGenerator:
         self.company_address = "Av. Principal #123, Santo Domingo, RD"
         self.company_phone = "809-555-0000"
         self.company_email = "info@empresa.com"
+        self.default_company = CompanyInfo(
+            self.company_name, self.company_address, self.company_phone, self.company_email
+        )
         
-    def _create_header(self):
-        """Crea el encabezado del documento"""
-        header_style = ParagraphStyle(
+        # Estilos preparados una sola vez
+        self.header_style = ParagraphStyle(
             'CustomHeader',
             parent=self.styles['Heading1'],
             fontSize=18,
@@ -29,40 +62,79 @@ class PDFGenerator:
             alignment=TA_CENTER,
             spaceAfter=12
         )
-        return Paragraph(self.company_name, header_style)
-    
-    def _create_company_info(self):
-        """Crea la información de la empresa"""
-        info_style = ParagraphStyle(
+        self.info_style = ParagraphStyle(
             'CompanyInfo',
             parent=self.styles['Normal'],
             fontSize=9,
             alignment=TA_CENTER,
             textColor=colors.grey
         )
-        info_text = f"{self.company_address}<br/>{self.company_phone} | {self.company_email}"
-        return Paragraph(info_text, info_style)
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=self.styles['Normal'],
+            fontSize=8,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        )
+        self.terms_style = ParagraphStyle(
+            'Terms',
+            parent=self.styles['Normal'],
+            fontSize=9,
+            alignment=TA_LEFT
+        )
+        self._title_styles = {}
+    
+    def _title_style(self, color: str):
+        """Estilo del título del documento (uno por color)"""
+        if color not in self._title_styles:
+            self._title_styles[color] = ParagraphStyle(
+                'Title',
+                parent=self.styles['Heading2'],
+                fontSize=16,
+                textColor=colors.HexColor(color),
+                alignment=TA_CENTER
+            )
+        return self._title_styles[color]
+    
+    def _image(self, data: bytes, max_width: float, max_height: float, align: str = 'CENTER'):
+        """Flowable de imagen escalado para caber en max_width x max_height"""
+        width, height = ImageReader(io.BytesIO(data)).getSize()
+        scale = min(max_width / width, max_height / height, 1)
+        image = Image(io.BytesIO(data), width=width * scale, height=height * scale)
+        image.hAlign = align
+        return image
+    
+    def _create_header(self, company: CompanyInfo):
+        """Crea el encabezado del documento (logo y nombre)"""
+        header = []
+        if company.logo is not None:
+            header.append(self._image(company.logo, 2.5*inch, 0.9*inch))
+            header.append(Spacer(1, 0.1*inch))
+        header.append(Paragraph(escape(company.name), self.header_style))
+        return header
+    
+    def _create_company_info(self, company: CompanyInfo):
+        """Crea la información de la empresa"""
+        lines = [company.address, " | ".join(value for value in (company.phone, company.email) if value)]
+        if company.rnc:
+            lines.append(f"RNC: {company.rnc}")
+        return Paragraph("<br/>".join(escape(line) for line in lines if line), self.info_style)
+    
+    def _start_story(self, company: CompanyInfo, title: str, color: str):
+        story = self._create_header(company)
+        story.append(self._create_company_info(company))
+        story.append(Spacer(1, 0.3*inch))
+        story.append(Paragraph(title, self._title_style(color)))
+        story.append(Spacer(1, 0.2*inch))
+        return story
     
-    def generate_quotation_pdf(self, quotation, client, items, filename):
+    def generate_quotation_pdf(self, quotation, client, items, filename, company: Optional[CompanyInfo] = None):
         """Genera PDF de cotización"""
+        company = company or self.default_company
         doc = SimpleDocTemplate(filename, pagesize=letter)
-        story = []
         
-        # Header
-        story.append(self._create_header())
-        story.append(self._create_company_info())
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Título
-        title_style = ParagraphStyle(
-            'Title',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#1e40af'),
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph("COTIZACIÓN", title_style))
-        story.append(Spacer(1, 0.2*inch))
+        # Header y título
+        story = self._start_story(company, "COTIZACIÓN", '#1e40af')
         
         # Información de cotización y cliente
         info_data = [
@@ -89,7 +161,7 @@ class PDFGenerator:
         for idx, item in enumerate(items, 1):
             items_data.append([
                 str(idx),
-                item.product.name[:30],
+                (item.product_name or '')[:30],
                 str(item.quantity),
                 f"${item.unit_price:,.2f}",
                 f"${item.subtotal:,.2f}"
@@ -140,38 +212,18 @@ class PDFGenerator:
         
         # Footer
         story.append(Spacer(1, 0.5*inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            alignment=TA_CENTER,
-            textColor=colors.grey
-        )
-        story.append(Paragraph("Gracias por su preferencia", footer_style))
+        story.append(Paragraph("Gracias por su preferencia", self.footer_style))
         
         doc.build(story)
         return filename
     
-    def generate_invoice_pdf(self, sale, client, items, filename):
+    def generate_invoice_pdf(self, sale, client, items, filename, company: Optional[CompanyInfo] = None):
         """Genera PDF de factura"""
+        company = company or self.default_company
         doc = SimpleDocTemplate(filename, pagesize=letter)
-        story = []
         
-        # Header
-        story.append(self._create_header())
-        story.append(self._create_company_info())
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Título
-        title_style = ParagraphStyle(
-            'Title',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#059669'),
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph("FACTURA", title_style))
-        story.append(Spacer(1, 0.2*inch))
+        # Header y título
+        story = self._start_story(company, "FACTURA", '#059669')
         
         # Información de factura y cliente
         info_data = [
@@ -197,7 +249,7 @@ class PDFGenerator:
         for idx, item in enumerate(items, 1):
             items_data.append([
                 str(idx),
-                item.product.name[:30],
+                (item.product_name or '')[:30],
                 str(item.quantity),
                 f"${item.unit_price:,.2f}",
                 f"${item.subtotal:,.2f}"
@@ -247,40 +299,25 @@ class PDFGenerator:
         
         story.append(totals_table)
         
+        # Sello de la organización
+        if company.stamp is not None:
+            story.append(Spacer(1, 0.3*inch))
+            story.append(self._image(company.stamp, 1.5*inch, 1.2*inch, align='RIGHT'))
+        
         # Footer
         story.append(Spacer(1, 0.5*inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            alignment=TA_CENTER,
-            textColor=colors.grey
-        )
-        story.append(Paragraph("Gracias por su compra", footer_style))
+        story.append(Paragraph("Gracias por su compra", self.footer_style))
         
         doc.build(story)
         return filename
     
-    def generate_rental_contract_pdf(self, rental, client, product, filename):
+    def generate_rental_contract_pdf(self, rental, client, product, filename, company: Optional[CompanyInfo] = None):
         """Genera PDF de contrato de alquiler"""
+        company = company or self.default_company
         doc = SimpleDocTemplate(filename, pagesize=letter)
-        story = []
         
-        # Header
-        story.append(self._create_header())
-        story.append(self._create_company_info())
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Título
-        title_style = ParagraphStyle(
-            'Title',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#7c3aed'),
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph("CONTRATO DE ALQUILER", title_style))
-        story.append(Spacer(1, 0.2*inch))
+        # Header y título
+        story = self._start_story(company, "CONTRATO DE ALQUILER", '#7c3aed')
         
         # Información del contrato
         info_data = [
@@ -345,12 +382,6 @@ class PDFGenerator:
         
         # Términos y condiciones
         story.append(Spacer(1, 0.3*inch))
-        terms_style = ParagraphStyle(
-            'Terms',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            alignment=TA_LEFT
-        )
         terms_text = """
         <b>TÉRMINOS Y CONDICIONES:</b><br/>
         1. El equipo debe ser devuelto en las mismas condiciones en que fue entregado.<br/>
@@ -359,14 +390,14 @@ class PDFGenerator:
         4. Cualquier retraso en la devolución generará cargos adicionales.<br/>
         5. El cliente acepta los términos de este contrato al firmar.
         """
-        story.append(Paragraph(terms_text, terms_style))
+        story.append(Paragraph(terms_text, self.terms_style))
         
         # Firmas
         story.append(Spacer(1, 0.5*inch))
         signatures_data = [
             ['_____________________', '_____________________'],
             ['Firma del Cliente', 'Firma Autorizada'],
-            [client.name, self.company_name],
+            [client.name, company.name],
         ]
         
         signatures_table = Table(signatures_data, colWidths=[3.75*inch, 3.75*inch])
@@ -376,6 +407,8 @@ class PDFGenerator:
             ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
         ]))
         story.append(signatures_table)
+        if company.stamp is not None:
+            story.append(self._image(company.stamp, 1.5*inch, 1.2*inch, align='RIGHT'))
         
         doc.build(story)
         return filename
@@ -383,3 +416,72 @@ class PDFGenerator:
 
 # Instancia global
 pdf_generator = PDFGenerator()
+
+
+# ==================== RENDER EN PROCESOS DE TRABAJO ====================
+
+# (organization_id, versión) -> (CompanyInfo, reintentar_en o None), por proceso
+_company_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _load_image(source: Optional[str]) -> Optional[bytes]:
+    """Variante "pdf" del logo o sello (caché local de image_service); None si no está disponible"""
+    # Import diferido: image_service importa app.utils (ciclo al cargar el paquete)
+    from ..image_service import image_variant
+    
+    if not source:
+        return None
+    try:
+        return image_variant(source, "pdf")
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar la imagen {source}: {e}")
+        return None
+
+
+def _company_info(data: Optional[dict]) -> CompanyInfo:
+    """Encabezado de la organización, preparado una vez por versión y proceso"""
+    if not data:
+        return pdf_generator.default_company
+    key = (data["id"], data["version"])
+    entry = _company_cache.get(key)
+    if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+        _company_cache.move_to_end(key)
+        return entry[0]
+
+    logo = _load_image(data.get("logo_url"))
+    stamp = _load_image(data.get("stamp_url"))
+    company = CompanyInfo(
+        data["name"], data.get("address") or "", data.get("phone") or "", data.get("email") or "",
+        rnc=data.get("rnc"), logo=logo, stamp=stamp
+    )
+    failed = (data.get("logo_url") and logo is None) or (data.get("stamp_url") and stamp is None)
+    _company_cache[key] = (company, time.monotonic() + IMAGE_RETRY_SECONDS if failed else None)
+    _company_cache.move_to_end(key)
+    if len(_company_cache) > COMPANY_CACHE_SIZE:
+        _company_cache.popitem(last=False)
+    return company
+
+
+def render_pdf(kind: str, payload: dict) -> bytes:
+    """
+    Genera un PDF a partir de datos planos (ver pdf_service) y devuelve sus bytes.
+    kind: quotation, invoice o rental_contract
+    """
+    company = _company_info(payload.get("company"))
+    document = SimpleNamespace(**payload["document"])
+    client = SimpleNamespace(**payload["client"])
+    buffer = io.BytesIO()
+
+    if kind == "quotation":
+        items = [SimpleNamespace(**item) for item in payload["items"]]
+        pdf_generator.generate_quotation_pdf(document, client, items, buffer, company)
+    elif kind == "invoice":
+        items = [SimpleNamespace(**item) for item in payload["items"]]
+        pdf_generator.generate_invoice_pdf(document, client, items, buffer, company)
+    elif kind == "rental_contract":
+        product = SimpleNamespace(**payload["product"])
+        pdf_generator.generate_rental_contract_pdf(document, client, product, buffer, company)
+    else:
+        raise ValueError(f"Tipo de documento desconocido: {kind}")
+
+    return buffer.getvalue()
@@ -0,0 +1,59 @@
+"""
+Benchmark del costo de autenticar cada petición
+
+Simula N peticiones que crean una cotización, cada una con su propia sesión
+(como get_db): resuelve current_user con las dependencias de auth.py y llama
+al CRUD. Compara el camino sin caché, pasando el id al CRUD (consulta el
+usuario dos veces), con el de la caché de principals, pasando el Principal.
+
+Uso:
+    python benchmarks/bench_auth.py [peticiones]
+"""
+import asyncio
+import sys
+import time
+from datetime import timedelta
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from app import auth, schemas_extended as schemas
+from app.crud_quotations import create_quotation
+from app.database import SessionLocal
+
+
+async def authenticate(token: str, db):
+    return await auth.get_current_active_user(await auth.get_current_user(token, db))
+
+
+def run(count: int):
+    db = create_session()
+    user, client, products = create_tenant(db, product_count=1)
+    token = auth.create_access_token({"sub": user.username}, expires_delta=timedelta(minutes=30))
+    quotation = schemas.QuotationCreate(
+        client_id=client.id,
+        items=[schemas.QuotationItemCreate(product_id=products[0].id, quantity=1, unit_price=10)]
+    )
+    db.close()
+
+    print_header(f"🔑 Peticiones autenticadas ({count} cotizaciones)", ["camino", "sent. auth", "sent. total", "ms auth"])
+    for label, cached in [("sin caché", False), ("caché", True)]:
+        auth.principal_cache.clear()
+        auth_statements = total_statements = 0
+        auth_seconds = 0.0
+        for _ in range(count):
+            if not cached:
+                auth.principal_cache.clear()
+            request_db = SessionLocal()
+            with StatementCounter() as counter:
+                started = time.perf_counter()
+                current_user = asyncio.run(authenticate(token, request_db))
+                auth_seconds += time.perf_counter() - started
+                auth_statements += counter.count
+                create_quotation(request_db, quotation, current_user if cached else current_user.id)
+            total_statements += counter.count
+            request_db.close()
+        print_row(label, auth_statements / count, total_statements / count, auth_seconds / count * 1000)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,127 @@
+"""
+Benchmark del resumen del negocio (/api/summary/business-overview)
+
+Simula una organización con varios años de historial y mide el tiempo y las
+sentencias SQL de get_complete_business_summary, para el período completo y
+para los últimos 30 días.
+
+Uso:
+    python benchmarks/bench_business_summary.py [años] [ventas_por_día]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import insert, select
+
+from app import models_extended as models
+from app.crud_summary import get_complete_business_summary
+
+REPETITIONS = 5
+
+
+def create_history(db, user, client, products, years: int, sales_per_day: int):
+    """Ventas, alquileres y pagos repartidos en los últimos `years` años"""
+    random.seed(42)
+    organization_id = user.organization_id
+    now = datetime.now()
+    days = years * 365
+
+    def moment(day: int) -> datetime:
+        return now - timedelta(days=day, minutes=random.randint(0, 1439))
+
+    sales = []
+    for day in range(days):
+        for n in range(sales_per_day):
+            total = round(random.uniform(50, 5000), 2)
+            sales.append({
+                "sale_number": f"VEN-{day}-{n}",
+                "invoice_number": f"FAC-{day}-{n}",
+                "client_id": client.id,
+                "created_by": user.id,
+                "status": random.choice(["completada", "completada", "parcial", "pendiente_pago", "cancelada"]),
+                "total": total,
+                "paid_amount": random.choice([0, total / 2, total]),
+                "payment_method": random.choice(["efectivo", "tarjeta", "transferencia"]),
+                "created_at": moment(day),
+                "organization_id": organization_id,
+            })
+    db.execute(insert(models.Sale), sales)
+
+    sale_ids = db.execute(select(models.Sale.id)).scalars().all()
+    db.execute(insert(models.SaleItem), [
+        {"sale_id": sale_id, "product_id": random.choice(products).id, "quantity": 2, "unit_price": 10, "subtotal": 20}
+        for sale_id in sale_ids
+    ])
+
+    rentals = []
+    for day in range(days):
+        for n in range(max(1, sales_per_day // 2)):
+            created_at = moment(day)
+            rentals.append({
+                "rental_number": f"ALQ-{day}-{n}",
+                "client_id": client.id,
+                "created_by": user.id,
+                "status": random.choice(["activo", "vencido", "devuelto", "devuelto", "cancelado"]),
+                "start_date": created_at,
+                "end_date": created_at + timedelta(days=7),
+                "total_cost": round(random.uniform(100, 3000), 2),
+                "created_at": created_at,
+                "organization_id": organization_id,
+            })
+    db.execute(insert(models.Rental), rentals)
+
+    rental_ids = db.execute(select(models.Rental.id)).scalars().all()
+    db.execute(insert(models.RentalPayment), [
+        {
+            "rental_id": rental_id,
+            "amount": round(random.uniform(10, 500), 2),
+            "payment_method": random.choice(["efectivo", "transferencia"]),
+            "payment_date": now - timedelta(days=random.randint(0, days)),
+            "organization_id": organization_id,
+        }
+        for rental_id in rental_ids
+        for _ in range(random.randint(1, 3))
+    ])
+    db.commit()
+    return len(sales), len(rentals)
+
+
+def measure(db, organization_id: int, start_date=None, end_date=None):
+    timings = []
+    for _ in range(REPETITIONS):
+        db.expunge_all()
+        with StatementCounter() as counter, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            get_complete_business_summary(db, organization_id, start_date, end_date)
+            timings.append((time.perf_counter() - started) * 1000)
+    return counter.count, min(timings), sorted(timings)[len(timings) // 2]
+
+
+def run(years: int, sales_per_day: int):
+    db = create_session()
+    user, client, products = create_tenant(db, product_count=20)
+    sales, rentals = create_history(db, user, client, products, years, sales_per_day)
+
+    print_header(f"📊 Resumen del negocio ({sales} ventas, {rentals} alquileres)", ["período", "sentencias", "mín ms", "p50 ms"])
+    now = datetime.now()
+    for label, start_date, end_date in [
+        ("completo", None, None),
+        ("30 días", now - timedelta(days=30), now),
+    ]:
+        statements, best, median = measure(db, user.organization_id, start_date, end_date)
+        print_row(label, statements, best, median)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
@@ -0,0 +1,95 @@
+"""
+Benchmark de búsqueda de clientes y del endpoint de autocompletar
+
+Compara la búsqueda con índice (FTS5 en SQLite / pg_trgm en PostgreSQL)
+contra el escaneo LIKE '%texto%' anterior, sobre una organización con
+muchos clientes. Para autocompletar, el objetivo es < 20 ms por consulta.
+
+Uso:
+    python benchmarks/bench_client_search.py [cantidad_clientes]
+"""
+import random
+import statistics
+import sys
+import time
+
+from common import create_session, create_tenant, engine, print_header, print_row
+
+from sqlalchemy import insert
+
+from app import models_extended as models
+from app import search
+from app.crud_clients import get_clients, search_clients_typeahead
+
+FIRST_NAMES = ["Juan", "María", "José", "Ana", "Luis", "Carmen", "Pedro", "Rosa", "Miguel", "Lucía"]
+LAST_NAMES = ["Pérez", "Rodríguez", "Gómez", "Martínez", "Santana", "Reyes", "Almonte", "Núñez"]
+COMPANIES = ["Clínica", "Hospital", "Farmacia", "Centro Médico", "Laboratorio", "Ferretería"]
+SEARCHES = ["clin", "maria perez", "Hospital Reyes", "000-0001234", "8095550", "gmail"]
+REPETITIONS = 20
+
+
+def create_clients(db, organization_id: int, count: int):
+    random.seed(42)
+    rows = []
+    for i in range(count):
+        if i % 3 == 0:
+            name = f"{random.choice(COMPANIES)} {random.choice(LAST_NAMES)} {i}"
+        else:
+            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {i}"
+        rnc = f"{i // 10000000:03d}-{i % 10000000:07d}-{i % 10}"
+        rows.append({
+            "name": name,
+            "rnc": rnc,
+            "rnc_normalized": rnc.replace("-", ""),
+            "email": f"cliente{i}@{random.choice(['gmail.com', 'hotmail.com', 'empresa.do'])}",
+            "phone": f"(809) 555-{i % 10000:04d}",
+            "organization_id": organization_id,
+        })
+    db.execute(insert(models.Client), rows)
+    db.commit()
+
+
+def measure(call):
+    """Devuelve (filas, p50 ms, p95 ms) de varias ejecuciones"""
+    timings = []
+    for _ in range(REPETITIONS):
+        started = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return len(result), statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(count: int):
+    db = create_session()
+    user, _, _ = create_tenant(db)
+    organization_id = user.organization_id
+    create_clients(db, organization_id, count)
+    search.ensure_search_index(engine)
+
+    modes = [("índice", True), ("like", False)]
+
+    print_header(f"⌨️ Autocompletar ({count} clientes, limit=10)", ["modo", "búsqueda", "filas", "p50 ms", "p95 ms"])
+    for mode, indexed in modes:
+        search._fts_available = indexed
+        search._trigram_available = indexed
+        for term in SEARCHES:
+            rows, p50, p95 = measure(lambda: search_clients_typeahead(db, term, organization_id=organization_id))
+            print_row(mode, term[:14], rows, p50, p95)
+
+    print_header(f"📋 Listado con búsqueda ({count} clientes, limit=100)", ["modo", "búsqueda", "filas", "p50 ms", "p95 ms"])
+    for mode, indexed in modes:
+        search._fts_available = indexed
+        search._trigram_available = indexed
+        for term in SEARCHES:
+            def call():
+                db.expunge_all()
+                return get_clients(db, search=term, organization_id=organization_id)
+            rows, p50, p95 = measure(call)
+            print_row(mode, term[:14], rows, p50, p95)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,53 @@
+"""
+Benchmark: consultas SQL de create_sale según la cantidad de líneas de la venta
+
+Uso:
+    python benchmarks/bench_create_sale.py [lineas ...]
+"""
+import sys
+import time
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from app import models_extended as models, schemas_extended as schemas
+from app.crud_sales import create_sale
+
+
+def run(line_counts):
+    db = create_session()
+    user, client, products = create_tenant(
+        db, max(line_counts), product_type=lambda i: "ambos" if i % 2 else "venta"
+    )
+
+    def build_sale(lines: int) -> schemas.SaleCreate:
+        return schemas.SaleCreate(
+            client_id=client.id,
+            payment_method="efectivo",
+            items=[
+                schemas.SaleItemCreate(product_id=product.id, quantity=1, unit_price=10.0)
+                for product in products[:lines]
+            ]
+        )
+
+    # Venta inicial para crear los contadores de numeración (solo ocurre una vez por organización)
+    create_sale(db, build_sale(1), user.id)
+
+    print_header("📊 create_sale: sentencias SQL por venta", ["líneas", "sentencias", "ms"])
+    for lines in line_counts:
+        sale = build_sale(lines)
+        # Igual que en la API: el usuario autenticado ya está en la sesión
+        db.expire_all()
+        db.get(models.User, user.id)
+
+        with StatementCounter() as counter:
+            started = time.perf_counter()
+            create_sale(db, sale, user.id)
+            elapsed = (time.perf_counter() - started) * 1000
+        print_row(lines, counter.count, elapsed)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 30, 80]
+    run(counts)
@@ -0,0 +1,90 @@
+"""
+Benchmark de las exportaciones CSV / XLSX
+
+Exporta N movimientos de inventario y mide el tiempo hasta el primer bloque,
+el tiempo total y el pico de memoria de Python (tracemalloc, en una segunda
+pasada). Como referencia, "en memoria" carga todas las filas y arma la lista
+de dicts que necesitaba el ExcelExporter anterior antes de crear el DataFrame.
+
+Uso:
+    python benchmarks/bench_exports.py [movimientos]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from common import create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import insert
+
+from app import models_extended as models
+from app.crud_exports import inventory_movements_export, iter_export_rows
+from app.utils.excel_exporter import stream_csv, stream_xlsx
+
+INSERT_BATCH = 50_000
+
+
+def create_movements(db, organization_id: int, user_id: int, product_id: int, count: int):
+    start = datetime.now() - timedelta(days=365)
+    for offset in range(0, count, INSERT_BATCH):
+        db.execute(insert(models.InventoryMovement), [
+            {
+                "product_id": product_id, "user_id": user_id, "movement_type": "entrada",
+                "quantity": 1, "previous_stock": i, "new_stock": i + 1, "reason": "Carga de benchmark",
+                "created_at": start + timedelta(seconds=i * 30), "organization_id": organization_id,
+            }
+            for i in range(offset, min(offset + INSERT_BATCH, count))
+        ])
+    db.commit()
+
+
+def in_memory(db, organization_id: int):
+    export = inventory_movements_export(organization_id)
+    data = [dict(zip(export.headers, row)) for row in db.execute(export.statement).all()]
+    yield str(len(data)).encode()
+
+
+def measure(make_body):
+    """Tiempos en una pasada sin tracemalloc (lo vuelve varias veces más lento) y memoria en otra"""
+    started = time.perf_counter()
+    first_chunk = None
+    size = 0
+    for chunk in make_body():
+        if first_chunk is None:
+            first_chunk = (time.perf_counter() - started) * 1000
+        size += len(chunk)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    for _ in make_body():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_chunk, elapsed, peak / (1024 * 1024), size / (1024 * 1024)
+
+
+def run(count: int):
+    db = create_session()
+    user, _, products = create_tenant(db, product_count=1)
+    organization_id = user.organization_id
+    create_movements(db, organization_id, user.id, products[0].id, count)
+
+    def rows():
+        return iter_export_rows(db, inventory_movements_export(organization_id))
+
+    export = inventory_movements_export(organization_id)
+    print_header(f"📤 Exportación de movimientos ({count} filas)", ["camino", "1er bloque ms", "total ms", "pico MB", "archivo MB"])
+    for label, body in [
+        ("en memoria", lambda: in_memory(db, organization_id)),
+        ("csv", lambda: stream_csv(export.headers, rows())),
+        ("xlsx", lambda: stream_xlsx(export.sheet_name, export.headers, rows())),
+    ]:
+        db.expunge_all()
+        print_row(label, *measure(body))
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,75 @@
+"""
+Benchmark de la subida de logos: bloqueo del event loop
+
+Mientras se procesa y guarda una foto grande (almacenamiento local en un
+directorio temporal), una tarea marca el reloj cada 5 ms. La mayor pausa
+entre marcas es lo que esperaría cualquier otra petición del mismo worker:
+procesando dentro del handler async vs en el pool de hilos de image_service.
+
+Uso:
+    python benchmarks/bench_image_upload.py [lado en px]
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["IMAGE_STORAGE"] = "local"
+
+from common import print_header, print_row
+
+from PIL import Image
+
+from app import image_service
+
+TICK_SECONDS = 0.005
+
+
+async def max_stall(work) -> float:
+    """Mayor pausa (ms) del event loop mientras corre `work`"""
+    stop = asyncio.Event()
+    worst = 0.0
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(TICK_SECONDS)
+            now = time.perf_counter()
+            worst = max(worst, now - last - TICK_SECONDS)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS * 2)
+    await work()
+    stop.set()
+    await task
+    return worst * 1000
+
+
+def run(side: int):
+    buffer = io.BytesIO()
+    Image.effect_noise((side, side), 64).convert("RGB").save(buffer, "JPEG", quality=95)
+    photo = buffer.getvalue()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_images_"))
+    Path("static").mkdir()
+
+    async def inline():
+        image_service.store_organization_image(1, "logo", photo)
+
+    async def pooled():
+        await image_service.store_organization_image_async(2, "logo", photo)
+
+    print_header(f"🖼️  Subida de logo ({side}x{side} px, {len(photo) // 1024} KB)", ["camino", "total ms", "pausa máx ms"])
+    for label, work in [("en el handler", inline), ("pool de hilos", pooled)]:
+        started = time.perf_counter()
+        stall = asyncio.run(max_stall(work))
+        print_row(label, (time.perf_counter() - started) * 1000, stall)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 4000)
@@ -0,0 +1,130 @@
+"""
+Benchmark de los rankings de productos y clientes (top-products / top-clients)
+
+Con varios años de ventas, compara la lectura de product_leaderboard y
+client_leaderboard contra la agregación sobre todo el historial
+(SaleItem -> Sale -> Product / Client -> Sale) que se hacía en cada vista del
+dashboard, y verifica que el mantenimiento incremental (crear y cancelar
+ventas) deja los mismos rankings que una reconstrucción.
+
+Uso:
+    python benchmarks/bench_leaderboards.py [años] [ventas_por_día]
+"""
+import sys
+import time
+from datetime import datetime
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import func, update
+
+from app import models_extended as models
+from app import leaderboards
+from app.crud_dashboard import get_top_clients, get_top_products
+from app.crud_sales import create_sale, update_sale
+from app.schemas_extended import SaleCreate, SaleUpdate
+from bench_business_summary import create_history
+
+REPETITIONS = 10
+
+
+def history_top_products(db, organization_id: int, limit: int = 10):
+    """Agregación sobre todo el historial (consulta anterior, sin canceladas)"""
+    return db.query(
+        models.Product.id,
+        func.sum(models.SaleItem.quantity).label('total_sold'),
+        func.sum(models.SaleItem.subtotal).label('total_revenue')
+    ).join(
+        models.SaleItem, models.Product.id == models.SaleItem.product_id
+    ).join(
+        models.Sale, models.SaleItem.sale_id == models.Sale.id
+    ).filter(
+        models.Product.organization_id == organization_id,
+        models.Sale.organization_id == organization_id,
+        func.coalesce(models.Sale.status, "") != "cancelada"
+    ).group_by(models.Product.id).order_by(func.sum(models.SaleItem.quantity).desc()).limit(limit).all()
+
+
+def history_top_clients(db, organization_id: int, limit: int = 10):
+    return db.query(
+        models.Client.id,
+        func.count(models.Sale.id).label('total_purchases'),
+        func.sum(models.Sale.total).label('total_spent')
+    ).join(
+        models.Sale, models.Client.id == models.Sale.client_id
+    ).filter(
+        models.Client.organization_id == organization_id,
+        models.Sale.organization_id == organization_id,
+        func.coalesce(models.Sale.status, "") != "cancelada"
+    ).group_by(models.Client.id).order_by(func.sum(models.Sale.total).desc()).limit(limit).all()
+
+
+def measure(db, call):
+    timings = []
+    for _ in range(REPETITIONS):
+        db.expunge_all()
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), sorted(timings)[len(timings) // 2]
+
+
+def snapshot(db) -> dict:
+    rows = {}
+    for board, key, measures in [
+        (models.ProductLeaderboard, "product_id", ("quantity", "revenue", "line_count")),
+        (models.ClientLeaderboard, "client_id", ("purchases", "total_spent")),
+    ]:
+        for row in db.query(board).all():
+            rows[(board.__tablename__, row.period, getattr(row, key))] = tuple(round(getattr(row, m), 4) for m in measures)
+    return rows
+
+
+def run(years: int, sales_per_day: int):
+    db = create_session()
+    user, client, products = create_tenant(db, product_count=200)
+    organization_id, user_id, client_id = user.organization_id, user.id, client.id
+    product_ids = [product.id for product in products]
+    sales, _ = create_history(db, user, client, products, years, sales_per_day)
+    db.execute(update(models.Sale).values(sale_date=models.Sale.created_at))
+    leaderboards.rebuild_leaderboards(db, organization_id)
+    db.commit()
+
+    month = leaderboards.month_period(datetime.now())
+    print_header(f"🏆 Rankings ({sales} ventas)", ["consulta", "origen", "mín ms", "p50 ms"])
+    for label, source, call in [
+        ("top productos", "historial", lambda: history_top_products(db, organization_id)),
+        ("top productos", "ranking", lambda: get_top_products(db, organization_id)),
+        ("top productos mes", "ranking", lambda: get_top_products(db, organization_id, month=month)),
+        ("top clientes", "historial", lambda: history_top_clients(db, organization_id)),
+        ("top clientes", "ranking", lambda: get_top_clients(db, organization_id)),
+    ]:
+        print_row(label, source, *measure(db, call))
+
+    # Costo en la escritura y consistencia con una reconstrucción
+    sale_ids = []
+    with StatementCounter() as counter:
+        for n in range(20):
+            sale = create_sale(db, SaleCreate(
+                client_id=client_id,
+                payment_method="efectivo",
+                items=[{"product_id": product_ids[(n + i) % len(product_ids)], "quantity": 1, "unit_price": 10} for i in range(5)]
+            ), user_id)
+            sale_ids.append(sale.id)
+    print(f"\nSentencias por venta creada: {counter.count / 20:.1f}")
+    for sale_id in sale_ids[:10]:
+        update_sale(db, sale_id, SaleUpdate(status="cancelada"))
+
+    incremental = snapshot(db)
+    leaderboards.rebuild_leaderboards(db, organization_id)
+    db.commit()
+    print(f"Incremental = reconstrucción: {'✅' if incremental == snapshot(db) else '❌'}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
@@ -0,0 +1,70 @@
+"""
+Benchmark de los listados: view=full vs view=summary
+
+Para cada listado (ventas, alquileres, cotizaciones) llama al endpoint con
+ambas vistas y serializa el resultado como lo haría FastAPI (el modo full
+pasa por su response_model anidado). Compara sentencias SQL, tiempo por
+página y bytes del cuerpo JSON.
+
+Uso:
+    python benchmarks/bench_list_views.py [filas por página] [repeticiones]
+"""
+import sys
+import time
+from typing import List
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app import models_extended as models, schemas_extended as schemas
+from app.routers import quotations, rentals, sales
+
+from check_statement_budget import DOCUMENTS, seed
+
+
+def run(limit: int, repeat: int):
+    db = create_session()
+    user, _, product_list = create_tenant(db, product_count=DOCUMENTS)
+    user_id = user.id
+    seed(db, user.organization_id, user_id, [p.id for p in product_list])
+
+    endpoints = [
+        ("ventas", List[schemas.Sale], sales.read_sales),
+        ("alquileres", List[schemas.Rental], rentals.read_rentals),
+        ("cotizaciones", List[schemas.Quotation], quotations.read_quotations),
+    ]
+
+    print_header(f"📋 Listados full vs summary ({limit} filas, {repeat} repeticiones)",
+                 ["listado", "vista", "sentencias", "ms/página", "KB"])
+    for label, response_model, endpoint in endpoints:
+        adapter = TypeAdapter(response_model)
+
+        def full(current_user):
+            rows = endpoint(Response(), limit=limit, view="full", db=db, current_user=current_user)
+            return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+        def summary(current_user):
+            return endpoint(Response(), limit=limit, view="summary", db=db, current_user=current_user).body
+
+        for view, call in [("full", full), ("summary", summary)]:
+            elapsed = 0.0
+            for _ in range(repeat):
+                # Sesión vacía salvo el usuario, como la deja la autenticación
+                db.expunge_all()
+                current_user = db.get(models.User, user_id)
+                with StatementCounter() as counter:
+                    started = time.perf_counter()
+                    body = call(current_user)
+                    elapsed += time.perf_counter() - started
+            print_row(label, view, counter.count, elapsed / repeat * 1000, len(body) / 1024)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
@@ -0,0 +1,80 @@
+"""
+Benchmark de una ráfaga de logins: latencia de las demás peticiones
+
+Lanza N verificaciones de contraseña concurrentes (lo que cuesta un login)
+mientras otra tarea atiende una petición liviana cada 5 ms, como haría el
+mismo worker con el resto del tráfico. Compara verificar dentro del handler
+async (bloquea el event loop) con el pool de hashes de auth.py, y reporta
+p50/p99/máx de la latencia de esas otras peticiones.
+
+Uso:
+    python benchmarks/bench_login.py [logins] [rondas PBKDF2]
+"""
+import asyncio
+import os
+import sys
+import time
+
+if len(sys.argv) > 2:
+    os.environ["PASSWORD_HASH_ROUNDS"] = sys.argv[2]
+
+from common import print_header, print_row
+
+from app import auth
+from app.config import settings
+from app.routers.auth import health_check
+
+TICK_SECONDS = 0.005
+
+PASSWORD = "Benchmark2025!"
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def other_requests_latency(burst) -> list:
+    """Latencias (ms) de las peticiones livianas atendidas mientras corre `burst`"""
+    stop = asyncio.Event()
+    latencies = []
+
+    async def traffic():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            await health_check()
+            latencies.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+    task = asyncio.create_task(traffic())
+    await asyncio.sleep(TICK_SECONDS * 2)
+    await burst()
+    stop.set()
+    await task
+    return latencies
+
+
+def run(count: int):
+    hashed = auth.get_password_hash(PASSWORD)
+
+    async def inline():
+        async def login():
+            auth.verify_password(PASSWORD, hashed)
+        await asyncio.gather(*(login() for _ in range(count)))
+
+    async def pooled():
+        await asyncio.gather(*(auth.verify_password_async(PASSWORD, hashed) for _ in range(count)))
+
+    print_header(
+        f"🔐 Ráfaga de {count} logins ({settings.PASSWORD_HASH_ROUNDS} rondas, {settings.PASSWORD_HASH_WORKERS} hilos)",
+        ["camino", "ráfaga ms", "p50 ms", "p99 ms", "máx ms"]
+    )
+    for label, burst in [("en el handler", inline), ("pool", pooled)]:
+        started = time.perf_counter()
+        latencies = asyncio.run(other_requests_latency(burst))
+        elapsed = (time.perf_counter() - started) * 1000
+        print_row(label, elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), max(latencies))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,76 @@
+"""
+Benchmark de la generación de notificaciones del dashboard
+
+Cada carga de /api/dashboard/stats genera las notificaciones de la
+organización. Compara el camino anterior (get_or_create_notification por
+clave: SELECT + commit + refresh) con upsert_notifications (un SELECT por
+organización y, solo si algo cambió, un INSERT ... ON CONFLICT), contando
+sentencias y filas escritas por carga.
+
+Uso:
+    python benchmarks/bench_notifications.py [cargas]
+"""
+import sys
+import time
+
+from common import create_session, create_tenant, engine, print_header, print_row
+
+from sqlalchemy import event
+
+from app.crud_notification_generator import generate_dashboard_notifications
+from app.crud_notifications import get_or_create_notification
+from app.schemas_extended import NotificationCreate
+
+
+class WriteCounter:
+    """Cuenta sentencias y filas modificadas por las que no son SELECT"""
+
+    def __init__(self):
+        self.statements = 0
+        self.writes = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        if not statement.lstrip().upper().startswith("SELECT"):
+            self.writes += max(cursor.rowcount, 0)
+
+
+def dashboard_stats(load: int, changing: bool) -> dict:
+    # Con "cambia", el conteo de stock bajo varía en cada carga
+    return {"low_stock_products": 3 + (load if changing else 0), "overdue_rentals": 2}
+
+
+def per_key_generation(db, organization_id: int, stats: dict):
+    """Camino anterior: una búsqueda y un commit por clave"""
+    for key, count in [("stock-bajo", stats["low_stock_products"]), ("alquileres-vencidos", stats["overdue_rentals"])]:
+        get_or_create_notification(db, key, organization_id, NotificationCreate(
+            type="warning", title=key, message=f"{count} elementos", notification_key=key
+        ))
+
+
+def run(loads: int):
+    db = create_session()
+    user, _, _ = create_tenant(db)
+    organization_id = user.organization_id
+
+    print_header(f"🔔 Notificaciones del dashboard ({loads} cargas)", ["camino", "contenido", "sentencias/carga", "filas escritas/carga", "ms/carga"])
+    for label, generate in [
+        ("por clave", lambda stats: per_key_generation(db, organization_id, stats)),
+        ("upsert", lambda stats: generate_dashboard_notifications(db, organization_id, stats)),
+    ]:
+        for changing in (False, True):
+            generate(dashboard_stats(-1, changing))  # Primera carga: crea las notificaciones
+            counter = WriteCounter()
+            event.listen(engine, "after_cursor_execute", counter)
+            started = time.perf_counter()
+            for load in range(loads):
+                generate(dashboard_stats(load, changing))
+            elapsed = (time.perf_counter() - started) * 1000
+            event.remove(engine, "after_cursor_execute", counter)
+            print_row(label, "cambia" if changing else "igual", counter.statements / loads, counter.writes / loads, elapsed / loads)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,92 @@
+"""
+Benchmark del reset de datos de una organización
+
+Compara el reset anterior de /api/organizations/me/reset-data (cargar ventas,
+cotizaciones y alquileres y borrar sus items/pagos con un DELETE por
+documento) contra crud_organization.reset_organization_data (un DELETE por
+conjunto por tabla, en orden de dependencias).
+
+Uso:
+    python benchmarks/bench_org_reset.py [documentos]
+"""
+import sys
+import time
+from datetime import datetime
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import insert, select
+
+from app import models_extended as models
+from app.crud_organization import reset_organization_data
+
+
+def create_documents(db, organization_id: int, user_id: int, count: int):
+    """`count` ventas, alquileres y cotizaciones, cada uno con dos items o pagos"""
+    now = datetime.now()
+    client_id = db.execute(insert(models.Client).values(name="Cliente Reset", organization_id=organization_id)).inserted_primary_key[0]
+    product_id = db.execute(insert(models.Product).values(
+        sku="RESET-1", name="Producto Reset", price=10.0, organization_id=organization_id
+    )).inserted_primary_key[0]
+    common = {"client_id": client_id, "created_by": user_id, "organization_id": organization_id, "created_at": now}
+
+    db.execute(insert(models.Sale), [{**common, "sale_number": f"VEN-RESET-{i}", "total": 20} for i in range(count)])
+    db.execute(insert(models.Rental), [
+        {**common, "rental_number": f"ALQ-RESET-{i}", "start_date": now, "end_date": now, "total_cost": 20}
+        for i in range(count)
+    ])
+    db.execute(insert(models.Quotation), [{**common, "quotation_number": f"COT-RESET-{i}", "total": 20} for i in range(count)])
+
+    sale_ids = db.scalars(select(models.Sale.id).where(models.Sale.organization_id == organization_id)).all()
+    rental_ids = db.scalars(select(models.Rental.id).where(models.Rental.organization_id == organization_id)).all()
+    quotation_ids = db.scalars(select(models.Quotation.id).where(models.Quotation.organization_id == organization_id)).all()
+    item = {"product_id": product_id, "quantity": 1, "unit_price": 10, "subtotal": 10}
+    db.execute(insert(models.SaleItem), [{**item, "sale_id": sale_id} for sale_id in sale_ids for _ in range(2)])
+    db.execute(insert(models.QuotationItem), [{**item, "quotation_id": quotation_id} for quotation_id in quotation_ids for _ in range(2)])
+    db.execute(insert(models.RentalPayment), [
+        {"rental_id": rental_id, "amount": 10, "payment_method": "efectivo", "organization_id": organization_id}
+        for rental_id in rental_ids for _ in range(2)
+    ])
+    db.commit()
+
+
+def per_document_reset(db, organization_id: int):
+    """Camino anterior: un DELETE de items/pagos por cada documento"""
+    for parent, child, column in [
+        (models.Sale, models.SaleItem, models.SaleItem.sale_id),
+        (models.Quotation, models.QuotationItem, models.QuotationItem.quotation_id),
+        (models.Rental, models.RentalPayment, models.RentalPayment.rental_id),
+    ]:
+        for document in db.query(parent).filter(parent.organization_id == organization_id).all():
+            db.query(child).filter(column == document.id).delete()
+        db.query(parent).filter(parent.organization_id == organization_id).delete(synchronize_session=False)
+    for model in (models.Product, models.Client):
+        db.query(model).filter(model.organization_id == organization_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def run(count: int):
+    db = create_session()
+    user, client, _ = create_tenant(db)
+    organization_id, user_id = user.organization_id, user.id
+    db.query(models.Client).filter(models.Client.id == client.id).delete()
+    db.commit()
+
+    print_header(f"🗑️  Reset de organización ({count} documentos de cada tipo)", ["camino", "sentencias", "ms"])
+    for label, reset in [
+        ("por documento", lambda: per_document_reset(db, organization_id)),
+        ("por conjunto", lambda: reset_organization_data(db, organization_id)),
+    ]:
+        create_documents(db, organization_id, user_id, count)
+        db.expunge_all()
+        with StatementCounter() as counter:
+            started = time.perf_counter()
+            reset()
+            elapsed = (time.perf_counter() - started) * 1000
+        print_row(label, counter.count, elapsed)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
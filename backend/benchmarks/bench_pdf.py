@@ -0,0 +1,91 @@
+"""
+Benchmark del render de facturas en PDF
+
+Genera el ZIP mensual de N facturas (5 items cada una) de tres formas:
+secuencial en el mismo proceso (como se haría dentro del worker web), con
+el pool de procesos de pdf_service y de nuevo con la caché de PDFs llena.
+
+Uso:
+    python benchmarks/bench_pdf.py [facturas] [procesos]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+if len(sys.argv) > 2:
+    os.environ["PDF_WORKERS"] = sys.argv[2]
+
+from common import create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import insert, select
+
+from app import models_extended as models
+from app import pdf_service
+from app.config import settings
+from app.utils.pdf_generator import render_pdf
+
+
+def create_sales(db, organization_id: int, user_id: int, client_id: int, product_ids, count: int, month_start: datetime):
+    db.execute(insert(models.Sale), [
+        {
+            "sale_number": f"VEN-PDF-{i:05d}", "invoice_number": f"FAC-PDF-{i:05d}", "client_id": client_id,
+            "created_by": user_id, "status": "completada", "payment_method": "efectivo",
+            "subtotal": 50, "tax_amount": 9, "total": 59, "paid_amount": 59, "balance": 0,
+            "sale_date": month_start.replace(day=1 + i % 28), "organization_id": organization_id,
+        }
+        for i in range(count)
+    ])
+    sale_ids = db.scalars(select(models.Sale.id).where(models.Sale.organization_id == organization_id)).all()
+    db.execute(insert(models.SaleItem), [
+        {"sale_id": sale_id, "product_id": product_id, "product_name": "Producto de prueba", "quantity": 1, "unit_price": 10, "subtotal": 10}
+        for sale_id in sale_ids for product_id in product_ids
+    ])
+    db.commit()
+
+
+def sequential(db, organization_id: int, month: str):
+    """Referencia: cada PDF se genera en el mismo proceso, uno detrás de otro"""
+    start, end = pdf_service._month_range(month)
+    sales = db.query(models.Sale).filter(
+        models.Sale.organization_id == organization_id,
+        models.Sale.sale_date >= start,
+        models.Sale.sale_date < end
+    ).all()
+    for sale in sales:
+        render_pdf("invoice", pdf_service.invoice_payload(sale))
+
+
+def archive(db, organization_id: int, month: str):
+    zip_file, _ = pdf_service.build_invoice_archive(db, organization_id, month)
+    zip_file.close()
+
+
+def run(count: int):
+    db = create_session()
+    user, client, products = create_tenant(db, product_count=5)
+    month_start = datetime(2025, 3, 1)
+    create_sales(db, user.organization_id, user.id, client.id, [p.id for p in products], count, month_start)
+    organization_id, month = user.organization_id, month_start.strftime("%Y-%m")
+
+    # Arranca los procesos antes de medir
+    pdf_service._render("invoice", pdf_service.invoice_payload(db.query(models.Sale).first()))
+
+    print_header(f"🧾 Facturas del mes en PDF ({count} facturas, {settings.PDF_WORKERS} procesos)", ["camino", "ms", "PDFs/s"])
+    for label, render in [
+        ("secuencial", lambda: sequential(db, organization_id, month)),
+        ("pool", lambda: archive(db, organization_id, month)),
+        ("caché", lambda: archive(db, organization_id, month)),
+    ]:
+        db.expunge_all()
+        started = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - started
+        print_row(label, elapsed * 1000, count / elapsed)
+
+    pdf_service.shutdown_pdf_pool()
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
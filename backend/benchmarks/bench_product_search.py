@@ -0,0 +1,88 @@
+"""
+Benchmark: búsqueda de productos en el servidor vs. descargar el catálogo
+
+Crea un catálogo grande en una base temporal y compara el tamaño de la
+respuesta JSON y el tiempo de:
+  - descargar todo el catálogo (lo que hacía el frontend para filtrar local)
+  - buscar en el servidor con el índice (FTS5 en SQLite)
+  - buscar con LIKE (sin índice)
+
+Uso:
+    python benchmarks/bench_product_search.py [cantidad_productos]
+"""
+import json
+import random
+import sys
+import time
+
+from common import create_session, create_tenant, engine, print_header, print_row
+
+from app import models_extended as models, schemas_extended as schemas
+from app import search
+from app.crud import get_products
+
+WORDS = [
+    "andamio", "silla", "mesa", "carpa", "taladro", "martillo", "escalera", "cable",
+    "bocina", "luz", "generador", "mezcladora", "tubo", "panel", "plancha", "mantel",
+]
+SEARCHES = ["andamio", "silla plegable", "gen", "SKU-01234", "carpa 10x"]
+
+
+def create_catalog(db, organization_id: int, count: int):
+    random.seed(42)
+    categories = [models.Category(name=f"Categoría {word}", organization_id=organization_id) for word in WORDS]
+    db.add_all(categories)
+    db.flush()
+
+    db.bulk_save_objects([
+        models.Product(
+            sku=f"SKU-{i:05d}",
+            name=f"{random.choice(WORDS).capitalize()} {random.choice(['plegable', 'grande', 'pequeño', '10x10', 'industrial'])} {i}",
+            product_type=random.choice(["venta", "alquiler", "ambos"]),
+            price=10.0,
+            stock=10,
+            stock_available=random.randint(0, 10),
+            category_id=random.choice(categories).id,
+            organization_id=organization_id
+        )
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def response_size(products) -> int:
+    payload = [schemas.Product.model_validate(product).model_dump(mode="json") for product in products]
+    return len(json.dumps(payload))
+
+
+def timed(call):
+    started = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(count: int):
+    db = create_session()
+    user, _, _ = create_tenant(db)
+    create_catalog(db, user.organization_id, count)
+    search.ensure_search_index(engine)
+
+    catalog, elapsed = timed(lambda: get_products(db, limit=count, organization_id=user.organization_id))
+    print_header(f"📦 Catálogo completo ({count} productos)", ["filas", "KB", "ms"])
+    print_row(len(catalog), round(response_size(catalog) / 1024, 1), elapsed)
+
+    print_header("🔎 Búsqueda en el servidor (limit=50)", ["modo", "búsqueda", "filas", "KB", "ms"])
+    for mode, fts_enabled in [("fts5", True), ("like", False)]:
+        search._fts_available = fts_enabled
+        for term in SEARCHES:
+            db.expunge_all()
+            results, elapsed = timed(lambda: get_products(
+                db, limit=50, search=term, organization_id=user.organization_id
+            ))
+            print_row(mode, term[:12], len(results), round(response_size(results) / 1024, 1), elapsed)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,57 @@
+"""
+Benchmark: consultas SQL para crear y devolver alquileres de varios items
+
+Uso:
+    python benchmarks/bench_rentals.py [items ...]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from app import models_extended as models, schemas_extended as schemas
+from app.crud_rentals import create_rental, update_rental
+
+
+def run(item_counts):
+    db = create_session()
+    user, client, products = create_tenant(
+        db, max(item_counts), product_type=lambda i: "ambos" if i % 2 else "alquiler"
+    )
+    start_date = datetime.now()
+
+    def build_rental(items: int) -> schemas.RentalCreate:
+        return schemas.RentalCreate(
+            client_id=client.id,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=3),
+            items=[
+                schemas.RentalItemCreate(product_id=product.id, quantity=2, unit_price=5.0)
+                for product in products[:items]
+            ]
+        )
+
+    # Alquiler inicial para crear el contador de numeración
+    create_rental(db, build_rental(1), user.id)
+
+    print_header("📊 Alquileres: sentencias SQL", ["items", "crear", "devolver", "ms"])
+    for items in item_counts:
+        rental = build_rental(items)
+        db.expire_all()
+        db.get(models.User, user.id)
+
+        started = time.perf_counter()
+        with StatementCounter() as create_counter:
+            db_rental = create_rental(db, rental, user.id)
+        with StatementCounter() as return_counter:
+            update_rental(db, db_rental.id, schemas.RentalUpdate(status="devuelto"), user.id)
+        elapsed = (time.perf_counter() - started) * 1000
+        print_row(items, create_counter.count, return_counter.count, elapsed)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 50, 100]
+    run(counts)
@@ -0,0 +1,104 @@
+"""
+Benchmark de los totales diarios (daily_rollups)
+
+Con varios años de historial, compara los gráficos de ventas y alquileres de
+un año leyendo daily_rollups contra la agregación sobre las tablas
+originales, mide el dashboard, y verifica que el mantenimiento incremental
+(crear ventas por el ORM) deja los mismos totales que una reconstrucción.
+
+Uso:
+    python benchmarks/bench_rollups.py [años] [ventas_por_día]
+"""
+import contextlib
+import io
+import sys
+import time
+from datetime import datetime
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import update
+
+from app import models_extended as models
+from app import rollups
+from app.crud_dashboard import get_dashboard_stats, get_rentals_chart_data, get_sales_chart_data
+from app.crud_sales import create_sale
+from app.schemas_extended import SaleCreate
+from bench_business_summary import create_history
+
+REPETITIONS = 5
+
+
+def measure(db, call):
+    timings = []
+    for _ in range(REPETITIONS):
+        db.expunge_all()
+        with StatementCounter() as counter, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = call()
+            timings.append((time.perf_counter() - started) * 1000)
+    return result, counter.count, min(timings), sorted(timings)[len(timings) // 2]
+
+
+def snapshot(db, organization_id: int) -> dict:
+    rows = db.query(models.DailyRollup).filter(
+        models.DailyRollup.organization_id == organization_id,
+        models.DailyRollup.count != 0
+    ).all()
+    return {
+        (row.source, row.day, row.status, row.payment_method): (
+            row.count, round(row.total_amount, 4), round(row.paid_amount, 4), round(row.pending_balance, 4)
+        )
+        for row in rows
+    }
+
+
+def run(years: int, sales_per_day: int):
+    db = create_session()
+    user, client, products = create_tenant(db, product_count=20)
+    organization_id, user_id, client_id = user.organization_id, user.id, client.id
+    product_ids = [product.id for product in products]
+    sales, rentals = create_history(db, user, client, products, years, sales_per_day)
+    # El historial se inserta con Core (sin listeners): fecha de venta = creación y reconstrucción completa
+    db.execute(update(models.Sale).values(sale_date=models.Sale.created_at))
+    rollups.rebuild_rollups(db, organization_id)
+    db.commit()
+    rows = db.query(models.DailyRollup).filter(models.DailyRollup.organization_id == organization_id).count()
+
+    year = datetime.now().year - 1
+    start, end = f"{year}-01-01T00:00:00", f"{year + 1}-01-01T00:00:00"
+    # Un segundo de corrimiento obliga a agregar sobre las tablas originales
+    raw_start = f"{year}-01-01T00:00:01"
+
+    print_header(f"📈 Gráficos de {year} ({sales} ventas, {rentals} alquileres, {rows} filas de totales)", ["gráfico", "origen", "puntos", "sentencias", "mín ms", "p50 ms"])
+    for label, chart in [("ventas", get_sales_chart_data), ("alquileres", get_rentals_chart_data)]:
+        for source, chart_start in [("daily_rollups", start), ("tablas", raw_start)]:
+            points, statements, best, median = measure(db, lambda: chart(db, organization_id, 30, chart_start, end))
+            print_row(label, source, len(points), statements, best, median)
+
+    print_header("📊 Dashboard", ["filtro", "sentencias", "mín ms", "p50 ms"])
+    for label, start_date, end_date in [("sin filtro", None, None), (str(year), f"{year}-01-01", f"{year}-12-31")]:
+        _, statements, best, median = measure(db, lambda: get_dashboard_stats(db, organization_id, start_date, end_date))
+        print_row(label, statements, best, median)
+
+    # Mantenimiento incremental contra reconstrucción
+    for n in range(50):
+        create_sale(db, SaleCreate(
+            client_id=client_id,
+            payment_method=["efectivo", "tarjeta"][n % 2],
+            items=[{"product_id": product_ids[n % len(product_ids)], "quantity": 1, "unit_price": 10}]
+        ), user_id)
+    incremental = snapshot(db, organization_id)
+    rollups.rebuild_rollups(db, organization_id)
+    db.commit()
+    rebuilt = snapshot(db, organization_id)
+    print(f"\nIncremental = reconstrucción: {'✅' if incremental == rebuilt else '❌'}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
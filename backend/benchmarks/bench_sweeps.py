@@ -0,0 +1,86 @@
+"""
+Benchmark de los barridos de estado del scheduler
+
+Compara marcar alquileres vencidos fila por fila con el ORM (como hacían
+/api/rentals/check-overdue y /update-status) contra el UPDATE por
+organización de mark_overdue_rentals, que también ajusta daily_rollups.
+Hace lo mismo con las cotizaciones vencidas.
+
+Uso:
+    python benchmarks/bench_sweeps.py [vencidos]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from sqlalchemy import insert
+
+from app import models_extended as models
+from app import rollups
+from app.crud_quotations import mark_expired_quotations
+from app.crud_rentals import mark_overdue_rentals
+
+
+def create_due_rows(db, organization_id: int, user_id: int, client_id: int, count: int):
+    """`count` alquileres activos y `count` cotizaciones pendientes ya vencidos"""
+    now = datetime.now()
+    db.execute(models.Rental.__table__.delete())
+    db.execute(models.Quotation.__table__.delete())
+    db.execute(insert(models.Rental), [
+        {
+            "rental_number": f"ALQ-SWEEP-{i}", "client_id": client_id, "created_by": user_id,
+            "status": "activo", "start_date": now - timedelta(days=20), "end_date": now - timedelta(days=1 + i % 10),
+            "total_cost": 100, "paid_amount": 0, "balance": 100, "created_at": now - timedelta(days=20),
+            "organization_id": organization_id,
+        }
+        for i in range(count)
+    ])
+    db.execute(insert(models.Quotation), [
+        {
+            "quotation_number": f"COT-SWEEP-{i}", "client_id": client_id, "created_by": user_id,
+            "status": "pendiente", "valid_until": now - timedelta(days=1), "total": 10,
+            "organization_id": organization_id,
+        }
+        for i in range(count)
+    ])
+    rollups.rebuild_rollups(db, organization_id)
+    db.commit()
+
+
+def row_by_row(db, model, status_from: str, status_to: str, date_column) -> int:
+    """Camino anterior: cargar las filas y cambiarles el estado una a una"""
+    rows = db.query(model).filter(model.status == status_from, date_column < datetime.now()).all()
+    for row in rows:
+        row.status = status_to
+    db.commit()
+    return len(rows)
+
+
+def run(count: int):
+    db = create_session()
+    user, client, _ = create_tenant(db)
+    tenant = (user.organization_id, user.id, client.id)
+
+    print_header(f"🧹 Barridos de vencidos ({count} filas)", ["barrido", "camino", "marcados", "sentencias", "ms"])
+    cases = [
+        ("alquileres", "fila por fila", lambda: row_by_row(db, models.Rental, "activo", "vencido", models.Rental.end_date)),
+        ("alquileres", "UPDATE", lambda: sum(mark_overdue_rentals(db).values())),
+        ("cotizaciones", "fila por fila", lambda: row_by_row(db, models.Quotation, "pendiente", "vencida", models.Quotation.valid_until)),
+        ("cotizaciones", "UPDATE", lambda: sum(mark_expired_quotations(db).values())),
+    ]
+    for label, path, call in cases:
+        create_due_rows(db, *tenant, count)
+        db.expunge_all()
+        with StatementCounter() as counter:
+            started = time.perf_counter()
+            marked = call()
+            elapsed = (time.perf_counter() - started) * 1000
+        print_row(label, path, marked, counter.count, elapsed)
+
+    db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
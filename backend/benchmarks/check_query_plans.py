@@ -0,0 +1,182 @@
+"""
+Verificación de planes de consulta: las consultas frecuentes deben usar los
+índices compuestos/parciales declarados en los modelos.
+
+Ejecuta las funciones CRUD reales, captura el SQL que emiten y corre EXPLAIN
+sobre cada sentencia. Termina con código 1 si alguna consulta no usa el
+índice esperado, para poder usarlo en CI.
+
+Uso:
+    python benchmarks/check_query_plans.py
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/check_query_plans.py
+"""
+import sys
+from datetime import datetime, timedelta
+
+from common import create_session, create_tenant, engine
+
+from sqlalchemy import event, text
+
+from app import models_extended as models, schemas_extended as schemas
+from app import leaderboards, search
+from app.crud import get_inventory_movements, get_products
+from app.crud_dashboard import get_sales_chart_data, get_top_clients, get_top_products
+from app.crud_clients import get_clients, get_client_by_rnc, search_clients_typeahead
+from app.crud_sales import get_sales
+from app.crud_rentals import get_rentals, check_overdue_rentals
+from app.crud_quotations import get_quotations
+from app.crud_notifications import get_notifications, get_or_create_notification
+from app.crud_failures import get_failures, get_failures_summary
+from app.crud_exports import inventory_movements_export, iter_export_rows, sales_export
+
+
+def capture_select(table: str, call):
+    """Ejecuta call() y devuelve la primera SELECT emitida sobre la tabla indicada"""
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    if not captured:
+        raise RuntimeError(f"No se emitió ninguna consulta sobre {table}")
+    return captured[0]
+
+
+def explain(statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Con tablas pequeñas Postgres prefiere seq scan; forzar el uso de índices si existen
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+        else:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def seed(db, organization_id: int, user_id: int, client_id: int):
+    """Pocas filas por tabla: solo hace falta que las consultas devuelvan algo"""
+    now = datetime.now()
+    for i in range(20):
+        db.add(models.Sale(
+            sale_number=f"VEN-PLAN-{i}", invoice_number=f"FAC-PLAN-{i}", client_id=client_id,
+            created_by=user_id, status="completada", total=10, paid_amount=10, balance=0,
+            payment_method="efectivo", organization_id=organization_id
+        ))
+        rental = models.Rental(
+            rental_number=f"ALQ-PLAN-{i}", client_id=client_id, created_by=user_id, status="activo",
+            start_date=now - timedelta(days=10), end_date=now - timedelta(days=i - 5),
+            total_cost=10, paid_amount=0, balance=10, organization_id=organization_id
+        )
+        db.add(rental)
+        db.flush()
+        db.add(models.RentalPayment(
+            rental_id=rental.id, amount=5, payment_method="efectivo",
+            payment_date=now - timedelta(days=i), organization_id=organization_id
+        ))
+        db.add(models.Quotation(
+            quotation_number=f"COT-PLAN-{i}", client_id=client_id, created_by=user_id, status="pendiente",
+            valid_until=now + timedelta(days=15), total=10, organization_id=organization_id
+        ))
+        db.add(models.SystemFailure(
+            organization_id=organization_id, error_type="http_exception", module="sales",
+            error_message="Error de prueba"
+        ))
+    db.commit()
+
+
+def main() -> int:
+    db = create_session()
+    user, client, _ = create_tenant(db)
+    organization_id = user.organization_id
+    seed(db, organization_id, user.id, client.id)
+
+    notification = schemas.NotificationCreate(
+        type="warning", title="Stock bajo", message="Prueba", notification_key="stock-bajo"
+    )
+    period_start = datetime.now() - timedelta(days=30)
+    search.ensure_search_index(engine)
+    leaderboards.rebuild_leaderboards(db, organization_id)
+    db.commit()
+
+    cases = [
+        ("Listado de ventas", "sales", "ix_sales_org_created_id",
+         lambda: get_sales(db, organization_id=organization_id)),
+        ("Ventas por estado", "sales", "ix_sales_org_status_created",
+         lambda: get_sales(db, status="completada", organization_id=organization_id)),
+        ("Alquileres por estado", "rentals", "ix_rentals_org_status_created",
+         lambda: get_rentals(db, status="activo", organization_id=organization_id)),
+        ("Cotizaciones por estado", "quotations", "ix_quotations_org_status_created",
+         lambda: get_quotations(db, status="pendiente", organization_id=organization_id)),
+        ("Listado de clientes", "clients", "ix_clients_org_created_id",
+         lambda: get_clients(db, organization_id=organization_id)),
+        ("Cliente por RNC (duplicados)", "clients", "uq_clients_org_rnc_normalized",
+         lambda: get_client_by_rnc(db, "101-00000-1", organization_id)),
+        ("Movimientos de inventario", "inventory_movements", "ix_inventory_movements_org_created_id",
+         lambda: get_inventory_movements(db, organization_id=organization_id)),
+        ("Barrido de alquileres vencidos", "rentals", "ix_rentals_active_end_date",
+         lambda: check_overdue_rentals(db)),
+        ("Pagos de alquiler por período", "rental_payments", "ix_rental_payments_org_payment_date",
+         lambda: db.query(models.RentalPayment).filter(
+             models.RentalPayment.organization_id == organization_id,
+             models.RentalPayment.payment_date >= period_start
+         ).all()),
+        ("Notificación vigente por clave", "notifications", "ix_notifications_org_key_deleted",
+         lambda: get_or_create_notification(db, "stock-bajo", organization_id, notification)),
+        ("Bandeja de notificaciones", "notifications", "ix_notifications_org_live_created",
+         lambda: get_notifications(db, organization_id)),
+        ("Listado de fallas", "system_failures", "ix_system_failures_org_created",
+         lambda: get_failures(db, organization_id=organization_id)),
+        ("Resumen de fallas", "system_failures", "ix_system_failures_org_created",
+         lambda: get_failures_summary(db, organization_id=organization_id)),
+        ("Búsqueda de productos", "products",
+         {"sqlite": "products_fts", "postgresql": "ix_products_name_trgm"},
+         lambda: get_products(db, search="producto", organization_id=organization_id)),
+        ("Autocompletar clientes", "clients",
+         {"sqlite": "clients_fts", "postgresql": "ix_clients_name_trgm"},
+         lambda: search_clients_typeahead(db, "cliente", organization_id=organization_id)),
+        ("Gráfico de ventas (totales diarios)", "daily_rollups",
+         {"sqlite": "sqlite_autoindex_daily_rollups_1", "postgresql": "uq_daily_rollup_key"},
+         lambda: get_sales_chart_data(db, organization_id, start_date_str="2025-01-01", end_date_str="2026-01-01")),
+        ("Productos más vendidos", "product_leaderboard", "ix_product_leaderboard_quantity",
+         lambda: get_top_products(db, organization_id)),
+        ("Productos por ingresos del mes", "product_leaderboard", "ix_product_leaderboard_revenue",
+         lambda: get_top_products(db, organization_id, order_by="revenue", month=leaderboards.month_period(datetime.now()))),
+        ("Mejores clientes", "client_leaderboard", "ix_client_leaderboard_spent",
+         lambda: get_top_clients(db, organization_id)),
+        ("Exportación de ventas", "sales", "ix_sales_org_created_id",
+         lambda: list(iter_export_rows(db, sales_export(organization_id)))),
+        ("Exportación de movimientos por fecha", "inventory_movements", "ix_inventory_movements_org_created_id",
+         lambda: list(iter_export_rows(db, inventory_movements_export(organization_id, start_date=period_start)))),
+    ]
+
+    print("=" * 60)
+    print(f"🔎 Planes de consulta ({engine.dialect.name})")
+    print("=" * 60)
+
+    failures = 0
+    for name, table, expected_index, call in cases:
+        if isinstance(expected_index, dict):
+            expected_index = expected_index[engine.dialect.name]
+        statement, parameters = capture_select(table, call)
+        plan = explain(statement, parameters)
+        if expected_index in plan:
+            print(f"✅ {name}: {expected_index}")
+        else:
+            failures += 1
+            print(f"❌ {name}: se esperaba {expected_index}")
+            print("   " + plan.replace("\n", "\n   "))
+
+    db.close()
+    print(f"\n{len(cases) - failures}/{len(cases)} consultas usan el índice esperado")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
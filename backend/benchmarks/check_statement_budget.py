@@ -0,0 +1,154 @@
+"""
+Verificación de sentencias SQL por página de los listados
+
+Llama a los endpoints de listado (funciones del router) y serializa el
+resultado con su response_model, igual que FastAPI, contando las sentencias
+emitidas. Cada página debe quedar dentro de STATEMENT_BUDGET y costar lo
+mismo con 10 que con 100 filas: si crece con el tamaño de la página hay una
+relación que se carga fila por fila (N+1). Termina con código 1 si algún
+endpoint no cumple, para poder usarlo en CI.
+
+Uso:
+    python benchmarks/check_statement_budget.py
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/check_statement_budget.py
+"""
+import sys
+from datetime import datetime, timedelta
+from typing import List
+
+from common import StatementCounter, create_session, create_tenant, print_header, print_row
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from starlette.requests import Request
+
+from app import models_extended as models, schemas_extended as schemas
+from app.routers import products, quotations, rentals, sales
+
+# Sentencias máximas por página (consulta principal + una por colección/relación)
+STATEMENT_BUDGET = 4
+
+PAGE_SIZES = (10, 100)
+
+DOCUMENTS = 120
+
+
+def seed(db, organization_id: int, user_id: int, product_ids: List[int]):
+    """
+    Documentos con varios clientes, items y pagos; productos con categoría y
+    proveedor. Cada línea usa un producto distinto: si se repitieran, el
+    identity map ocultaría las cargas por fila.
+    """
+    now = datetime.now()
+    category_ids = [
+        db.execute(insert(models.Category).values(name=f"Categoría {i}", organization_id=organization_id)).inserted_primary_key[0]
+        for i in range(30)
+    ]
+    supplier_ids = [
+        db.execute(insert(models.Supplier).values(name=f"Proveedor {i}", organization_id=organization_id)).inserted_primary_key[0]
+        for i in range(30)
+    ]
+    for i, product_id in enumerate(product_ids):
+        db.query(models.Product).filter(models.Product.id == product_id).update({
+            "category_id": category_ids[i % 30], "supplier_id": supplier_ids[i % 30]
+        })
+    db.execute(insert(models.Client), [
+        {"name": f"Cliente {i}", "rnc": f"001-{i:07d}-1", "organization_id": organization_id} for i in range(30)
+    ])
+    client_ids = db.scalars(select(models.Client.id).where(
+        models.Client.organization_id == organization_id, models.Client.rnc.is_not(None)
+    )).all()
+
+    def common(i):
+        return {
+            "client_id": client_ids[i % len(client_ids)], "created_by": user_id,
+            "organization_id": organization_id, "created_at": now - timedelta(minutes=i),
+            "payment_method": "efectivo",
+        }
+
+    db.execute(insert(models.Sale), [{**common(i), "sale_number": f"VEN-N1-{i}", "total": 30} for i in range(DOCUMENTS)])
+    db.execute(insert(models.Rental), [
+        {**common(i), "rental_number": f"ALQ-N1-{i}", "product_id": product_ids[i % len(product_ids)],
+         "start_date": now, "end_date": now + timedelta(days=3), "rental_period": "daily", "total_cost": 30}
+        for i in range(DOCUMENTS)
+    ])
+    db.execute(insert(models.Quotation), [{**common(i), "quotation_number": f"COT-N1-{i}", "total": 30} for i in range(DOCUMENTS)])
+
+    def ids(model):
+        return db.scalars(select(model.id).where(model.organization_id == organization_id)).all()
+
+    line = {"quantity": 1, "unit_price": 10, "subtotal": 10}
+
+    def product_id(i, n):
+        return product_ids[(i * 3 + n) % len(product_ids)]
+
+    db.execute(insert(models.SaleItem), [
+        {**line, "sale_id": sale_id, "product_id": product_id(i, n)} for i, sale_id in enumerate(ids(models.Sale)) for n in range(3)
+    ])
+    db.execute(insert(models.QuotationItem), [
+        {**line, "quotation_id": quotation_id, "product_id": product_id(i, n)}
+        for i, quotation_id in enumerate(ids(models.Quotation)) for n in range(3)
+    ])
+    db.execute(insert(models.RentalItem), [
+        {**line, "rental_id": rental_id, "product_id": product_id(i, n), "rental_days": 3}
+        for i, rental_id in enumerate(ids(models.Rental)) for n in range(2)
+    ])
+    db.execute(insert(models.RentalPayment), [
+        {"rental_id": rental_id, "amount": 10, "payment_method": "efectivo", "organization_id": organization_id}
+        for rental_id in ids(models.Rental) for _ in range(2)
+    ])
+    db.commit()
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+def main() -> int:
+    db = create_session()
+    user, _, product_list = create_tenant(db, product_count=DOCUMENTS)
+    user_id = user.id
+    seed(db, user.organization_id, user_id, [p.id for p in product_list])
+
+    endpoints = [
+        ("GET /api/sales/", List[schemas.Sale],
+         lambda limit, user: sales.read_sales(Response(), limit=limit, db=db, current_user=user)),
+        ("GET /api/rentals/", List[schemas.Rental],
+         lambda limit, user: rentals.read_rentals(Response(), limit=limit, db=db, current_user=user)),
+        ("GET /api/quotations/", List[schemas.Quotation],
+         lambda limit, user: quotations.read_quotations(Response(), limit=limit, db=db, current_user=user)),
+        ("GET /api/products/", List[schemas.Product],
+         lambda limit, user: products.read_products(_request(), limit=limit, product_type=None, db=db, current_user=user)),
+    ]
+
+    print_header(f"🔢 Sentencias por página (máximo {STATEMENT_BUDGET})", ["endpoint"] + [f"{size} filas" for size in PAGE_SIZES])
+    failures = []
+    for label, response_model, call in endpoints:
+        adapter = TypeAdapter(response_model)
+        counts = []
+        for limit in PAGE_SIZES:
+            # Sesión vacía salvo el usuario, como la deja la autenticación
+            db.expunge_all()
+            current_user = db.get(models.User, user_id)
+            with StatementCounter() as counter:
+                rows = adapter.validate_python(call(limit, current_user), from_attributes=True)
+            if len(rows) != limit:
+                failures.append(f"{label}: se esperaban {limit} filas y llegaron {len(rows)}")
+            counts.append(counter.count)
+        print_row(label, *counts)
+        if max(counts) > STATEMENT_BUDGET:
+            failures.append(f"{label}: {max(counts)} sentencias (máximo {STATEMENT_BUDGET})")
+        elif len(set(counts)) > 1:
+            failures.append(f"{label}: las sentencias crecen con el tamaño de la página {counts}")
+
+    db.close()
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Todos los listados dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
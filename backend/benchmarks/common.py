@@ -0,0 +1,96 @@
+"""
+Utilidades compartidas por los benchmarks
+
+Importar este módulo antes que la app: apunta DATABASE_URL a una base SQLite
+temporal (no toca la base configurada en .env) y agrega el directorio del
+backend al path. Para usar otra base desechable (p. ej. PostgreSQL) definir
+BENCH_DATABASE_URL.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+if os.getenv("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    _tmp_dir = tempfile.mkdtemp(prefix="bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/bench.db"
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event
+
+from app.database import Base, engine, SessionLocal
+from app import models_extended as models
+from app.models_organization import Organization
+
+
+class StatementCounter:
+    """Cuenta las sentencias ejecutadas contra el engine mientras está activo"""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def create_session():
+    """Crea las tablas en la base temporal y devuelve una sesión"""
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def create_tenant(db, product_count: int = 0, product_type: str = "ambos"):
+    """Crea una organización con un usuario admin, un cliente y productos con stock de sobra"""
+    organization = Organization(name="Benchmark", slug="benchmark", email="bench@example.com")
+    db.add(organization)
+    db.flush()
+
+    user = models.User(
+        email="bench@example.com",
+        username="bench",
+        hashed_password="x",
+        role="admin",
+        organization_id=organization.id
+    )
+    client = models.Client(name="Cliente Benchmark", organization_id=organization.id)
+    db.add_all([user, client])
+    db.flush()
+
+    products = [
+        models.Product(
+            sku=f"BENCH-{i:03d}",
+            name=f"Producto {i}",
+            price=10.0,
+            stock=1_000_000,
+            stock_available=1_000_000,
+            product_type=product_type(i) if callable(product_type) else product_type,
+            organization_id=organization.id
+        )
+        for i in range(product_count)
+    ]
+    db.add_all(products)
+    db.commit()
+    return user, client, products
+
+
+def print_header(title: str, columns):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+    print(" ".join(f"{column:>12}" for column in columns))
+
+
+def print_row(*values):
+    print(" ".join(f"{value:>12.1f}" if isinstance(value, float) else f"{value:>12}" for value in values))
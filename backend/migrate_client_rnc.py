@@ -0,0 +1,98 @@
+"""
+Script de migración para el RNC/Cédula normalizado de clientes
+Agrega la columna clients.rnc_normalized, la llena con normalize_rnc()
+(igual que la validación de la app) y crea el índice único
+(organization_id, rnc_normalized). Si hay clientes duplicados dentro de una
+organización los muestra y no crea el índice hasta que se corrijan.
+Se puede ejecutar más de una vez.
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text, func
+from sqlalchemy.schema import CreateIndex
+
+from app.database import SessionLocal, engine
+from app import models_extended as models
+from app.crud_clients import normalize_rnc_or_none
+
+INDEX_NAME = "uq_clients_org_rnc_normalized"
+
+
+def add_column():
+    with engine.connect() as conn:
+        try:
+            print("Añadiendo columna 'rnc_normalized' a la tabla 'clients'...")
+            conn.execute(text("ALTER TABLE clients ADD COLUMN rnc_normalized VARCHAR;"))
+            conn.commit()
+            print("OK")
+        except Exception as e:
+            conn.rollback()
+            if "already exists" in str(e).lower() or "duplicate" in str(e).lower() or "duplicada" in str(e).lower():
+                print("La columna 'rnc_normalized' ya existe.")
+            else:
+                print(f"Error: {e}")
+
+
+def backfill(db) -> int:
+    updated = 0
+    for client in db.query(models.Client).yield_per(1000):
+        normalized = normalize_rnc_or_none(client.rnc)
+        if client.rnc_normalized != normalized:
+            client.rnc_normalized = normalized
+            updated += 1
+    db.commit()
+    return updated
+
+
+def find_duplicates(db):
+    return db.query(
+        models.Client.organization_id,
+        models.Client.rnc_normalized,
+        func.count(models.Client.id)
+    ).filter(
+        models.Client.rnc_normalized.isnot(None)
+    ).group_by(
+        models.Client.organization_id,
+        models.Client.rnc_normalized
+    ).having(func.count(models.Client.id) > 1).all()
+
+
+def create_unique_index():
+    index = next(ix for ix in models.Client.__table__.indexes if ix.name == INDEX_NAME)
+    is_postgres = engine.dialect.name == "postgresql"
+    if is_postgres:
+        index.dialect_kwargs["postgresql_concurrently"] = True
+
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def migrate_client_rnc():
+    add_column()
+
+    db = SessionLocal()
+    try:
+        updated = backfill(db)
+        print(f"Clientes actualizados: {updated}")
+
+        duplicates = find_duplicates(db)
+        if duplicates:
+            print("❌ Hay clientes con el mismo RNC/Cédula en una organización; corríjalos y vuelva a ejecutar:")
+            for organization_id, rnc_normalized, count in duplicates:
+                print(f"   organización {organization_id}: {rnc_normalized} ({count} clientes)")
+            return
+    finally:
+        db.close()
+
+    print(f"Creando índice único '{INDEX_NAME}'...")
+    create_unique_index()
+    print("¡Migración completada exitosamente!")
+
+
+if __name__ == "__main__":
+    migrate_client_rnc()
@@ -0,0 +1,52 @@
+"""
+Script de migración para crear y reconstruir los totales diarios (daily_rollups)
+Crea la tabla si no existe y recalcula los totales de ventas, alquileres y
+pagos de alquiler desde el historial. Se puede ejecutar más de una vez; cada
+organización se reconstruye en su propia transacción.
+
+Uso:
+    python migrate_daily_rollups.py                 # todas las organizaciones
+    python migrate_daily_rollups.py <organization_id>
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine, Base
+from app import models_extended as models
+from app.models_organization import Organization
+from app.rollups import rebuild_rollups
+
+
+def migrate_daily_rollups(organization_id=None):
+    Base.metadata.create_all(bind=engine, tables=[models.DailyRollup.__table__])
+
+    db = SessionLocal()
+    try:
+        if organization_id is not None:
+            organization_ids = [organization_id]
+        else:
+            organization_ids = [org_id for (org_id,) in db.query(Organization.id).all()]
+            organization_ids.append(None)  # Registros sin organización
+
+        for org_id in organization_ids:
+            rebuild_rollups(db, org_id)
+            db.commit()
+            rows = db.query(models.DailyRollup).filter(
+                models.DailyRollup.organization_id == (org_id or 0)
+            ).count()
+            print(f"Organización {org_id or 'sin organización'}: {rows} filas")
+
+        print("✅ Migración completada.")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en migración: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_daily_rollups(int(sys.argv[1]) if len(sys.argv) > 1 else None)
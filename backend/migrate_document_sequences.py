@@ -0,0 +1,59 @@
+"""
+Script de migración para inicializar los contadores de numeración de documentos
+Crea la tabla document_sequences y la llena con el número más alto ya emitido
+por cada organización y tipo de documento (VEN, FAC, ALQ, COT).
+Se puede ejecutar más de una vez: solo sube contadores que hayan quedado atrás.
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine, Base
+from app import models_extended as models
+from app.models_organization import Organization
+from app.crud_sequences import DOCUMENT_NUMBER_COLUMNS, get_current_max_number
+
+
+def migrate_document_sequences():
+    Base.metadata.create_all(bind=engine, tables=[models.DocumentSequence.__table__])
+    
+    db = SessionLocal()
+    try:
+        organization_ids = [org_id for (org_id,) in db.query(Organization.id).all()]
+        organization_ids.append(None)  # Documentos sin organización
+        
+        created = 0
+        updated = 0
+        for organization_id in organization_ids:
+            for document_type in DOCUMENT_NUMBER_COLUMNS:
+                max_number = get_current_max_number(db, document_type, organization_id)
+                sequence = db.query(models.DocumentSequence).filter(
+                    models.DocumentSequence.organization_id == (organization_id or 0),
+                    models.DocumentSequence.document_type == document_type
+                ).first()
+                
+                if not sequence:
+                    db.add(models.DocumentSequence(
+                        organization_id=organization_id or 0,
+                        document_type=document_type,
+                        last_number=max_number
+                    ))
+                    created += 1
+                elif sequence.last_number < max_number:
+                    sequence.last_number = max_number
+                    updated += 1
+        
+        db.commit()
+        print(f"✅ Migración completada. {created} contadores creados, {updated} actualizados.")
+        
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en migración: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_document_sequences()
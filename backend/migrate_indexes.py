@@ -0,0 +1,95 @@
+"""
+Script de migración para crear los índices compuestos y parciales de los modelos
+Base.metadata.create_all() solo crea índices de tablas nuevas, así que en
+bases existentes hay que crearlos con este script. Los índices que ya existen
+se omiten, por lo que se puede ejecutar más de una vez.
+
+En PostgreSQL se crean con CREATE INDEX CONCURRENTLY para no bloquear las
+escrituras mientras se construyen. Si una construcción concurrente falla, el
+índice queda marcado como inválido; el script lo detecta y lo vuelve a crear.
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import engine, Base
+from app import models_extended  # noqa: F401 - registra los modelos en Base.metadata
+from app.search import TRIGRAM_INDEXES, trigram_index_ddl
+
+
+def get_migration_indexes(dialect_name: str):
+    """Índices compuestos, parciales o GIN declarados en los modelos"""
+    indexes = []
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            is_partial = any(
+                index.dialect_options[dialect]["where"] is not None
+                for dialect in ("postgresql", "sqlite")
+            )
+            is_postgres_only = bool(index.dialect_options["postgresql"]["using"])
+            if is_postgres_only and dialect_name != "postgresql":
+                continue
+            # Los índices de una columna (index=True) ya los crea create_all con la tabla
+            if len(index.expressions) > 1 or is_partial or is_postgres_only:
+                indexes.append(index)
+    return indexes
+
+
+def drop_invalid_postgres_indexes(conn, index_names):
+    """Elimina índices que quedaron inválidos por un CREATE INDEX CONCURRENTLY fallido"""
+    invalid = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relname = ANY(:names)
+    """), {"names": list(index_names)}).scalars().all()
+
+    for name in invalid:
+        print(f"Eliminando índice inválido '{name}'...")
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def migrate_indexes():
+    indexes = get_migration_indexes(engine.dialect.name)
+    is_postgres = engine.dialect.name == "postgresql"
+
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if is_postgres:
+            # Necesaria para los índices GIN de trigramas (búsqueda de productos y clientes)
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            drop_invalid_postgres_indexes(conn, [index.name for index in indexes] + list(TRIGRAM_INDEXES))
+
+        created = 0
+        for index in indexes:
+            print(f"Creando índice '{index.name}' en '{index.table.name}'...")
+            if is_postgres:
+                index.dialect_kwargs["postgresql_concurrently"] = True
+            try:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+                created += 1
+                print("OK")
+            except Exception as e:
+                print(f"Error: {e}")
+
+        # Índices de trigramas: no están en los modelos (ver app/search.py)
+        trigram_names = list(TRIGRAM_INDEXES) if is_postgres else []
+        for name in trigram_names:
+            print(f"Creando índice '{name}' en '{TRIGRAM_INDEXES[name][0]}'...")
+            try:
+                conn.execute(text(trigram_index_ddl(name, concurrently=True)))
+                created += 1
+                print("OK")
+            except Exception as e:
+                print(f"Error: {e}")
+
+    print(f"¡Migración completada! Índices revisados: {created}/{len(indexes) + len(trigram_names)}")
+
+
+if __name__ == "__main__":
+    migrate_indexes()
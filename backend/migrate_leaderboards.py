@@ -0,0 +1,59 @@
+"""
+Script de migración para crear y reconstruir los rankings de productos y
+clientes (product_leaderboard, client_leaderboard)
+Crea las tablas si no existen y recalcula los totales históricos y mensuales
+desde las ventas. Se puede ejecutar más de una vez; cada organización se
+reconstruye en su propia transacción.
+
+Uso:
+    python migrate_leaderboards.py                 # todas las organizaciones
+    python migrate_leaderboards.py <organization_id>
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine, Base
+from app import models_extended as models
+from app.models_organization import Organization
+from app.leaderboards import rebuild_leaderboards
+
+
+def migrate_leaderboards(organization_id=None):
+    Base.metadata.create_all(bind=engine, tables=[
+        models.ProductLeaderboard.__table__,
+        models.ClientLeaderboard.__table__,
+    ])
+
+    db = SessionLocal()
+    try:
+        if organization_id is not None:
+            organization_ids = [organization_id]
+        else:
+            organization_ids = [org_id for (org_id,) in db.query(Organization.id).all()]
+            organization_ids.append(None)  # Registros sin organización
+
+        for org_id in organization_ids:
+            rebuild_leaderboards(db, org_id)
+            db.commit()
+            products = db.query(models.ProductLeaderboard).filter(
+                models.ProductLeaderboard.organization_id == (org_id or 0)
+            ).count()
+            clients = db.query(models.ClientLeaderboard).filter(
+                models.ClientLeaderboard.organization_id == (org_id or 0)
+            ).count()
+            print(f"Organización {org_id or 'sin organización'}: {products} filas de productos, {clients} de clientes")
+
+        print("✅ Migración completada.")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en migración: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_leaderboards(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,41 @@
+"""
+Script de migración para el índice único de notificaciones vigentes
+Crea el índice parcial único (organization_id, notification_key) sobre las
+notificaciones no eliminadas, que usa el generador de notificaciones para
+guardar todo en un solo INSERT ... ON CONFLICT. Antes marca como eliminadas
+las notificaciones vigentes duplicadas (misma organización y clave),
+conservando la más reciente. Se puede ejecutar más de una vez; el arranque
+de la aplicación hace lo mismo si el índice no existe.
+"""
+import os
+import sys
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine
+from app.crud_notifications import LIVE_KEY_INDEX, create_live_key_index, remove_duplicate_live_notifications
+
+
+def migrate_notification_keys():
+    db = SessionLocal()
+    try:
+        duplicates = remove_duplicate_live_notifications(db)
+        print(f"Notificaciones duplicadas marcadas como eliminadas: {duplicates}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error eliminando duplicados: {e}")
+        return
+    finally:
+        db.close()
+
+    try:
+        print(f"Creando índice '{LIVE_KEY_INDEX}'...")
+        create_live_key_index(engine)
+        print("✅ Migración completada.")
+    except Exception as e:
+        print(f"❌ Error creando el índice: {e}")
+
+
+if __name__ == "__main__":
+    migrate_notification_keys()
@@ -0,0 +1,39 @@
+"""
+Script de migración para la revocación de tokens
+Agrega users.token_version (claim "ver" de los tokens) y crea la tabla
+revoked_tokens. Los tokens emitidos antes de la migración no traen "ver" y
+valen como versión 0 hasta que venzan o se cierren las sesiones.
+Se puede ejecutar más de una vez.
+"""
+import os
+import sys
+from sqlalchemy import text
+
+# Añadir el directorio actual al path para que pueda importar 'app'
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine, Base
+from app import models_extended as models
+
+
+def migrate_token_revocation():
+    with engine.connect() as conn:
+        try:
+            print("Añadiendo columna 'token_version' a la tabla 'users'...")
+            conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0;"))
+            conn.commit()
+            print("OK")
+        except Exception as e:
+            conn.rollback()
+            if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                print("La columna 'token_version' ya existe.")
+            else:
+                print(f"Error: {e}")
+
+    print("Creando tabla 'revoked_tokens'...")
+    Base.metadata.create_all(bind=engine, tables=[models.RevokedToken.__table__])
+    print("✅ Migración completada.")
+
+
+if __name__ == "__main__":
+    migrate_token_revocation()
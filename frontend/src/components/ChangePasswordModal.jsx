@@ -2,6 +2,7 @@ import { useState } from 'react';
 import { X, Eye, EyeOff, Lock } from 'lucide-react';
 import { useAuthStore } from '../store/useAuthStore';
 import api from '../services/api';
+import { authService } from '../services/authService';
 
 const ChangePasswordModal = ({ isOpen, onClose, onSuccess, onError }) => {
   const [formData, setFormData] = useState({
@@ -78,10 +79,14 @@ const ChangePasswordModal = ({ isOpen, onClose, onSuccess, onError }) => {
     setLoading(true);
     
     try {
-      await api.put('/auth/change-password', {
+      const response = await api.put('/auth/change-password', {
         current_password: formData.currentPassword,
         new_password: formData.newPassword
       });
+      if (response.data.access_token) {
+        authService.setToken(response.data.access_token);
+        useAuthStore.setState({ token: response.data.access_token });
+      }
       
       // Resetear formulario
       setFormData({
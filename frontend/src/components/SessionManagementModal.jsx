@@ -1,6 +1,8 @@
 import { useState, useEffect } from 'react';
 import { X, Clock, Shield, LogOut } from 'lucide-react';
 import api from '../services/api';
+import { authService } from '../services/authService';
+import { useAuthStore } from '../store/useAuthStore';
 
 const SessionManagementModal = ({ isOpen, onClose, onSuccess, onError }) => {
   const [sessionSettings, setSessionSettings] = useState({
@@ -40,7 +42,11 @@ const SessionManagementModal = ({ isOpen, onClose, onSuccess, onError }) => {
     // La confirmación se manejará desde el componente padre
 
     try {
-      await api.post('/auth/logout-all-sessions');
+      const response = await api.post('/auth/logout-all-sessions');
+      if (response.data.access_token) {
+        authService.setToken(response.data.access_token);
+        useAuthStore.setState({ token: response.data.access_token });
+      }
       
       onSuccess('Todas las sesiones han sido cerradas exitosamente.');
     } catch (error) {
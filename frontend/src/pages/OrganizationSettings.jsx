@@ -65,7 +65,15 @@ export default function OrganizationSettings() {
 
   const handleSystemReset = async () => {
     try {
-      await dashboardService.resetOrganizationData();
+      let job = await dashboardService.resetOrganizationData();
+      // El reset corre en segundo plano: esperar a que termine
+      while (job.status === 'pendiente' || job.status === 'en_progreso') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = await dashboardService.getResetDataStatus(job.job_id);
+      }
+      if (job.status !== 'completado') {
+        throw new Error(job.error || 'El reset no se completó');
+      }
       showNotification('success', 'Sistema reseteado exitosamente. Todos los datos han sido eliminados.');
       setShowResetModal(false);
       // Recargar la página para reflejar los cambios
@@ -36,5 +36,10 @@ export const authService = {
 
   getToken() {
     return sessionStorage.getItem('token');
+  },
+
+  // El backend reemplaza el token de la sesión actual al cerrar las demás
+  setToken(token) {
+    sessionStorage.setItem('token', token);
   }
 };
@@ -92,12 +92,18 @@ export const dashboardService = {
     return response.data;
   },
 
-  // Resetear todos los datos de la organización
+  // Resetear todos los datos de la organización (corre en segundo plano)
   resetOrganizationData: async () => {
     const response = await api.delete('/organizations/me/reset-data');
     return response.data;
   },
 
+  // Avance de un reset de datos
+  getResetDataStatus: async (jobId) => {
+    const response = await api.get(`/organizations/me/reset-data/${jobId}`);
+    return response.data;
+  },
+
   // Subir logo de la organización
   uploadLogo: async (file) => {
     const formData = new FormData();